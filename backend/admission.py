@@ -0,0 +1,215 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+# Token cost of each endpoint; anything not listed costs 1
+DEFAULT_ENDPOINT_COSTS = {
+    "dashboard": 5,
+    "expenses": 2,
+    "chat": 4,
+    "chat-stream": 4,
+    "charts": 4,
+    "export": 10,
+    "forecast": 3,
+    "expenses-over-time": 2,
+    "income-vs-expenses": 2,
+    "category-breakdown": 2,
+    "base-currency": 5,
+}
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at a fixed rate.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (the allowed burst)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self, cost: float) -> float:
+        """
+        Take tokens if there are enough.
+
+        Args:
+            cost: Number of tokens the request costs
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until there will be enough
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Per-user rate limits and a global cap on concurrent expensive requests.
+
+    Every user has a token bucket, and each endpoint costs a number of tokens
+    that reflects how much work it does. Expensive analyses also need one of a
+    fixed number of slots. Requests that can't be admitted are rejected at
+    once with a retry delay instead of queueing.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: float = 40.0, max_heavy: int = 8,
+                 endpoint_costs: Optional[Dict[str, float]] = None, max_users: int = 10000):
+        """
+        Initialize the admission controller.
+
+        Args:
+            rate: Tokens per second added to each user's bucket
+            burst: Bucket capacity
+            max_heavy: Maximum expensive requests running at once, across all users
+            endpoint_costs: Token cost by endpoint name (defaults to DEFAULT_ENDPOINT_COSTS)
+            max_users: Number of user buckets kept; the least recently used are dropped
+
+        Raises:
+            ValueError: If an endpoint costs more than a full bucket, so it could never be admitted
+        """
+        costs = dict(DEFAULT_ENDPOINT_COSTS if endpoint_costs is None else endpoint_costs)
+        if burst < 1:
+            raise ValueError(f"Rate burst must be at least 1 (the cost of unlisted endpoints), got {burst}")
+        too_costly = sorted(endpoint for endpoint, cost in costs.items() if cost > burst)
+        if too_costly:
+            raise ValueError(f"Endpoint costs exceed the rate burst of {burst}: {', '.join(too_costly)}")
+
+        self.rate = rate
+        self.burst = burst
+        self.max_heavy = max_heavy
+        self.endpoint_costs = costs
+        self.max_users = max_users
+
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._heavy_running = 0
+        self.admitted: Dict[str, int] = {}
+        self.rate_limited: Dict[str, int] = {}
+        self.overloaded: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """
+        Create a controller configured from environment variables.
+
+        CHASER_RATE_PER_SECOND, CHASER_RATE_BURST and CHASER_MAX_HEAVY_REQUESTS
+        set the limits; CHASER_ENDPOINT_COSTS is a JSON object overriding
+        individual endpoint costs.
+
+        Returns:
+            An AdmissionController
+
+        Raises:
+            ValueError: If the configured costs and burst can't admit every endpoint
+        """
+        costs = dict(DEFAULT_ENDPOINT_COSTS)
+        costs.update(json.loads(os.environ.get("CHASER_ENDPOINT_COSTS", "{}")))
+        return cls(
+            rate=float(os.environ.get("CHASER_RATE_PER_SECOND", "10")),
+            burst=float(os.environ.get("CHASER_RATE_BURST", "40")),
+            max_heavy=int(os.environ.get("CHASER_MAX_HEAVY_REQUESTS", "8")),
+            endpoint_costs=costs
+        )
+
+    def cost(self, endpoint: str) -> float:
+        """Token cost of an endpoint"""
+        return self.endpoint_costs.get(endpoint, 1)
+
+    def check_rate(self, user_id: str, endpoint: str) -> float:
+        """
+        Charge a request to the user's bucket.
+
+        Args:
+            user_id: The requesting user
+            endpoint: Name of the endpoint being called
+
+        Returns:
+            0 if admitted, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_users:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(user_id)
+
+            retry_after = bucket.take(self.cost(endpoint))
+            counts = self.rate_limited if retry_after else self.admitted
+            counts[endpoint] = counts.get(endpoint, 0) + 1
+            return retry_after
+
+    def try_acquire_heavy(self, endpoint: str) -> bool:
+        """
+        Take a slot for an expensive request, without waiting.
+
+        Args:
+            endpoint: Name of the endpoint being called
+
+        Returns:
+            True if a slot was taken (release it with `release_heavy`)
+        """
+        with self._lock:
+            if self._heavy_running >= self.max_heavy:
+                self.overloaded[endpoint] = self.overloaded.get(endpoint, 0) + 1
+                return False
+            self._heavy_running += 1
+            return True
+
+    def release_heavy(self) -> None:
+        """Release a slot taken with `try_acquire_heavy`"""
+        with self._lock:
+            self._heavy_running -= 1
+
+    @staticmethod
+    def retry_after_header(seconds: float) -> str:
+        """Retry-After value for a delay in seconds (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(seconds)))
+
+    def stats(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get limits and admission counts.
+
+        Args:
+            user_id: Also report this user's remaining tokens
+
+        Returns:
+            Dictionary with the configuration, running expensive requests and
+            admitted, rate-limited and overloaded counts by endpoint
+        """
+        with self._lock:
+            stats = {
+                "ratePerSecond": self.rate,
+                "burst": self.burst,
+                "maxHeavy": self.max_heavy,
+                "heavyRunning": self._heavy_running,
+                "endpointCosts": dict(self.endpoint_costs),
+                "admitted": dict(self.admitted),
+                "rateLimited": dict(self.rate_limited),
+                "overloaded": dict(self.overloaded)
+            }
+            bucket = self._buckets.get(user_id) if user_id else None
+            if bucket is not None:
+                elapsed = time.monotonic() - bucket.updated_at
+                stats["tokens"] = min(bucket.capacity, bucket.tokens + elapsed * bucket.rate)
+            return stats
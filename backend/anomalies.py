@@ -0,0 +1,353 @@
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+# Expenses needed in a category or at a merchant before it is used for scoring
+MIN_HISTORY = 10
+
+# An expense is flagged when it is this many standard deviations above the mean...
+Z_THRESHOLD = 4.0
+
+# ...or this many times the 95th percentile of its category
+P95_RATIO_THRESHOLD = 3.0
+
+# Flagged expenses kept per user for polling
+MAX_FLAGGED = 200
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error.
+
+    Positive amounts are counted in logarithmic buckets, so any quantile is
+    within `relative_accuracy` of the true value and memory grows with the
+    range of amounts rather than their number. Adding a value is O(1).
+    """
+
+    __slots__ = ("relative_accuracy", "gamma", "_log_gamma", "bins", "zero_count", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Add one value to the sketch"""
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def bucket_indexes(self, values: np.ndarray) -> np.ndarray:
+        """Bucket index of each positive value, for adding many values at once"""
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def add_counts(self, indexes: np.ndarray, counts: np.ndarray, zero_count: int = 0) -> None:
+        """
+        Add pre-bucketed values to the sketch.
+
+        Args:
+            indexes: Bucket indexes from `bucket_indexes`
+            counts: Number of values in each bucket
+            zero_count: Number of zero or negative values
+        """
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += zero_count
+        self.count += int(counts.sum()) + zero_count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            The estimated value, or None for an empty sketch
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class AmountProfile:
+    """
+    Running statistics of the expense amounts in one group (Welford's method).
+    """
+
+    __slots__ = ("count", "mean", "m2", "sketch")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.sketch = QuantileSketch()
+
+    def update(self, amount: float) -> None:
+        """Add one amount in O(1)"""
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.sketch.add(amount)
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def zscore(self, amount: float) -> Optional[float]:
+        """Standard deviations above the mean, or None without enough history"""
+        if self.count < MIN_HISTORY or self.std == 0:
+            return None
+        return (amount - self.mean) / self.std
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of the profile"""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "median": self.sketch.quantile(0.5),
+            "p95": self.sketch.quantile(0.95)
+        }
+
+
+@dataclass(frozen=True)
+class FlaggedExpense:
+    """
+    An expense that was unusually large for its category or merchant.
+    """
+    id: int
+    date: str
+    amount: float
+    category: str
+    merchant: Optional[str]
+    score: float
+    reasons: List[str] = field(default_factory=list)
+    flagged_at: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the flagged expense to a JSON-serializable dictionary"""
+        return asdict(self)
+
+
+class AnomalyDetector:
+    """
+    Scores each new expense against online statistics of the user's history.
+
+    Amount profiles are kept per category and per merchant. A new expense is
+    scored against its profiles before being added to them, so scoring and
+    updating are both O(1) and history is never rescanned.
+    """
+
+    def __init__(self, previous: Optional["AnomalyDetector"] = None):
+        """
+        Initialize an empty detector.
+
+        Args:
+            previous: Detector being replaced; its flagged expenses stay pollable and ids keep increasing
+        """
+        self.by_category: Dict[str, AmountProfile] = {}
+        self.by_merchant: Dict[str, AmountProfile] = {}
+        self._lock = threading.Lock()
+        self._next_id = previous._next_id if previous else 1
+        self._flagged: deque = deque(previous._flagged if previous else (), maxlen=MAX_FLAGGED)
+
+    @classmethod
+    def from_frame(cls, expenses: pd.DataFrame, previous: Optional["AnomalyDetector"] = None) -> "AnomalyDetector":
+        """
+        Build the statistics over existing history in one vectorized pass.
+
+        Args:
+            expenses: DataFrame with 'amount', 'category' and 'merchant' columns
+            previous: Detector being replaced, whose flagged expenses are carried over
+
+        Returns:
+            An AnomalyDetector with backfilled profiles and nothing newly flagged
+        """
+        detector = cls(previous)
+        if not len(expenses):
+            return detector
+
+        amounts = expenses['amount'].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(amounts)
+        positive = valid & (amounts > 0)
+        indexes = np.zeros(len(amounts), dtype=np.int64)
+        indexes[positive] = QuantileSketch().bucket_indexes(amounts[positive])
+
+        for column, profiles in (('category', detector.by_category), ('merchant', detector.by_merchant)):
+            if column not in expenses.columns:
+                continue
+            codes, names = pd.factorize(expenses[column])
+            grouped = valid & (codes >= 0)
+            if not grouped.any():
+                continue
+
+            # Count, mean and sum of squared deviations per group
+            group_codes, group_amounts = codes[grouped], amounts[grouped]
+            counts = np.bincount(group_codes, minlength=len(names))
+            sums = np.bincount(group_codes, weights=group_amounts, minlength=len(names))
+            means = np.divide(sums, counts, out=np.zeros(len(names)), where=counts > 0)
+            m2 = np.bincount(group_codes, weights=(group_amounts - means[group_codes]) ** 2, minlength=len(names))
+
+            # Sketch buckets per group, from one sorted unique over (group, bucket) pairs
+            in_sketch = positive[grouped]
+            lowest = int(indexes[positive].min()) if positive.any() else 0
+            span = int(indexes[positive].max()) - lowest + 1 if positive.any() else 1
+            pairs = group_codes[in_sketch] * span + (indexes[grouped][in_sketch] - lowest)
+            pair_keys, pair_counts = np.unique(pairs, return_counts=True)
+            bounds = np.searchsorted(pair_keys // span, np.arange(len(names) + 1))
+            zero_counts = np.bincount(group_codes[~in_sketch], minlength=len(names))
+
+            for code, name in enumerate(names):
+                if not counts[code]:
+                    continue
+                profile = profiles[name] = AmountProfile(int(counts[code]), float(means[code]), float(m2[code]))
+                start, stop = bounds[code], bounds[code + 1]
+                profile.sketch.add_counts(
+                    pair_keys[start:stop] % span + lowest, pair_counts[start:stop], int(zero_counts[code])
+                )
+        return detector
+
+    def score(self, amount: float, category: Any, merchant: Any = None) -> Tuple[float, List[str]]:
+        """
+        Score an expense against the current profiles without recording it.
+
+        Args:
+            amount: Expense amount
+            category: Expense category
+            merchant: Merchant name (may be missing)
+
+        Returns:
+            Tuple of (highest z-score, reasons it is unusual; empty if it isn't)
+        """
+        score, reasons = 0.0, []
+        category_profile = self.by_category.get(category)
+        if category_profile is not None:
+            z = category_profile.zscore(amount)
+            if z is not None:
+                score = max(score, z)
+                if z >= Z_THRESHOLD:
+                    reasons.append(f"{z:.1f} standard deviations above the usual {category} expense")
+            p95 = category_profile.sketch.quantile(0.95) if category_profile.count >= MIN_HISTORY else None
+            if p95 and amount >= P95_RATIO_THRESHOLD * p95:
+                reasons.append(f"{amount / p95:.1f}x the 95th percentile for {category}")
+
+        merchant_profile = self.by_merchant.get(merchant) if not pd.isna(merchant) else None
+        if merchant_profile is not None:
+            z = merchant_profile.zscore(amount)
+            if z is not None:
+                score = max(score, z)
+                if z >= Z_THRESHOLD:
+                    reasons.append(f"{z:.1f} standard deviations above the usual charge at {merchant}")
+
+        return score, reasons
+
+    def observe(self, date: Any, amount: float, category: Any, merchant: Any = None) -> Optional[FlaggedExpense]:
+        """
+        Score a new expense, then add it to its profiles.
+
+        Args:
+            date: Expense date
+            amount: Expense amount
+            category: Expense category
+            merchant: Merchant name (may be missing)
+
+        Returns:
+            The flagged expense if it was unusual, otherwise None
+        """
+        if pd.isna(amount):
+            return None
+        amount = float(amount)
+        with self._lock:
+            score, reasons = self.score(amount, category, merchant)
+
+            if not pd.isna(category):
+                self.by_category.setdefault(category, AmountProfile()).update(amount)
+            if not pd.isna(merchant):
+                self.by_merchant.setdefault(merchant, AmountProfile()).update(amount)
+
+            if not reasons:
+                return None
+            flagged = FlaggedExpense(
+                id=self._next_id,
+                date=str(pd.Timestamp(date).date()) if not pd.isna(date) else "",
+                amount=amount,
+                category=category,
+                merchant=None if pd.isna(merchant) else merchant,
+                score=score,
+                reasons=reasons,
+                flagged_at=datetime.now().isoformat()
+            )
+            self._next_id += 1
+            self._flagged.append(flagged)
+            return flagged
+
+    def flagged_since(self, after_id: int = 0) -> List[FlaggedExpense]:
+        """
+        Get expenses flagged after a given one.
+
+        Args:
+            after_id: Id of the last flagged expense the caller has seen (0 for all)
+
+        Returns:
+            Newer flagged expenses, oldest first
+        """
+        with self._lock:
+            return [flagged for flagged in self._flagged if flagged.id > after_id]
+
+    def scan(self, expenses: pd.DataFrame) -> pd.DataFrame:
+        """
+        Find unusual expenses in existing history with vectorized z-scores.
+
+        Unlike `observe`, each expense is compared with statistics that
+        include it, so this is for reviewing history rather than live alerts.
+
+        Args:
+            expenses: DataFrame with 'amount' and 'category' columns
+
+        Returns:
+            The unusual rows with a 'score' column, highest score first
+        """
+        if not len(expenses):
+            return expenses.assign(score=pd.Series(dtype=np.float64))
+        stats = pd.DataFrame(
+            [(name, p.mean, p.std, p.count) for name, p in self.by_category.items()],
+            columns=['category', 'mean', 'std', 'count']
+        ).set_index('category')
+        aligned = stats.reindex(expenses['category'])
+        usable = (aligned['count'].to_numpy() >= MIN_HISTORY) & (aligned['std'].to_numpy() > 0)
+        scores = np.where(
+            usable,
+            (expenses['amount'].to_numpy() - aligned['mean'].to_numpy()) / np.where(usable, aligned['std'].to_numpy(), 1),
+            0.0
+        )
+        flagged = expenses.assign(score=scores)[scores >= Z_THRESHOLD]
+        return flagged.sort_values('score', ascending=False)
@@ -1,15 +1,35 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 import os
+import threading
+import time
+import asyncio
+import base64
+import hashlib
 import jwt
 from finance_analyzer import FinanceAnalyzer
 from chatbot import FinanceChatbot
+from batch_jobs import load_precomputed
+from background import RecomputeScheduler, WarmPool
+from admission import AdmissionController
+from singleflight import SingleFlight
+from charts import ChartService, CHART_KINDS, MEDIA_TYPES
+from export import EXPORT_FORMATS, iter_export
+from categorizer import CategoryIndex
+from live import LiveUpdates
+from currency import FxRates
+
+# Derived frames share memory with their parent until written to, so read
+# paths never need defensive copies. Set here for the server process rather
+# than on import of the analyzer, which other programs import too
+pd.set_option('mode.copy_on_write', True)
 
 # Initialize FastAPI app
 app = FastAPI(title="Chaser AI API", description="API for AI-powered finance management")
@@ -41,6 +61,17 @@ users_db = {
 # Initialize finance analyzers for users
 finance_analyzers = {}
 chatbots = {}
+analyzers_lock = threading.Lock()  # Guards the per-user lock table, lookups are lock-free
+user_load_locks: Dict[str, threading.Lock] = {}
+
+# Merchant categories learned from every loaded user, behind each user's own
+global_categories = CategoryIndex()
+
+# Exchange rates every analyzer converts with, from CHASER_FX_RATES_FILE when set
+fx_rates = FxRates.load()
+
+# Dashboard payloads keyed by user, valid for one data version and day
+dashboard_cache = {}
 
 # Pydantic models
 class User(BaseModel):
@@ -56,22 +87,37 @@ class TokenData(BaseModel):
 
 class Expense(BaseModel):
     amount: float
-    category: str
+    category: Optional[str] = None  # categorized from the merchant when omitted
     description: str
     date: str
     merchant: Optional[str] = None
+    currency: Optional[str] = None  # the user's base currency when omitted
 
 class Income(BaseModel):
     amount: float
     source: str
     description: str
     date: str
+    currency: Optional[str] = None
+
+class BaseCurrency(BaseModel):
+    currency: str
+
+class CategorizeRequest(BaseModel):
+    merchant: str
+    description: Optional[str] = None
+
+class CategoryCorrection(BaseModel):
+    merchant: str
+    category: str
+    previous: Optional[str] = None
 
 class ChatMessage(BaseModel):
     message: str
 
 class ChatResponse(BaseModel):
     response: str
+    chart: Optional[str] = None  # data URI of a chart illustrating the answer
 
 # Authentication functions
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -103,17 +149,109 @@ async def get_current_user(token: str = Depends(lambda x: x.headers.get("Authori
     # For now, we'll just return the user_id
     return token_data.user_id
 
+# Load a user's analyzer once; users load in parallel, each behind their own lock
+def load_finance_analyzer(user_id: str) -> FinanceAnalyzer:
+    analyzer = finance_analyzers.get(user_id)
+    if analyzer is None:
+        with analyzers_lock:
+            user_lock = user_load_locks.setdefault(user_id, threading.Lock())
+        with user_lock:
+            analyzer = finance_analyzers.get(user_id)
+            if analyzer is None:
+                analyzer = FinanceAnalyzer(user_id, global_categories, fx_rates)
+                analyzer.load_data()
+                global_categories.add_frame(analyzer.expenses)
+                finance_analyzers[user_id] = analyzer
+    return analyzer
+
+# Per-user rate limits weighted by endpoint cost, and a cap on concurrent expensive requests
+admission = AdmissionController.from_env()
+
+# Weak ETag for a read: the same user, route, parameters, data version and day give the same body
+def data_etag(user_id: str, request: Request) -> str:
+    version = get_finance_analyzer(user_id).snapshot().version
+    params = sorted(request.query_params.multi_items())
+    key = f"{user_id}|{request.url.path}|{params}|{version}|{datetime.now().date()}"
+    return 'W/"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/ prefixes are ignored
+    return "*" in tags or etag[2:] in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+# Answer an unchanged conditional GET with 304, otherwise tag the response
+def check_etag(user_id: str, request: Request, response: Response) -> None:
+    tag = data_etag(user_id, request)
+    if etag_matches(request.headers.get("If-None-Match"), tag):
+        raise HTTPException(status_code=304, headers={"ETag": tag})
+    request.state.etag = tag
+    response.headers["ETag"] = tag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+def admit(endpoint: str, heavy: bool = False, etag: bool = False):
+    # Dependency that authenticates the user, answers unchanged conditional GETs
+    # with 304 and sheds load, all before any work is done
+    async def admitted_user(request: Request, response: Response, user_id: str = Depends(get_current_user)):
+        conditional = etag and request.method == "GET"
+        loaded = user_id in finance_analyzers
+        if conditional and loaded:
+            # Free for the client: no tokens are taken for an unchanged response
+            check_etag(user_id, request, response)
+        
+        retry_after = admission.check_rate(user_id, endpoint)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": admission.retry_after_header(retry_after)}
+            )
+        
+        # Reject at once rather than queue when every slot is busy
+        if heavy and not admission.try_acquire_heavy(endpoint):
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+        try:
+            if not loaded:
+                # Only admitted requests pay for loading a cold user
+                await ensure_finance_analyzer(user_id)
+                if conditional:
+                    check_etag(user_id, request, response)
+            yield user_id
+        finally:
+            if heavy:
+                admission.release_heavy()
+    
+    return admitted_user
+
+# Concurrent identical requests share one computation
+single_flight = SingleFlight()
+
+async def coalesced(user_id: str, route: str, params: tuple, compute, *args):
+    version = get_finance_analyzer(user_id).snapshot().version
+    return await single_flight.do((user_id, route, params, version), compute, *args)
+
 # Helper function to get or create finance analyzer for a user
 def get_finance_analyzer(user_id: str) -> FinanceAnalyzer:
-    if user_id not in finance_analyzers:
-        finance_analyzers[user_id] = FinanceAnalyzer(user_id)
-        finance_analyzers[user_id].load_data()
-    return finance_analyzers[user_id]
+    analyzer = finance_analyzers.get(user_id)
+    if analyzer is None:
+        # A request for a user that is not warm yet takes priority over the warm pool
+        with warm_pool.live_request():
+            analyzer = load_finance_analyzer(user_id)
+    return analyzer
+
+# Load a cold user off the event loop: waiting for a warm-up that holds the user's
+# load lock must not stall every other user's requests
+async def ensure_finance_analyzer(user_id: str) -> FinanceAnalyzer:
+    analyzer = finance_analyzers.get(user_id)
+    if analyzer is None:
+        analyzer = await asyncio.to_thread(get_finance_analyzer, user_id)
+    return analyzer
 
 # Helper function to get or create chatbot for a user
 def get_chatbot(user_id: str) -> FinanceChatbot:
     if user_id not in chatbots:
-        chatbots[user_id] = FinanceChatbot(user_id)
+        chatbots[user_id] = FinanceChatbot(user_id, get_finance_analyzer(user_id))
     return chatbots[user_id]
 
 # Routes
@@ -133,39 +271,38 @@ async def login(user: User):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/api/dashboard")
-async def get_dashboard_data(user_id: str = Depends(get_current_user)):
-    analyzer = get_finance_analyzer(user_id)
+# Helper function to build the dashboard payload for the analyzer's current version
+def build_dashboard_payload(analyzer: FinanceAnalyzer) -> Dict[str, Any]:
+    version = analyzer.snapshot().version
     
     # Get current date and date 3 months ago
     end_date = datetime.now()
     start_date = end_date - timedelta(days=90)
     
-    # Get expenses by category
-    expenses_by_category = analyzer.analyze_expenses_by_category(
+    # Reuse the payload if nothing changed since it was built
+    cache_key = (version, end_date.date())
+    cached = dashboard_cache.get(analyzer.user_id)
+    if cached is not None and cached[0] == cache_key:
+        return cached[1]
+    
+    # Build every dashboard figure in a single pass
+    snapshot = analyzer.get_dashboard_snapshot(
         start_date=start_date.strftime("%Y-%m-%d"),
-        end_date=end_date.strftime("%Y-%m-%d")
+        end_date=end_date.strftime("%Y-%m-%d"),
+        top_n=5,
+        recent_n=10
     )
-    
-    # Get expenses over time
-    expenses_over_time = analyzer.analyze_expenses_over_time(frequency="W")
-    
-    # Get income vs expenses
-    income_vs_expenses = analyzer.analyze_income_vs_expenses(frequency="M")
-    
-    # Get top merchants
-    top_merchants = analyzer.get_top_merchants(n=5)
-    
-    # Generate budget recommendations
-    budget_recommendations = analyzer.generate_budget_recommendations()
+    income_vs_expenses = snapshot.income_vs_expenses
     
     # Calculate total balance, income, and expenses
-    total_income = analyzer.income['amount'].sum()
-    total_expenses = analyzer.expenses['amount'].sum()
+    total_income = snapshot.total_income
+    total_expenses = snapshot.total_expenses
     total_balance = total_income - total_expenses
     
     # Format data for frontend
     dashboard_data = {
+        "version": version,  # matches the id of live update events
+        "currency": analyzer.base_currency,
         "totalBalance": float(total_balance),
         "balanceChange": 5.2,  # Mock data, would be calculated from historical data
         "income": float(total_income),
@@ -196,102 +333,336 @@ async def get_dashboard_data(user_id: str = Depends(get_current_user)):
                 "value": float(amount),
                 "color": get_color_for_category(category)
             }
-            for category, amount in expenses_by_category.items()
+            for category, amount in snapshot.expenses_by_category.items()
         ],
         
         # Format recent transactions
         "recentTransactions": [
-            {
-                "id": str(i),
-                "description": row['description'],
-                "amount": float(row['amount']),
-                "date": row['date'].strftime("%Y-%m-%d") if isinstance(row['date'], pd.Timestamp) else row['date'],
-                "category": row['category'],
-                "type": "expense",
-                "merchant": {
-                    "name": row['merchant'],
-                    "logo": "/placeholder.svg?height=36&width=36"
-                }
-            }
-            for i, row in analyzer.expenses.sort_values('date', ascending=False).head(10).iterrows()
+            format_transaction(row['id'], row) for _, row in snapshot.recent_transactions.iterrows()
         ]
     }
     
+    dashboard_cache[analyzer.user_id] = (cache_key, dashboard_data)
     return dashboard_data
 
+def format_transaction(transaction_id: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(transaction_id),
+        "description": row['description'],
+        "amount": float(row['amount']),
+        "date": row['date'].strftime("%Y-%m-%d") if isinstance(row['date'], pd.Timestamp) else row['date'],
+        "category": row['category'],
+        "type": "expense",
+        "merchant": {
+            "name": row['merchant'],
+            "logo": "/placeholder.svg?height=36&width=36"
+        }
+    }
+
+# Connected live-dashboard clients, sent a delta per write instead of polling
+live_updates = LiveUpdates(keepalive=float(os.environ.get("CHASER_LIVE_KEEPALIVE_SECONDS", "15")))
+
+# Dashboard figures a write changed, read off the indexes in O(log n) instead of rebuilding the dashboard
+def dashboard_delta(analyzer: FinanceAnalyzer, version: int, expense: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    snapshot = analyzer.snapshot()
+    if snapshot.version != version:
+        # Another write landed in between; the client refetches instead
+        return None
+    
+    total_income = snapshot.partitions.income_total()
+    total_expenses = snapshot.ledger.overall.total
+    delta = {
+        "version": version,
+        "totalBalance": total_income - total_expenses,
+        "income": total_income,
+        "expenses": total_expenses
+    }
+    
+    if expense is not None:
+        # Same 90-day window as the dashboard's category breakdown
+        category = expense['category']
+        start_date = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
+        row_id = len(snapshot.expenses) - 1
+        delta["category"] = {
+            "name": category,
+            "value": analyzer.total_between(start_date, datetime.now().strftime("%Y-%m-%d"), category),
+            "color": get_color_for_category(category)
+        }
+        # The stored row, in the base currency, not the request as posted
+        row = snapshot.expenses.iloc[row_id]
+        delta["transaction"] = format_transaction(row['id'], row)
+        delta["recent"] = bool(row_id in snapshot.ledger.latest_rows(10))
+    return delta
+
+# Id a write was stored under (None if another write has landed since)
+def stored_id(analyzer: FinanceAnalyzer, version: int, kind: str) -> Optional[int]:
+    snapshot = analyzer.snapshot()
+    if snapshot.version != version:
+        return None
+    frame = snapshot.expenses if kind == "expense" else snapshot.income
+    return int(frame['id'].iat[-1])
+
+def publish_write(user_id: str, analyzer: FinanceAnalyzer, version: int, event: str,
+                  expense: Optional[Dict[str, Any]] = None) -> None:
+    if not live_updates.has_subscribers(user_id):
+        return
+    delta = dashboard_delta(analyzer, version, expense)
+    if delta is None:
+        live_updates.publish(user_id, "resync", {})
+    else:
+        live_updates.publish(user_id, event, delta)
+
+# Rebuild a user's derived data off the request path (runs in a worker thread)
+def warm_user_caches(user_id: str) -> None:
+    analyzer = load_finance_analyzer(user_id)
+    analyzer.forecast_expenses()
+    build_dashboard_payload(analyzer)
+
+recompute_scheduler = RecomputeScheduler(
+    warm_user_caches,
+    quiet_period=float(os.environ.get("CHASER_RECOMPUTE_QUIET_SECONDS", "2.0")),
+    max_concurrency=int(os.environ.get("CHASER_RECOMPUTE_CONCURRENCY", "2"))
+)
+
+# Optional startup warm-up of recently active users, read from (and saved back to) this file
+WARM_USERS_FILE = os.environ.get("CHASER_WARM_USERS_FILE")
+
+warm_pool = WarmPool(
+    warm_user_caches,
+    lambda user_id: user_id in finance_analyzers,
+    concurrency=int(os.environ.get("CHASER_WARM_CONCURRENCY", "4"))
+)
+
+def read_warm_users() -> List[str]:
+    if not WARM_USERS_FILE or not os.path.exists(WARM_USERS_FILE):
+        return []
+    with open(WARM_USERS_FILE) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def save_warm_users() -> None:
+    if not WARM_USERS_FILE:
+        return
+    users = recompute_scheduler.recent_users()
+    if not users:
+        return
+    tmp_path = f"{WARM_USERS_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write("".join(f"{user_id}\n" for user_id in users))
+    os.replace(tmp_path, WARM_USERS_FILE)
+
+# Charts render in worker processes and are cached per data version
+chart_service = ChartService(
+    max_workers=int(os.environ.get("CHASER_CHART_WORKERS", "2")),
+    cache_size=int(os.environ.get("CHASER_CHART_CACHE_SIZE", "256"))
+)
+
+# Readiness: set once the analysis fast path has been exercised after startup
+app_ready = threading.Event()
+startup_info: Dict[str, Any] = {"startedAt": time.monotonic(), "warmupSeconds": None, "warmupError": None}
+startup_tasks: Set[asyncio.Task] = set()
+
+# Run every first-use code path once on throwaway data so the first real request is not a cold one
+def warm_up_fast_path() -> None:
+    start = time.perf_counter()
+    try:
+        analyzer = FinanceAnalyzer("__warmup__")
+        analyzer.load_data()
+        analyzer.get_dashboard_snapshot(None, None)
+        analyzer.forecast_expenses()
+    except Exception as e:
+        # Warm-up only saves the first requests some latency; a failure must not keep the instance out of rotation
+        print(f"Error warming up: {e}")
+        startup_info["warmupError"] = str(e)
+    startup_info["warmupSeconds"] = time.perf_counter() - start
+    app_ready.set()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    recompute_scheduler.start()
+    # Don't hold up startup; the readiness endpoint reports when warm-up is done
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(warm_up_fast_path))
+    startup_tasks.add(task)
+    task.add_done_callback(startup_tasks.discard)
+    warm_pool.start(read_warm_users())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await warm_pool.stop()
+    await recompute_scheduler.stop()
+    chart_service.shutdown()
+    try:
+        save_warm_users()
+    except OSError as e:
+        print(f"Error saving warm users: {e}")
+
+@app.get("/api/health")
+async def health_check():
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+async def readiness_check():
+    if not app_ready.is_set():
+        raise HTTPException(status_code=503, detail="Warming up", headers={"Retry-After": "1"})
+    return {
+        "status": "ready",
+        "warmupSeconds": startup_info["warmupSeconds"],
+        "warmupError": startup_info["warmupError"],
+        "uptimeSeconds": time.monotonic() - startup_info["startedAt"],
+        "warmPool": warm_pool.stats()
+    }
+
+@app.get("/api/admission/status")
+async def get_admission_status(user_id: str = Depends(get_current_user)):
+    return admission.stats(user_id)
+
+@app.get("/api/dashboard")
+async def get_dashboard_data(user_id: str = Depends(admit("dashboard", heavy=True, etag=True))):
+    analyzer = get_finance_analyzer(user_id)
+    recompute_scheduler.touch(user_id)
+    
+    # Usually served warm from the background rebuild
+    return await coalesced(user_id, "dashboard", (), build_dashboard_payload, analyzer)
+
+@app.get("/api/dashboard/live")
+async def get_dashboard_live(user_id: str = Depends(admit("dashboard-live"))):
+    analyzer = get_finance_analyzer(user_id)
+    
+    # Deltas as Server-Sent Events; the first event carries the current version so
+    # the client can tell whether the dashboard it already has is current
+    return StreamingResponse(
+        live_updates.stream(user_id, ("ready", {"version": analyzer.snapshot().version})),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/background/status")
+async def get_background_status(user_id: str = Depends(admit("background-status"))):
+    return {
+        **recompute_scheduler.stats(),
+        "warmPool": warm_pool.stats(),
+        "singleFlight": single_flight.stats(),
+        "live": live_updates.stats()
+    }
+
 @app.get("/api/expenses")
 async def get_expenses(
-    user_id: str = Depends(get_current_user),
+    user_id: str = Depends(admit("expenses", etag=True)),
     category: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
 ):
-    analyzer = get_finance_analyzer(user_id)
-    
-    # Filter expenses
-    filtered_expenses = analyzer.expenses.copy()
-    
-    if category:
-        filtered_expenses = filtered_expenses[filtered_expenses['category'] == category]
-    
-    if start_date:
-        filtered_expenses = filtered_expenses[pd.to_datetime(filtered_expenses['date']) >= pd.to_datetime(start_date)]
-    
-    if end_date:
-        filtered_expenses = filtered_expenses[pd.to_datetime(filtered_expenses['date']) <= pd.to_datetime(end_date)]
+    def compute():
+        # Filter expenses: the ledger locates the matching rows, so only the result is materialized
+        filtered_expenses = get_finance_analyzer(user_id).filter_expenses(start_date, end_date, category)
+        
+        # Calculate total
+        total = filtered_expenses['amount'].sum()
+        
+        # Group by category
+        by_category = filtered_expenses.groupby('category')['amount'].agg(['sum', 'count']).reset_index()
+        by_category.columns = ['category', 'total', 'count']
+        
+        return {
+            "expenses": filtered_expenses.to_dict(orient='records'),
+            "total": float(total),
+            "byCategory": by_category.to_dict(orient='records')
+        }
     
-    # Calculate total
-    total = filtered_expenses['amount'].sum()
+    return await coalesced(user_id, "expenses", (category, start_date, end_date), compute)
+
+@app.get("/api/expenses/search")
+async def search_expenses(
+    q: str,
+    user_id: str = Depends(admit("expenses-search", etag=True)),
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20
+):
+    if page < 1 or not 1 <= page_size <= 100:
+        raise HTTPException(status_code=400, detail="page must be at least 1 and page_size between 1 and 100")
     
-    # Group by category
-    by_category = filtered_expenses.groupby('category')['amount'].agg(['sum', 'count']).reset_index()
-    by_category.columns = ['category', 'total', 'count']
+    def compute():
+        # The inverted index finds the candidates; only the requested page is materialized
+        results, total = get_finance_analyzer(user_id).search_expenses(
+            q, start_date=start_date, end_date=end_date, category=category, page=page, page_size=page_size
+        )
+        
+        return {
+            "expenses": results.to_dict(orient='records'),
+            "total": total,
+            "page": page,
+            "pageSize": page_size
+        }
     
-    return {
-        "expenses": filtered_expenses.to_dict(orient='records'),
-        "total": float(total),
-        "byCategory": by_category.to_dict(orient='records')
-    }
+    return await coalesced(user_id, "expenses-search", (q, category, start_date, end_date, page, page_size), compute)
 
 @app.post("/api/expenses")
-async def add_expense(expense: Expense, user_id: str = Depends(get_current_user)):
+async def add_expense(expense: Expense, user_id: str = Depends(admit("add-expense"))):
     analyzer = get_finance_analyzer(user_id)
+    check_currency(analyzer, expense.currency)
     
-    # Create new expense
+    # Create new expense, categorizing it when the client didn't
+    merchant = expense.merchant or "Unknown"
     new_expense = {
         'date': pd.to_datetime(expense.date),
         'amount': expense.amount,
-        'category': expense.category,
+        'currency': expense.currency,
+        'category': expense.category or analyzer.categorize_expense(merchant, expense.description),
         'description': expense.description,
-        'merchant': expense.merchant or "Unknown",
+        'merchant': merchant,
         'user_id': user_id
     }
     
-    # Add to expenses DataFrame
-    analyzer.expenses = pd.concat([analyzer.expenses, pd.DataFrame([new_expense])], ignore_index=True)
+    # Add to expenses DataFrame and the date-range index; only client categories are learned
+    version = analyzer.add_expense(new_expense, learn_category=expense.category is not None)
+    recompute_scheduler.mark_dirty(user_id)
+    publish_write(user_id, analyzer, version, "expense", new_expense)
+    new_expense['id'] = stored_id(analyzer, version, "expense")
+    
+    return {"success": True, "expense": new_expense, "version": version}
+
+@app.post("/api/expenses/categorize")
+async def categorize_expenses(requests: List[CategorizeRequest], user_id: str = Depends(admit("categorize"))):
+    analyzer = get_finance_analyzer(user_id)
+    
+    # Suggestions for imported rows, from the user's own labels first
+    return {
+        "categories": [analyzer.categorize_expense(item.merchant, item.description) for item in requests]
+    }
+
+@app.post("/api/categories/corrections")
+async def correct_category(correction: CategoryCorrection, user_id: str = Depends(admit("category-correction"))):
+    analyzer = get_finance_analyzer(user_id)
+    
+    # Future expenses from this merchant get the corrected category
+    analyzer.correct_category(correction.merchant, correction.category, correction.previous)
     
-    return {"success": True, "expense": new_expense}
+    return {"success": True, "merchant": correction.merchant, "category": correction.category}
 
 @app.get("/api/income")
 async def get_income(
-    user_id: str = Depends(get_current_user),
+    user_id: str = Depends(admit("income", etag=True)),
     source: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
 ):
-    analyzer = get_finance_analyzer(user_id)
+    income_df = get_finance_analyzer(user_id).income
     
-    # Filter income
-    filtered_income = analyzer.income.copy()
+    # Filter income with a single mask over the pinned version, no defensive copy
+    mask = np.ones(len(income_df), dtype=bool)
     
     if source:
-        filtered_income = filtered_income[filtered_income['source'] == source]
+        mask &= (income_df['source'] == source).to_numpy()
     
     if start_date:
-        filtered_income = filtered_income[pd.to_datetime(filtered_income['date']) >= pd.to_datetime(start_date)]
+        mask &= (income_df['date'] >= pd.to_datetime(start_date)).to_numpy()
     
     if end_date:
-        filtered_income = filtered_income[pd.to_datetime(filtered_income['date']) <= pd.to_datetime(end_date)]
+        mask &= (income_df['date'] <= pd.to_datetime(end_date)).to_numpy()
+    
+    filtered_income = income_df[mask]
     
     # Calculate total
     total = filtered_income['amount'].sum()
@@ -307,150 +678,399 @@ async def get_income(
     }
 
 @app.post("/api/income")
-async def add_income(income: Income, user_id: str = Depends(get_current_user)):
+async def add_income(income: Income, user_id: str = Depends(admit("add-income"))):
     analyzer = get_finance_analyzer(user_id)
+    check_currency(analyzer, income.currency)
     
     # Create new income
     new_income = {
         'date': pd.to_datetime(income.date),
         'amount': income.amount,
+        'currency': income.currency,
         'source': income.source,
         'description': income.description,
         'user_id': user_id
     }
     
     # Add to income DataFrame
-    analyzer.income = pd.concat([analyzer.income, pd.DataFrame([new_income])], ignore_index=True)
+    version = analyzer.add_income(new_income)
+    recompute_scheduler.mark_dirty(user_id)
+    publish_write(user_id, analyzer, version, "income")
+    new_income['id'] = stored_id(analyzer, version, "income")
     
-    return {"success": True, "income": new_income}
+    return {"success": True, "income": new_income, "version": version}
 
-@app.get("/api/budget")
-async def get_budget(user_id: str = Depends(get_current_user)):
+@app.put("/api/expenses/{transaction_id}")
+async def update_expense(transaction_id: int, expense: Expense, user_id: str = Depends(admit("edit-expense"))):
     analyzer = get_finance_analyzer(user_id)
+    check_currency(analyzer, expense.currency)
     
-    # Get budget recommendations
-    budget_recommendations = analyzer.generate_budget_recommendations()
+    # The edited expense is stored under a new id and the old one gets a tombstone
+    version = analyzer.replace_transaction("expense", transaction_id, {
+        'date': expense.date,
+        'amount': expense.amount,
+        'currency': expense.currency,
+        'category': expense.category,
+        'description': expense.description,
+        'merchant': expense.merchant or "Unknown",
+        'user_id': user_id
+    })
+    return finish_rewrite(user_id, analyzer, version, "expense")
+
+@app.delete("/api/expenses/{transaction_id}")
+async def delete_expense(transaction_id: int, user_id: str = Depends(admit("delete-expense"))):
+    analyzer = get_finance_analyzer(user_id)
+    version = analyzer.delete_transaction("expense", transaction_id)
+    return finish_rewrite(user_id, analyzer, version, None)
+
+@app.put("/api/income/{transaction_id}")
+async def update_income(transaction_id: int, income: Income, user_id: str = Depends(admit("edit-income"))):
+    analyzer = get_finance_analyzer(user_id)
+    check_currency(analyzer, income.currency)
+    version = analyzer.replace_transaction("income", transaction_id, {
+        'date': income.date,
+        'amount': income.amount,
+        'currency': income.currency,
+        'source': income.source,
+        'description': income.description,
+        'user_id': user_id
+    })
+    return finish_rewrite(user_id, analyzer, version, "income")
+
+@app.delete("/api/income/{transaction_id}")
+async def delete_income(transaction_id: int, user_id: str = Depends(admit("delete-income"))):
+    analyzer = get_finance_analyzer(user_id)
+    version = analyzer.delete_transaction("income", transaction_id)
+    return finish_rewrite(user_id, analyzer, version, None)
+
+# Common tail of edits and deletes: 404 for unknown ids, then refresh derived data and live clients
+def finish_rewrite(user_id: str, analyzer: FinanceAnalyzer, version: Optional[int], kind: Optional[str]) -> Dict[str, Any]:
+    if version is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    recompute_scheduler.mark_dirty(user_id)
     
-    # Get actual spending by category
-    expenses_by_category = analyzer.analyze_expenses_by_category()
+    # Deltas only describe appends; live clients refetch after a rewrite
+    if live_updates.has_subscribers(user_id):
+        live_updates.publish(user_id, "resync", {"version": version})
     
-    # Calculate monthly spending (assuming 3 months of data)
-    monthly_spending = {category: amount / 3 for category, amount in expenses_by_category.items()}
+    result = {"success": True, "version": version}
+    if kind is not None:
+        result["id"] = stored_id(analyzer, version, kind)
+    return result
+
+# Reject transactions in currencies there are no exchange rates for
+def check_currency(analyzer: FinanceAnalyzer, currency: Optional[str]) -> None:
+    if currency is not None and not analyzer.fx_rates.supports(currency):
+        raise HTTPException(status_code=400, detail=f"Unsupported currency: {currency}")
+
+@app.get("/api/currencies")
+async def get_currencies(user_id: str = Depends(admit("currencies", etag=True))):
+    analyzer = get_finance_analyzer(user_id)
+    return {"base": analyzer.base_currency, "supported": analyzer.fx_rates.currencies}
+
+@app.put("/api/currencies/base")
+async def set_base_currency(base: BaseCurrency, user_id: str = Depends(admit("base-currency", heavy=True))):
+    analyzer = get_finance_analyzer(user_id)
+    check_currency(analyzer, base.currency)
+    
+    # Every amount is reconverted once here, so analyses keep reading plain base-currency columns
+    version = analyzer.set_base_currency(base.currency)
+    recompute_scheduler.mark_dirty(user_id)
+    if live_updates.has_subscribers(user_id):
+        live_updates.publish(user_id, "resync", {"version": version})
+    
+    return {"success": True, "base": analyzer.base_currency, "version": version}
+
+@app.get("/api/sync")
+async def sync_changes(since: int = 0, user_id: str = Depends(admit("sync", etag=True))):
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since must not be negative")
     
-    # Combine budget and actual spending
-    budget_data = []
-    for category, budget_amount in budget_recommendations.items():
-        actual_amount = monthly_spending.get(category, 0)
-        percentage = (actual_amount / budget_amount * 100) if budget_amount > 0 else 0
+    def compute():
+        # Only rows stored after `since`, plus tombstones for removed ones
+        changes = get_finance_analyzer(user_id).changes_since(since)
         
-        budget_data.append({
-            "category": category,
-            "budgeted": float(budget_amount),
-            "actual": float(actual_amount),
-            "percentage": float(percentage)
-        })
+        return {
+            "seq": changes["seq"],
+            "full": changes["full"],
+            "expenses": changes["expenses"].to_dict(orient='records'),
+            "income": changes["income"].to_dict(orient='records'),
+            "tombstones": [tombstone.to_dict() for tombstone in changes["tombstones"]]
+        }
+    
+    return await coalesced(user_id, "sync", (since,), compute)
+
+@app.get("/api/budget")
+async def get_budget(user_id: str = Depends(admit("budget", etag=True))):
+    tracker = get_finance_analyzer(user_id).budget_tracker()
+    
+    # Month-to-date spending against this month's budget, from the running counters
+    return {"month": tracker.month, "budget": tracker.utilization()}
+
+@app.get("/api/budget/alerts")
+async def get_budget_alerts(user_id: str = Depends(admit("budget-alerts", etag=True)), after: int = 0):
+    alerts = get_finance_analyzer(user_id).budget_alerts(after)
     
-    return {"budget": budget_data}
+    # Clients poll with the last id they have seen
+    return {
+        "alerts": [alert.to_dict() for alert in alerts],
+        "lastId": alerts[-1].id if alerts else after
+    }
 
-@app.post("/api/chat")
-async def chat(message: ChatMessage, user_id: str = Depends(get_current_user)):
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat(message: ChatMessage, user_id: str = Depends(admit("chat", heavy=True))):
     chatbot = get_chatbot(user_id)
     
     # Process message and get response
     response = chatbot.process_message(message.message)
     
-    return {"response": response}
+    # Attach a chart when the user asked to see one
+    chart = None
+    kind = chatbot.chart_for_message(message.message)
+    if kind:
+        image = await chart_service.render(get_finance_analyzer(user_id), kind, "png")
+        chart = "data:image/png;base64," + base64.b64encode(image).decode("ascii")
+    
+    return {"response": response, "chart": chart}
+
+@app.post("/api/chat/stream")
+async def chat_stream(message: ChatMessage, user_id: str = Depends(admit("chat-stream", heavy=True))):
+    chatbot = get_chatbot(user_id)
+    
+    # Send each response section as a Server-Sent Event as soon as it is computed
+    def events():
+        for section in chatbot.stream_message(message.message):
+            yield f"event: section\ndata: {json.dumps({'text': section})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    # Starlette iterates sync generators in a worker thread, off the event loop
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/charts/{kind}")
+async def get_chart(
+    kind: str,
+    request: Request,
+    user_id: str = Depends(admit("charts", heavy=True, etag=True)),
+    format: str = "png",
+    frequency: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+):
+    analyzer = get_finance_analyzer(user_id)
+    params = {"frequency": frequency, "start_date": start_date, "end_date": end_date}
+    
+    if kind not in CHART_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown chart kind: {kind}")
+    
+    try:
+        image = await chart_service.render(analyzer, kind, format, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Returned directly, so the ETag set by the dependency is added here
+    headers = {"ETag": request.state.etag, "Cache-Control": "private, no-cache"}
+    return Response(content=image, media_type=MEDIA_TYPES[format], headers=headers)
+
+@app.get("/api/export")
+async def export_data(user_id: str = Depends(admit("export", heavy=True)), format: str = "ndjson"):
+    analyzer = get_finance_analyzer(user_id)
+    
+    try:
+        chunks = iter_export(analyzer, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Rows are encoded a chunk at a time as the client downloads
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{user_id}-finance.{format}"'}
+    )
 
 @app.get("/api/analysis/expenses-over-time")
 async def get_expenses_over_time(
-    user_id: str = Depends(get_current_user),
+    user_id: str = Depends(admit("expenses-over-time", etag=True)),
     frequency: str = "W"  # D for daily, W for weekly, M for monthly
 ):
     analyzer = get_finance_analyzer(user_id)
     
-    # Get expenses over time
-    expenses_over_time = analyzer.analyze_expenses_over_time(frequency=frequency)
-    
-    # Format for frontend
-    data = [
-        {
-            "date": date.strftime("%Y-%m-%d"),
-            "amount": float(amount)
-        }
-        for date, amount in zip(expenses_over_time['date'], expenses_over_time['amount'])
-    ]
+    def compute():
+        # Get expenses over time
+        expenses_over_time = analyzer.analyze_expenses_over_time(frequency=frequency)
+        
+        # Format for frontend
+        data = [
+            {
+                "date": date.strftime("%Y-%m-%d"),
+                "amount": float(amount)
+            }
+            for date, amount in zip(expenses_over_time['date'], expenses_over_time['amount'])
+        ]
+        
+        return {"data": data}
     
-    return {"data": data}
+    return await coalesced(user_id, "expenses-over-time", (frequency,), compute)
 
 @app.get("/api/analysis/income-vs-expenses")
 async def get_income_vs_expenses(
-    user_id: str = Depends(get_current_user),
+    user_id: str = Depends(admit("income-vs-expenses", etag=True)),
     frequency: str = "M"  # W for weekly, M for monthly
 ):
     analyzer = get_finance_analyzer(user_id)
     
-    # Get income vs expenses
-    income_vs_expenses = analyzer.analyze_income_vs_expenses(frequency=frequency)
-    
-    # Format for frontend
-    data = [
-        {
-            "date": date.strftime("%Y-%m-%d"),
-            "income": float(income) if not pd.isna(income) else 0,
-            "expenses": float(expenses) if not pd.isna(expenses) else 0,
-            "savings": float(savings) if not pd.isna(savings) else 0
-        }
-        for date, income, expenses, savings in zip(
-            income_vs_expenses.index,
-            income_vs_expenses['income'],
-            income_vs_expenses['expenses'],
-            income_vs_expenses['savings']
-        )
-    ]
+    def compute():
+        # Get income vs expenses
+        income_vs_expenses = analyzer.analyze_income_vs_expenses(frequency=frequency)
+        
+        # Format for frontend
+        data = [
+            {
+                "date": date.strftime("%Y-%m-%d"),
+                "income": float(income) if not pd.isna(income) else 0,
+                "expenses": float(expenses) if not pd.isna(expenses) else 0,
+                "savings": float(savings) if not pd.isna(savings) else 0
+            }
+            for date, income, expenses, savings in zip(
+                income_vs_expenses.index,
+                income_vs_expenses['income'],
+                income_vs_expenses['expenses'],
+                income_vs_expenses['savings']
+            )
+        ]
+        
+        return {"data": data}
     
-    return {"data": data}
+    return await coalesced(user_id, "income-vs-expenses", (frequency,), compute)
 
 @app.get("/api/analysis/top-merchants")
 async def get_top_merchants(
-    user_id: str = Depends(get_current_user),
-    n: int = 5
+    user_id: str = Depends(admit("top-merchants", etag=True)),
+    n: int = 5,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
 ):
     analyzer = get_finance_analyzer(user_id)
     
-    # Get top merchants
-    top_merchants = analyzer.get_top_merchants(n=n)
+    def compute():
+        # Get top merchants
+        top_merchants = analyzer.get_top_merchants(n=n, start_date=start_date, end_date=end_date)
+        
+        return {"merchants": top_merchants.to_dict(orient='records')}
+    
+    return await coalesced(user_id, "top-merchants", (n, start_date, end_date), compute)
+
+@app.get("/api/analysis/forecast")
+async def get_forecast(
+    user_id: str = Depends(admit("forecast", heavy=True, etag=True)),
+    horizon: int = 3  # Number of months, starting with the current one
+):
+    analyzer = get_finance_analyzer(user_id)
+    
+    if horizon < 1 or horizon > 24:
+        raise HTTPException(status_code=400, detail="horizon must be between 1 and 24")
+    
+    # Forecast every category in one vectorized fit
+    def compute():
+        return analyzer.forecast_expenses(horizon=horizon).to_dict()
+    
+    return await coalesced(user_id, "forecast", (horizon,), compute)
+
+@app.get("/api/analysis/recurring")
+async def get_recurring_payments(
+    user_id: str = Depends(admit("recurring", etag=True)),
+    active_only: bool = False
+):
+    analyzer = get_finance_analyzer(user_id)
+    
+    def compute():
+        series = analyzer.detect_recurring_payments()
+        if active_only:
+            series = [item for item in series if item.active]
+        
+        return {
+            "data": [item.to_dict() for item in series],
+            "monthlyTotal": float(sum(item.monthly_cost for item in series if item.active))
+        }
+    
+    return await coalesced(user_id, "recurring", (active_only,), compute)
+
+@app.get("/api/analysis/precomputed")
+async def get_precomputed_analysis(user_id: str = Depends(admit("precomputed"))):
+    # Results written by the nightly batch job (batch_jobs.py)
+    results = load_precomputed(user_id)
+    
+    if results is None:
+        raise HTTPException(status_code=404, detail="No precomputed analysis for this user yet")
     
-    return {"merchants": top_merchants.to_dict(orient='records')}
+    return results
 
 @app.get("/api/analysis/category-breakdown")
 async def get_category_breakdown(
-    user_id: str = Depends(get_current_user),
+    user_id: str = Depends(admit("category-breakdown", etag=True)),
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
 ):
     analyzer = get_finance_analyzer(user_id)
     
-    # Get expenses by category
-    expenses_by_category = analyzer.analyze_expenses_by_category(
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    # Calculate total
-    total = sum(expenses_by_category.values())
-    
-    # Format for frontend
-    data = [
-        {
-            "category": category,
-            "amount": float(amount),
-            "percentage": float(amount / total * 100) if total > 0 else 0,
-            "color": get_color_for_category(category)
-        }
-        for category, amount in expenses_by_category.items()
-    ]
+    def compute():
+        # Get expenses by category
+        expenses_by_category = analyzer.analyze_expenses_by_category(
+            start_date=start_date,
+            end_date=end_date
+        )
+        
+        # Calculate total
+        total = sum(expenses_by_category.values())
+        
+        # Format for frontend
+        data = [
+            {
+                "category": category,
+                "amount": float(amount),
+                "percentage": float(amount / total * 100) if total > 0 else 0,
+                "color": get_color_for_category(category)
+            }
+            for category, amount in expenses_by_category.items()
+        ]
+        
+        return {"data": data, "total": float(total)}
     
-    return {"data": data, "total": float(total)}
+    return await coalesced(user_id, "category-breakdown", (start_date, end_date), compute)
+
+@app.get("/api/analysis/anomalies")
+async def get_anomalies(
+    user_id: str = Depends(admit("anomalies", etag=True)),
+    after: int = 0,
+    history: bool = False
+):
+    analyzer = get_finance_analyzer(user_id)
+
+    # New expenses flagged as they were added; clients poll with the last id they have seen
+    flagged = analyzer.flagged_expenses(after)
+    result = {
+        "flagged": [expense.to_dict() for expense in flagged],
+        "lastId": flagged[-1].id if flagged else after
+    }
+
+    # Optionally also review existing history against the same statistics
+    if history:
+        unusual = analyzer.anomaly_detector().scan(analyzer.snapshot().expenses)
+        result["history"] = [
+            {
+                "date": row['date'].strftime('%Y-%m-%d'),
+                "amount": float(row['amount']),
+                "category": row['category'],
+                "merchant": row['merchant'] if not pd.isna(row['merchant']) else None,
+                "score": float(row['score'])
+            }
+            for _, row in unusual.iterrows()
+        ]
+
+    return result
 
 # Helper function to get color for category
 def get_color_for_category(category: str) -> str:
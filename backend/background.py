@@ -0,0 +1,268 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Any
+
+
+class RecomputeScheduler:
+    """
+    Debounced background recomputation of per-user derived data.
+
+    Writes mark a user dirty. Once a user has been quiet for `quiet_period`
+    seconds their caches are rebuilt off the request path, most recently
+    active users first, with at most `max_concurrency` rebuilds at a time.
+    Rebuilds run in worker threads so pandas work never blocks the event loop.
+    """
+
+    def __init__(self, rebuild: Callable[[str], None], quiet_period: float = 2.0,
+                 max_concurrency: int = 2, poll_interval: float = 0.25):
+        """
+        Initialize the scheduler.
+
+        Args:
+            rebuild: Function that rebuilds one user's caches (called in a thread)
+            quiet_period: Seconds without writes before a dirty user is rebuilt
+            max_concurrency: Maximum number of rebuilds running at once
+            poll_interval: Seconds between checks for users that have gone quiet
+        """
+        self.rebuild = rebuild
+        self.quiet_period = quiet_period
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+
+        self._dirty: Dict[str, Dict[str, float]] = {}  # user -> first and last write times
+        self._last_active: Dict[str, float] = {}
+        self._running: Set[str] = set()
+        self._rebuilds: Set[asyncio.Task] = set()  # the loop only keeps weak references to tasks
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.completed = 0
+        self.failed = 0
+
+    def mark_dirty(self, user_id: str) -> None:
+        """
+        Record a write for a user, (re)starting their quiet period.
+
+        Args:
+            user_id: The user whose data changed
+        """
+        now = time.monotonic()
+        entry = self._dirty.setdefault(user_id, {"first_write": now, "last_write": now})
+        entry["last_write"] = now
+        self._last_active[user_id] = now
+
+    def touch(self, user_id: str) -> None:
+        """
+        Record a read, raising the user's rebuild priority.
+
+        Args:
+            user_id: The user who made a request
+        """
+        self._last_active[user_id] = time.monotonic()
+
+    def start(self) -> None:
+        """Start the scheduler loop on the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler loop and cancel rebuilds in flight (their threads run to completion)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        rebuilds = list(self._rebuilds)
+        for task in rebuilds:
+            task.cancel()
+        await asyncio.gather(*rebuilds, return_exceptions=True)
+
+    async def _run(self) -> None:
+        """Start rebuilds for users that have gone quiet, up to the concurrency limit"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            now = time.monotonic()
+            ready = [
+                user_id for user_id, entry in self._dirty.items()
+                if now - entry["last_write"] >= self.quiet_period and user_id not in self._running
+            ]
+            ready.sort(key=lambda user_id: self._last_active.get(user_id, 0.0), reverse=True)
+
+            for user_id in ready[:max(0, self.max_concurrency - len(self._running))]:
+                # Writes during the rebuild mark the user dirty again
+                del self._dirty[user_id]
+                self._running.add(user_id)
+                task = asyncio.get_running_loop().create_task(self._rebuild(user_id))
+                self._rebuilds.add(task)
+                task.add_done_callback(self._rebuilds.discard)
+
+    async def _rebuild(self, user_id: str) -> None:
+        """Rebuild one user's caches in a worker thread"""
+        try:
+            await asyncio.to_thread(self.rebuild, user_id)
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Error rebuilding caches for {user_id}: {e}")
+        finally:
+            self._running.discard(user_id)
+            self._wakeup.set()
+
+    def recent_users(self, limit: int = 1000) -> List[str]:
+        """
+        Get the most recently active users.
+
+        Args:
+            limit: Maximum number of users to return
+
+        Returns:
+            User ids, most recently active first
+        """
+        users = sorted(self._last_active.items(), key=lambda item: item[1], reverse=True)
+        return [user_id for user_id, _ in users[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the scheduler's queue length and staleness.
+
+        Returns:
+            Dictionary with queued, running, completed and failed counts and the
+            age in seconds of the oldest unprocessed write
+        """
+        now = time.monotonic()
+        oldest = min((entry["first_write"] for entry in self._dirty.values()), default=None)
+        return {
+            "queued": len(self._dirty),
+            "running": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "maxStalenessSeconds": now - oldest if oldest is not None else 0.0,
+            "quietPeriodSeconds": self.quiet_period,
+            "maxConcurrency": self.max_concurrency
+        }
+
+
+class WarmPool:
+    """
+    Startup warm-up of analyzers for users expected to return.
+
+    Users are warmed in their own small thread pool, at most `concurrency` at
+    a time, while live traffic is served. Live requests for users that are not
+    warm yet take priority: no new warm-up starts while one of them is
+    loading, and users that were loaded by a live request are skipped.
+    """
+
+    def __init__(self, warm: Callable[[str], None], is_warm: Callable[[str], bool],
+                 concurrency: int = 4, poll_interval: float = 0.05):
+        """
+        Initialize the warm pool.
+
+        Args:
+            warm: Function that loads one user's analyzer and caches (called in a thread)
+            is_warm: Function that tells whether a user is already loaded
+            concurrency: Maximum number of users warmed at once
+            poll_interval: Seconds between checks while live cold loads are running
+        """
+        self.warm = warm
+        self.is_warm = is_warm
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+
+        self._live_lock = threading.Lock()
+        self._live_cold_loads = 0
+        self._task: Optional[asyncio.Task] = None
+        self.total = 0
+        self.warmed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @contextmanager
+    def live_request(self) -> Iterator[None]:
+        """Mark a live request loading a cold user, pausing new warm-ups until it is done"""
+        with self._live_lock:
+            self._live_cold_loads += 1
+        try:
+            yield
+        finally:
+            with self._live_lock:
+                self._live_cold_loads -= 1
+
+    def start(self, user_ids: List[str]) -> None:
+        """
+        Start warming users in the background on the running event loop.
+
+        Args:
+            user_ids: Users to warm, most important first
+        """
+        if self._task is None and user_ids:
+            self._task = asyncio.get_running_loop().create_task(self._run(list(dict.fromkeys(user_ids))))
+
+    async def stop(self) -> None:
+        """Stop warming; warm-ups already running finish in their threads"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, user_ids: List[str]) -> None:
+        """Warm every user, `concurrency` at a time, in order"""
+        self.total = len(user_ids)
+        self.started_at = time.monotonic()
+        queue = iter(user_ids)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="warm-pool") as executor:
+            async def worker() -> None:
+                loop = asyncio.get_running_loop()
+                for user_id in queue:
+                    # Live cold loads go first
+                    while self._live_cold_loads:
+                        await asyncio.sleep(self.poll_interval)
+                    if self.is_warm(user_id):
+                        self.skipped += 1
+                        continue
+                    try:
+                        await loop.run_in_executor(executor, self.warm, user_id)
+                        self.warmed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"Error warming {user_id}: {e}")
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        self.finished_at = time.monotonic()
+        print(f"Warmed {self.warmed} users ({self.skipped} already loaded, {self.failed} failed) "
+              f"in {self.finished_at - self.started_at:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the warm-up progress.
+
+        Returns:
+            Dictionary with total, warmed, skipped and failed counts and elapsed time
+        """
+        done = self.warmed + self.skipped + self.failed
+        end = self.finished_at or time.monotonic()
+        return {
+            "total": self.total,
+            "warmed": self.warmed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "remaining": self.total - done,
+            "finished": self.finished_at is not None or self.total == 0,
+            "seconds": end - self.started_at if self.started_at is not None else 0.0
+        }
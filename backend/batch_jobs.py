@@ -0,0 +1,229 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+import pandas as pd
+
+from finance_analyzer import FinanceAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Where the nightly job writes results and the API reads them
+DEFAULT_OUTPUT_DIR = os.environ.get("CHASER_PRECOMPUTED_DIR", "precomputed")
+
+# Users per task sent to a worker process; small shards keep resume granular
+SHARD_SIZE = 16
+
+
+def _enable_copy_on_write() -> None:
+    """Share memory between derived frames until written to, as the API server does"""
+    pd.set_option('mode.copy_on_write', True)
+
+
+def _jsonable(value: Any) -> Any:
+    """Convert analysis output (Timestamps, dates, NumPy scalars) to JSON-safe values"""
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def load_user_analyzer(user_id: str, data_dir: Optional[str]) -> Optional[FinanceAnalyzer]:
+    """
+    Build an analyzer for one user from their CSV files.
+
+    Users without both files are unavailable rather than loaded with mock
+    data, which would have nothing to do with what the API holds for them.
+
+    Args:
+        user_id: The user to load
+        data_dir: Directory with `<user_id>_expenses.csv` and `<user_id>_income.csv`
+
+    Returns:
+        A loaded FinanceAnalyzer, or None if the user's files are missing
+    """
+    if not data_dir:
+        return None
+    expenses_file = os.path.join(data_dir, f"{user_id}_expenses.csv")
+    income_file = os.path.join(data_dir, f"{user_id}_income.csv")
+    if not (os.path.exists(expenses_file) and os.path.exists(income_file)):
+        return None
+    analyzer = FinanceAnalyzer(user_id)
+    analyzer.load_data(expenses_file, income_file)
+    return analyzer
+
+
+def compute_user_results(analyzer: FinanceAnalyzer) -> Dict[str, Any]:
+    """
+    Compute every precomputed analysis for one user.
+
+    Args:
+        analyzer: A loaded FinanceAnalyzer
+
+    Returns:
+        Dictionary with budget recommendations, predictions and monthly reports
+    """
+    snapshot = analyzer.snapshot()
+    dates = snapshot.expenses['date'].dropna()
+
+    monthly_reports = {}
+    if len(dates):
+        for month in pd.period_range(dates.min(), dates.max(), freq='M'):
+            monthly_reports[str(month)] = analyzer.generate_expense_report(
+                start_date=month.start_time.strftime("%Y-%m-%d"),
+                end_date=str(month.end_time)
+            )
+
+    return {
+        "user_id": analyzer.user_id,
+        "data_version": snapshot.version,
+        "generated_at": datetime.now().isoformat(),
+        "budget_recommendations": analyzer.generate_budget_recommendations(),
+        "predicted_expenses": analyzer.predict_monthly_expenses(),
+        "monthly_reports": monthly_reports
+    }
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Write JSON atomically so the API never reads a half-written file"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(_jsonable(data), f)
+    os.replace(tmp_path, path)
+
+
+def _process_shard(user_ids: List[str], output_dir: str, data_dir: Optional[str],
+                   run_id: str) -> Tuple[List[str], List[str]]:
+    """
+    Compute and store results for a shard of users (runs in a worker process).
+
+    Args:
+        user_ids: Users in this shard
+        output_dir: Directory to write results to
+        data_dir: Directory with user CSV files
+        run_id: Identifier of the current run
+
+    Returns:
+        Tuple of (users that were processed, users whose data files are missing)
+    """
+    processed, unavailable = [], []
+    for user_id in user_ids:
+        analyzer = load_user_analyzer(user_id, data_dir)
+        if analyzer is None:
+            unavailable.append(user_id)
+            continue
+        results = compute_user_results(analyzer)
+        results["run_id"] = run_id
+        _write_json(os.path.join(output_dir, f"{user_id}.json"), results)
+        processed.append(user_id)
+    return processed, unavailable
+
+
+def run_nightly_job(user_ids: List[str], output_dir: str = DEFAULT_OUTPUT_DIR, data_dir: Optional[str] = None,
+                    workers: Optional[int] = None, run_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Precompute analyses for every user on a process pool.
+
+    Users are split into small shards spread over the workers. Finished users
+    are appended to a per-run progress file, so re-running with the same
+    `run_id` after an interruption skips them.
+
+    Args:
+        user_ids: Users to process
+        output_dir: Directory to write `<user_id>.json` results to
+        data_dir: Directory with user CSV files (users without them are reported unavailable)
+        workers: Number of worker processes (defaults to the CPU count)
+        run_id: Identifier of the run to start or resume (defaults to today's date)
+
+    Returns:
+        Summary with processed and skipped counts, unavailable users and users per second
+    """
+    run_id = run_id or datetime.now().strftime("%Y-%m-%d")
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Resume: skip users already finished in this run
+    progress_path = os.path.join(output_dir, f".progress-{run_id}")
+    done = set()
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            done = {line.strip() for line in f if line.strip()}
+    pending = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in done]
+    shards = [pending[i:i + SHARD_SIZE] for i in range(0, len(pending), SHARD_SIZE)]
+
+    start = time.perf_counter()
+    processed, unavailable = 0, []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_enable_copy_on_write) as executor, open(progress_path, 'a') as progress:
+        futures = [executor.submit(_process_shard, shard, output_dir, data_dir, run_id) for shard in shards]
+        for future in as_completed(futures):
+            finished, missing = future.result()
+            progress.write("".join(f"{user_id}\n" for user_id in finished + missing))
+            progress.flush()
+            processed += len(finished)
+            unavailable.extend(missing)
+            elapsed = time.perf_counter() - start
+            logger.info("[%s] %d/%d users, %.1f users/s", run_id, processed + len(unavailable), len(pending),
+                        processed / elapsed)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "run_id": run_id,
+        "processed": processed,
+        "skipped": len(done),
+        "unavailable": unavailable,
+        "seconds": elapsed,
+        "users_per_second": processed / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def load_precomputed(user_id: str, output_dir: str = DEFAULT_OUTPUT_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Load the latest precomputed results for a user.
+
+    Args:
+        user_id: The user to look up
+        output_dir: Directory the nightly job writes to
+
+    Returns:
+        The stored results, or None if the user has not been processed yet
+    """
+    path = os.path.join(output_dir, f"{user_id}.json")
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute analyses for every user")
+    parser.add_argument("--users-file", help="File with one user id per line")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--data-dir", help="Directory with <user>_expenses.csv and <user>_income.csv")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument("--run-id", help="Run to start or resume (defaults to today's date)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    _enable_copy_on_write()
+
+    if args.users_file:
+        with open(args.users_file) as f:
+            users = [line.strip() for line in f if line.strip()]
+    else:
+        users = ["user1"]
+
+    summary = run_nightly_job(users, args.output_dir, args.data_dir, args.workers, args.run_id)
+    logger.info("Processed %d users (%d already done, %d without data files) in %.1fs, %.1f users/s",
+                summary['processed'], summary['skipped'], len(summary['unavailable']), summary['seconds'],
+                summary['users_per_second'])
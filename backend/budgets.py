@@ -0,0 +1,137 @@
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+# Utilization percentages that raise an alert when crossed
+BUDGET_THRESHOLDS = (80, 100)
+
+# Alerts kept per user for polling
+MAX_ALERTS = 200
+
+
+@dataclass(frozen=True)
+class BudgetAlert:
+    """
+    A budget category crossing a utilization threshold.
+    """
+    id: int
+    month: str
+    category: str
+    threshold: int
+    spent: float
+    budgeted: float
+    created_at: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the alert to a JSON-serializable dictionary"""
+        return asdict(self)
+
+
+class BudgetTracker:
+    """
+    Month-to-date spending per budget category, kept as running counters.
+
+    Each expense updates one counter and checks it against the alert
+    thresholds, so recording is O(1). Counters and limits belong to a single
+    month; the analyzer starts a new tracker when the month changes or the
+    data is replaced wholesale.
+    """
+
+    def __init__(self, month: str, limits: Dict[str, float], spent: Optional[Dict[str, float]] = None,
+                 previous: Optional["BudgetTracker"] = None):
+        """
+        Initialize the tracker for a month.
+
+        Args:
+            month: The month being tracked ('YYYY-MM')
+            limits: Monthly budget by category
+            spent: Month-to-date spending by category so far
+            previous: Tracker being replaced; its alerts stay pollable and ids keep increasing
+        """
+        self.month = month
+        self.limits = dict(limits)
+        self.spent = {category: 0.0 for category in self.limits}
+        self.spent.update(spent or {})
+        self._lock = threading.Lock()
+        self._next_alert_id = previous._next_alert_id if previous else 1
+        self._alerts: deque = deque(previous._alerts if previous else (), maxlen=MAX_ALERTS)
+
+        # Thresholds already crossed before tracking started don't alert again
+        self._crossed = {
+            (category, threshold)
+            for category, amount in self.spent.items()
+            for threshold in BUDGET_THRESHOLDS
+            if self._percentage(category, amount) >= threshold
+        }
+
+    def _percentage(self, category: str, amount: float) -> float:
+        """Share of a category's budget used, as a percentage"""
+        budgeted = self.limits.get(category, 0.0)
+        return amount / budgeted * 100 if budgeted > 0 else 0.0
+
+    def record(self, category: str, amount: float) -> List[BudgetAlert]:
+        """
+        Add an expense to its category's counter.
+
+        Args:
+            category: Expense category
+            amount: Expense amount
+
+        Returns:
+            Alerts for thresholds this expense crossed
+        """
+        with self._lock:
+            spent = self.spent.get(category, 0.0) + amount
+            self.spent[category] = spent
+
+            alerts = []
+            percentage = self._percentage(category, spent)
+            for threshold in BUDGET_THRESHOLDS:
+                if percentage >= threshold and (category, threshold) not in self._crossed:
+                    self._crossed.add((category, threshold))
+                    alert = BudgetAlert(
+                        id=self._next_alert_id,
+                        month=self.month,
+                        category=category,
+                        threshold=threshold,
+                        spent=spent,
+                        budgeted=self.limits[category],
+                        created_at=datetime.now().isoformat()
+                    )
+                    self._next_alert_id += 1
+                    self._alerts.append(alert)
+                    alerts.append(alert)
+            return alerts
+
+    def alerts_since(self, after_id: int = 0) -> List[BudgetAlert]:
+        """
+        Get alerts raised after a given alert.
+
+        Args:
+            after_id: Id of the last alert the caller has seen (0 for all)
+
+        Returns:
+            Newer alerts, oldest first
+        """
+        with self._lock:
+            return [alert for alert in self._alerts if alert.id > after_id]
+
+    def utilization(self) -> List[Dict[str, Any]]:
+        """
+        Get budgeted and month-to-date amounts for every budget category.
+
+        Returns:
+            List of dictionaries with category, budgeted, actual and percentage
+        """
+        with self._lock:
+            return [
+                {
+                    "category": category,
+                    "budgeted": float(budgeted),
+                    "actual": float(self.spent.get(category, 0.0)),
+                    "percentage": float(self._percentage(category, self.spent.get(category, 0.0)))
+                }
+                for category, budgeted in self.limits.items()
+            ]
@@ -0,0 +1,278 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+# Words bank feeds add to merchant names that say nothing about the merchant
+NOISE_TOKENS = frozenset({
+    "sq", "tst", "pos", "pp", "paypal", "ach", "debit", "credit", "purchase", "payment", "card",
+    "www", "com", "net", "org", "inc", "llc", "ltd", "co", "corp", "the", "and", "of", "unknown"
+})
+
+# Shortest token prefix used for fuzzy matches
+MIN_PREFIX = 3
+
+# Share of the votes the best category needs for a fuzzy match
+MIN_CONFIDENCE = 0.5
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_HAS_DIGIT = re.compile(r"\d")
+
+
+def merchant_tokens(name: Any) -> List[str]:
+    """
+    Split a raw merchant string into meaningful lowercase tokens.
+
+    Punctuation, store numbers, reference codes and payment-processor noise
+    ('SQ *', 'POS', 'www', '.com') are dropped.
+
+    Args:
+        name: Raw merchant or description string
+
+    Returns:
+        List of tokens
+    """
+    if not isinstance(name, str):
+        return []
+    return [
+        token for token in _NON_ALNUM.split(name.lower())
+        if token and token not in NOISE_TOKENS and not _HAS_DIGIT.search(token)
+    ]
+
+
+def normalize_merchant(name: Any) -> str:
+    """
+    Normalize a raw merchant string so variants of the same merchant match.
+
+    Args:
+        name: Raw merchant string (e.g. 'SQ *BLUE BOTTLE #1234')
+
+    Returns:
+        The normalized name (e.g. 'blue bottle'), empty if nothing is left
+    """
+    return " ".join(merchant_tokens(name))
+
+
+class _TrieNode:
+    """A character in the token trie, with category counts of every token through it"""
+
+    __slots__ = ("children", "counts")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.counts: Dict[str, float] = {}
+
+
+def _best(counts: Dict[str, float]) -> Optional[str]:
+    """Category with the highest count"""
+    best, best_count = None, 0.0
+    for category, count in counts.items():
+        if count > best_count:
+            best, best_count = category, count
+    return best
+
+
+class CategoryIndex:
+    """
+    Learned mapping from merchant names to categories.
+
+    Normalized names are looked up in a hash first. Names not seen before are
+    matched token by token in a character trie whose nodes hold the category
+    counts of every known token with that prefix, so truncated or reworded
+    bank strings ('WALMART SUPERCTR', 'NETFLIX.COM') still find a category.
+    Learning a label or a correction updates both in place.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Dict[str, float]] = {}
+        self._root = _TrieNode()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    @classmethod
+    def from_frame(cls, expenses: pd.DataFrame) -> "CategoryIndex":
+        """
+        Build an index from labeled expenses.
+
+        Args:
+            expenses: DataFrame with 'merchant' and 'category' columns
+
+        Returns:
+            A new CategoryIndex
+        """
+        index = cls()
+        index.add_frame(expenses)
+        return index
+
+    def add_frame(self, expenses: pd.DataFrame) -> None:
+        """
+        Learn from labeled expenses in bulk.
+
+        Each distinct (merchant, category) pair is normalized and inserted once,
+        weighted by how often it occurs.
+
+        Args:
+            expenses: DataFrame with 'merchant' and 'category' columns
+        """
+        if not len(expenses) or 'merchant' not in expenses.columns or 'category' not in expenses.columns:
+            return
+        labeled = expenses[['merchant', 'category']].dropna()
+        pairs = labeled.groupby(['merchant', 'category'], sort=False).size()
+        for (merchant, category), count in pairs.items():
+            self.learn(merchant, category, weight=float(count))
+
+    def learn(self, merchant: Any, category: str, previous: Optional[str] = None, weight: float = 1.0) -> None:
+        """
+        Record that a merchant belongs to a category.
+
+        Args:
+            merchant: Raw merchant string
+            category: Its category
+            previous: Category the merchant had before a user's correction, to unlearn
+            weight: Number of expenses this label stands for
+        """
+        tokens = merchant_tokens(merchant)
+        if not tokens:
+            return
+        key = " ".join(tokens)
+        with self._lock:
+            counts = self._exact.setdefault(key, {})
+            if previous is not None and previous != category:
+                # A correction replaces what was learned, it doesn't just outvote it
+                removed = counts.pop(previous, 0.0)
+                self._add_tokens(tokens, previous, -removed)
+                weight = max(weight, removed)
+            counts[category] = counts.get(category, 0.0) + weight
+            self._add_tokens(tokens, category, weight)
+
+    def _add_tokens(self, tokens: List[str], category: str, weight: float) -> None:
+        """Add to the counts along each token's path. Callers must hold the lock"""
+        if not weight:
+            return
+        for token in tokens:
+            node = self._root
+            for depth, char in enumerate(token, 1):
+                node = node.children.setdefault(char, _TrieNode())
+                if depth >= MIN_PREFIX:
+                    count = node.counts.get(category, 0.0) + weight
+                    if count > 0:
+                        node.counts[category] = count
+                    else:
+                        node.counts.pop(category, None)
+
+    def lookup(self, merchant: Any, description: Any = None) -> Tuple[Optional[str], float]:
+        """
+        Find the category of a merchant.
+
+        Args:
+            merchant: Raw merchant string
+            description: Expense description, used when the merchant gives no match
+
+        Returns:
+            Tuple of (category or None, confidence between 0 and 1)
+        """
+        tokens = merchant_tokens(merchant)
+        with self._lock:
+            counts = self._exact.get(" ".join(tokens)) if tokens else None
+            if counts:
+                best = _best(counts)
+                return best, counts[best] / sum(counts.values())
+
+            for candidate in (tokens, merchant_tokens(description)):
+                category, confidence = self._fuzzy(candidate)
+                if category is not None:
+                    return category, confidence
+        return None, 0.0
+
+    def _fuzzy(self, tokens: List[str]) -> Tuple[Optional[str], float]:
+        """Vote over the trie matches of each token. Callers must hold the lock"""
+        votes: Dict[str, float] = {}
+        weight_total = 0.0
+        for token in tokens:
+            node, depth = self._root, 0
+            for char in token:
+                child = node.children.get(char)
+                if child is None:
+                    break
+                node, depth = child, depth + 1
+            if depth < MIN_PREFIX or not node.counts:
+                continue
+
+            # A partial match of a long token counts for less
+            weight = depth / len(token)
+            total = sum(node.counts.values())
+            for category, count in node.counts.items():
+                votes[category] = votes.get(category, 0.0) + weight * count / total
+            weight_total += weight
+
+        best = _best(votes)
+        if best is None:
+            return None, 0.0
+        confidence = votes[best] / weight_total
+        return (best, confidence) if confidence >= MIN_CONFIDENCE else (None, confidence)
+
+
+class Categorizer:
+    """
+    Categorizes expenses from the user's own labels first, then everyone's.
+    """
+
+    def __init__(self, user_index: CategoryIndex, global_index: Optional[CategoryIndex] = None,
+                 default: str = "Other"):
+        """
+        Initialize the categorizer.
+
+        Args:
+            user_index: Index learned from this user's expenses and corrections
+            global_index: Index learned from all users' expenses
+            default: Category for expenses nothing matches
+        """
+        self.user_index = user_index
+        self.global_index = global_index
+        self.default = default
+
+    def categorize(self, merchant: Any, description: Any = None) -> str:
+        """
+        Categorize one expense.
+
+        Args:
+            merchant: Raw merchant string
+            description: Expense description
+
+        Returns:
+            The category
+        """
+        for index in (self.user_index, self.global_index):
+            if index is None:
+                continue
+            category, _ = index.lookup(merchant, description)
+            if category is not None:
+                return category
+        return self.default
+
+    def categorize_many(self, merchants: pd.Series, descriptions: Optional[pd.Series] = None) -> np.ndarray:
+        """
+        Categorize many expenses, looking up each distinct merchant and description once.
+
+        Args:
+            merchants: Raw merchant strings
+            descriptions: Expense descriptions aligned with `merchants`
+
+        Returns:
+            Array of categories aligned with `merchants`
+        """
+        if descriptions is None:
+            descriptions = pd.Series(None, index=merchants.index, dtype=object)
+        pairs = pd.DataFrame({'merchant': merchants.to_numpy(), 'description': descriptions.to_numpy()})
+        # Groups are numbered in order of first appearance, like drop_duplicates keeps them
+        codes = pairs.groupby(['merchant', 'description'], sort=False, dropna=False).ngroup().to_numpy()
+        uniques = pairs.drop_duplicates()
+        categories = np.array(
+            [self.categorize(merchant, description) for merchant, description in uniques.itertuples(index=False)],
+            dtype=object
+        )
+        return categories[codes]
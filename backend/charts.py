@@ -0,0 +1,271 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Any
+
+from finance_analyzer import FinanceAnalyzer
+
+# Chart kinds and the query parameters each one depends on
+CHART_KINDS = {
+    "category-pie": ("start_date", "end_date"),
+    "spending-over-time": ("frequency",),
+    "income-vs-expenses": ("frequency",),
+}
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+DEFAULT_FREQUENCY = {"spending-over-time": "W", "income-vs-expenses": "M"}
+ALLOWED_FREQUENCIES = {"spending-over-time": ("D", "W", "M"), "income-vs-expenses": ("W", "M")}
+
+
+def chart_data(analyzer: FinanceAnalyzer, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute the series a chart plots, as plain lists that are cheap to send to a worker.
+
+    Args:
+        analyzer: The user's analyzer
+        kind: One of CHART_KINDS
+        params: Chart parameters (dates or frequency)
+
+    Returns:
+        Dictionary with the chart's title, labels and values
+    """
+    if kind == "category-pie":
+        by_category = analyzer.analyze_expenses_by_category(params.get("start_date"), params.get("end_date"))
+        by_category = {category: amount for category, amount in by_category.items() if amount > 0}
+        return {
+            "title": "Expenses by Category",
+            "labels": list(by_category.keys()),
+            "values": [float(amount) for amount in by_category.values()]
+        }
+
+    if kind == "spending-over-time":
+        over_time = analyzer.analyze_expenses_over_time(params["frequency"])
+        return {
+            "title": "Spending Over Time",
+            "labels": [date.strftime("%Y-%m-%d") for date in over_time['date']],
+            "values": [float(amount) for amount in over_time['amount']]
+        }
+
+    comparison = analyzer.analyze_income_vs_expenses(params["frequency"])
+    return {
+        "title": "Income vs Expenses",
+        "labels": [date.strftime("%Y-%m-%d") for date in comparison.index],
+        "income": [float(amount) for amount in comparison['income']],
+        "expenses": [float(amount) for amount in comparison['expenses']],
+        "savings": [float(amount) for amount in comparison['savings']]
+    }
+
+
+def render_chart(kind: str, data: Dict[str, Any], fmt: str = "png") -> bytes:
+    """
+    Render a chart to an image (runs in a worker process).
+
+    matplotlib is imported here rather than at module level so the API
+    process never pays for it, and figures are created without pyplot so no
+    global figure state is kept between renders.
+
+    Args:
+        kind: One of CHART_KINDS
+        data: Output of `chart_data`
+        fmt: Image format, 'png' or 'svg'
+
+    Returns:
+        The encoded image
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+
+    if kind == "category-pie":
+        if data["values"]:
+            ax.pie(data["values"], labels=data["labels"], autopct='%1.1f%%', startangle=90)
+            ax.axis('equal')
+        else:
+            ax.text(0.5, 0.5, "No expenses", ha='center', va='center')
+            ax.axis('off')
+    elif kind == "spending-over-time":
+        ax.plot(range(len(data["values"])), data["values"], marker='o')
+        ax.set_ylabel("Amount ($)")
+        _set_date_ticks(ax, data["labels"])
+    else:
+        positions = range(len(data["labels"]))
+        ax.bar([p - 0.2 for p in positions], data["income"], width=0.4, label="Income")
+        ax.bar([p + 0.2 for p in positions], data["expenses"], width=0.4, label="Expenses")
+        ax.plot(list(positions), data["savings"], color='black', marker='o', label="Savings")
+        ax.axhline(0, color='grey', linewidth=0.5)
+        ax.set_ylabel("Amount ($)")
+        ax.legend()
+        _set_date_ticks(ax, data["labels"])
+
+    ax.set_title(data["title"])
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def _set_date_ticks(ax: Any, labels: List[str], max_ticks: int = 12) -> None:
+    """Label at most `max_ticks` evenly spaced points on the x axis"""
+    step = max(1, -(-len(labels) // max_ticks))
+    ticks = list(range(0, len(labels), step))
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([labels[i] for i in ticks], rotation=45, ha='right')
+
+
+class ChartService:
+    """
+    Renders charts in a process pool and caches the images.
+
+    Images are cached by (user, chart kind, parameters, data version) in a
+    bounded LRU, so repeat views are served without re-rendering and any
+    write to the user's data makes their old images unreachable.
+    """
+
+    def __init__(self, max_workers: int = 2, cache_size: int = 256):
+        """
+        Initialize the chart service.
+
+        Args:
+            max_workers: Number of rendering processes
+            cache_size: Maximum number of cached images
+        """
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the rendering processes on first use"""
+        if self._executor is None:
+            # Spawned workers don't inherit the API's threads and locks
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _render_in_pool(self, kind: str, data: Dict[str, Any], fmt: str) -> bytes:
+        """
+        Render in a worker process, replacing the pool once if a worker died.
+
+        A worker killed by the OS (out of memory, crash) breaks the whole pool
+        for good, so the broken pool is shut down and the render retried on a
+        fresh one.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, render_chart, kind, data, fmt)
+        except BrokenProcessPool:
+            # Concurrent renders may all see the same broken pool; only replace it once
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+            return await loop.run_in_executor(self._get_executor(), render_chart, kind, data, fmt)
+
+    def normalize_params(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keep the parameters a chart kind depends on and fill in defaults.
+
+        Args:
+            kind: One of CHART_KINDS
+            params: Request parameters
+
+        Returns:
+            The parameters that identify the chart
+
+        Raises:
+            ValueError: If the kind or frequency is not supported
+        """
+        if kind not in CHART_KINDS:
+            raise ValueError(f"Unknown chart kind: {kind}")
+        normalized = {name: params.get(name) or None for name in CHART_KINDS[kind]}
+        if "frequency" in normalized:
+            normalized["frequency"] = normalized["frequency"] or DEFAULT_FREQUENCY[kind]
+            if normalized["frequency"] not in ALLOWED_FREQUENCIES[kind]:
+                raise ValueError(f"Frequency must be one of {', '.join(ALLOWED_FREQUENCIES[kind])}")
+        return normalized
+
+    async def render(self, analyzer: FinanceAnalyzer, kind: str, fmt: str = "png",
+                     params: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        Get a chart image for a user, rendering it only if it is not cached.
+
+        Args:
+            analyzer: The user's analyzer
+            kind: One of CHART_KINDS
+            fmt: Image format, 'png' or 'svg'
+            params: Chart parameters (dates or frequency)
+
+        Returns:
+            The encoded image
+
+        Raises:
+            ValueError: If the kind, format or parameters are not supported
+        """
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Format must be one of {', '.join(MEDIA_TYPES)}")
+        params = self.normalize_params(kind, params or {})
+
+        # Read the version before the data, so cached data is never older than its key
+        version = analyzer.snapshot().version
+        key = (analyzer.user_id, kind, tuple(sorted(params.items())), version, fmt)
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        data = await asyncio.to_thread(chart_data, analyzer, kind, params)
+        image = await self._render_in_pool(kind, data, fmt)
+
+        self._cache[key] = image
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return image
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with cached image count, hits, misses and pool restarts
+        """
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "workers": self.max_workers,
+            "restarts": self.restarts
+        }
+
+    def shutdown(self) -> None:
+        """Stop the rendering processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Example usage
+if __name__ == "__main__":
+    analyzer = FinanceAnalyzer("user1")
+    analyzer.load_data()
+
+    service = ChartService()
+    for kind in CHART_KINDS:
+        image = asyncio.run(service.render(analyzer, kind))
+        path = os.path.join(".", f"{kind}.png")
+        with open(path, 'wb') as f:
+            f.write(image)
+        print(f"Wrote {path} ({len(image)} bytes)")
+    service.shutdown()
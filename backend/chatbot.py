@@ -1,12 +1,12 @@
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Iterator
 import re
 import json
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import io
-import base64
+from ledger import ExpenseLedger
+from forecasting import AVG_DAYS_PER_MONTH
+from finance_analyzer import FinanceAnalyzer
 
 class FinanceChatbot:
     """
@@ -15,24 +15,26 @@ class FinanceChatbot:
     and offer personalized financial advice.
     """
     
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, analyzer: Optional[FinanceAnalyzer] = None):
         """
         Initialize the FinanceChatbot with a user ID.
         
         Args:
             user_id: The unique identifier for the user
+            analyzer: The user's analyzer, whose data answers every question (built
+                from mock data when not given)
         """
         self.user_id = user_id
-        self.expenses_data = None
-        self.income_data = None
-        self.budget_data = None
         self.conversation_history = []
         
-        # Load financial data
-        self._load_financial_data()
+        # The same data the API serves; each answer reads one version of it
+        self.analyzer = analyzer or self._build_analyzer()
+        self._snapshot = self.analyzer.snapshot()
         
         # Define intent patterns
         self.intent_patterns = {
+            'anomaly_query': r'(unusual|anomal|suspicious|strange|fraud|out of the ordinary)',
+            'recurring_query': r'(subscriptions?|recurring|repeating|monthly charges?)',
             'greeting': r'(hello|hi|hey|greetings|howdy)',
             'expense_query': r'(expenses?|spending|spent|cost|paid)',
             'income_query': r'(income|earnings|salary|made|earned)',
@@ -46,11 +48,38 @@ class FinanceChatbot:
             'recommendation_query': r'(recommend|suggestion|advice|tip|help)',
             'forecast_query': r'(forecast|predict|projection|future)',
         }
+        
+        # Messages asking to see a chart, and the chart that fits each intent
+        self.chart_pattern = r'(chart|graph|plot|visuali[sz]e|pie)'
+        self.intent_charts = {
+            'income_query': 'income-vs-expenses',
+            'savings_query': 'income-vs-expenses',
+            'comparison_query': 'income-vs-expenses',
+            'time_query': 'spending-over-time',
+            'forecast_query': 'spending-over-time',
+        }
+    
+    @property
+    def expenses_data(self) -> pd.DataFrame:
+        """Expenses of the version the current answer reads"""
+        return self._snapshot.expenses
+    
+    @property
+    def income_data(self) -> pd.DataFrame:
+        """Income of the version the current answer reads"""
+        return self._snapshot.income
+    
+    @property
+    def expense_ledger(self) -> ExpenseLedger:
+        """Prefix sums over the expenses of the version the current answer reads"""
+        return self._snapshot.ledger
     
-    def _load_financial_data(self) -> None:
+    def _generate_mock_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
-        Load the user's financial data from storage.
-        In a real application, this would fetch data from a database.
+        Generate 90 days of mock expenses and income, for use without the API.
+        
+        Returns:
+            Tuple of (expenses, income) DataFrames
         """
         # For demonstration, we'll create mock data
         # Generate dates for the last 90 days
@@ -117,7 +146,7 @@ class FinanceChatbot:
                 merchants.append(f"{category} Provider")
         
         # Create expenses DataFrame
-        self.expenses_data = pd.DataFrame({
+        expenses = pd.DataFrame({
             'date': random_dates,
             'amount': amounts,
             'category': random_categories,
@@ -126,7 +155,7 @@ class FinanceChatbot:
         })
         
         # Sort by date
-        self.expenses_data = self.expenses_data.sort_values('date')
+        expenses = expenses.sort_values('date')
         
         # Generate income data
         # Monthly salary
@@ -155,26 +184,17 @@ class FinanceChatbot:
         })
         
         # Combine and sort income data
-        self.income_data = pd.concat([salary_df, additional_df])
-        self.income_data = self.income_data.sort_values('date')
-        
-        # Generate budget data (50/30/20 rule)
-        monthly_income = salary_amounts.mean()
-        self.budget_data = {
-            'Housing': monthly_income * 0.3,
-            'Food': monthly_income * 0.15,
-            'Transportation': monthly_income * 0.05,
-            'Utilities': monthly_income * 0.05,
-            'Healthcare': monthly_income * 0.05,
-            'Debt Payments': monthly_income * 0.1,
-            'Entertainment': monthly_income * 0.05,
-            'Shopping': monthly_income * 0.05,
-            'Personal Care': monthly_income * 0.03,
-            'Travel': monthly_income * 0.02,
-            'Education': monthly_income * 0.05,
-            'Other': monthly_income * 0.05,
-            'Savings': monthly_income * 0.2,
-        }
+        income = pd.concat([salary_df, additional_df]).sort_values('date')
+        
+        return expenses, income
+    
+    def _build_analyzer(self) -> FinanceAnalyzer:
+        """Create an analyzer over mock data, for use without the API"""
+        expenses, income = self._generate_mock_data()
+        analyzer = FinanceAnalyzer(self.user_id)
+        analyzer.expenses = expenses
+        analyzer.income = income
+        return analyzer
     
     def process_message(self, message: str) -> str:
         """
@@ -188,6 +208,7 @@ class FinanceChatbot:
         """
         # Add message to conversation history
         self.conversation_history.append({"role": "user", "message": message})
+        self._snapshot = self.analyzer.snapshot()
         
         # Identify intent
         intent = self._identify_intent(message)
@@ -200,6 +221,70 @@ class FinanceChatbot:
         
         return response
     
+    def stream_message(self, message: str) -> Iterator[str]:
+        """
+        Process a user message and yield the response section by section.
+        
+        Each section is yielded as soon as it is computed, so the first part of
+        a long answer can be sent before the rest is ready. Joining the
+        sections gives the same text as `process_message`.
+        
+        Args:
+            message: The user's message
+            
+        Yields:
+            Consecutive sections of the chatbot's response
+        """
+        self.conversation_history.append({"role": "user", "message": message})
+        self._snapshot = self.analyzer.snapshot()
+        
+        intent = self._identify_intent(message)
+        
+        sections = []
+        for section in self._generate_sections(intent, message):
+            sections.append(section)
+            yield section
+        
+        self.conversation_history.append({"role": "bot", "message": "".join(sections)})
+    
+    def chart_for_message(self, message: str) -> Optional[str]:
+        """
+        Choose a chart to show alongside the answer, if the user asked for one.
+        
+        Args:
+            message: The user's message
+            
+        Returns:
+            The chart kind, or None if the message doesn't ask for a chart
+        """
+        lowered = message.lower()
+        if not re.search(self.chart_pattern, lowered):
+            return None
+        if re.search(r'(over time|trend|weekly|daily|monthly)', lowered):
+            return 'spending-over-time'
+        return self.intent_charts.get(self._identify_intent(message), 'category-pie')
+    
+    def _generate_sections(self, intent: str, message: str) -> Iterator[str]:
+        """
+        Generate a response in sections based on the identified intent.
+        
+        Args:
+            intent: The identified intent
+            message: The user's message
+            
+        Yields:
+            Consecutive sections of the response
+        """
+        if intent == "recommendation_query":
+            yield from self._recommendation_sections(message)
+        
+        elif intent == "forecast_query":
+            yield from self._forecast_sections(message)
+        
+        else:
+            # Short answers are a single section
+            yield self._generate_response(intent, message)
+    
     def _identify_intent(self, message: str) -> str:
         """
         Identify the user's intent from their message.
@@ -258,6 +343,12 @@ class FinanceChatbot:
         elif intent == "forecast_query":
             return self._handle_forecast_query(message)
         
+        elif intent == "anomaly_query":
+            return self._handle_anomaly_query(message)
+        
+        elif intent == "recurring_query":
+            return self._handle_recurring_query(message)
+        
         else:
             return self._handle_general_query()
     
@@ -278,34 +369,35 @@ class FinanceChatbot:
         # Check for category in the message
         category = self._extract_category(message)
         
-        # Filter expenses based on time period and category
-        filtered_expenses = self._filter_expenses(time_period, category)
+        # Answer from the prefix-sum index instead of filtering the frame
+        start, end = self._period_bounds(time_period)
         
         # Generate response
         if category and time_period:
-            total = filtered_expenses['amount'].sum()
+            total = self.expense_ledger.total_between(start, end, category)
             return f"Your {category.lower()} expenses {time_period} were ${total:.2f}."
         
         elif category:
-            total = filtered_expenses['amount'].sum()
+            total = self.expense_ledger.total_between(category=category)
             return f"Your total {category.lower()} expenses are ${total:.2f}."
         
         elif time_period:
-            total = filtered_expenses['amount'].sum()
-            top_categories = filtered_expenses.groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
+            total = self.expense_ledger.total_between(start, end)
+            category_totals = self.expense_ledger.category_totals_between(start, end)
+            top_categories = sorted(category_totals.items(), key=lambda item: item[1], reverse=True)[:3]
             response = f"Your total expenses {time_period} were ${total:.2f}. "
             response += "Your top spending categories were: "
-            for cat, amount in top_categories.items():
+            for cat, amount in top_categories:
                 response += f"{cat} (${amount:.2f}), "
             return response[:-2] + "."
         
         else:
-            total = self.expenses_data['amount'].sum()
-            monthly_avg = total / 3  # Assuming 3 months of data
+            total = self.expense_ledger.total_between()
+            months = self._history_months()
             top_categories = self.expenses_data.groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
             
-            response = f"Your total expenses over the last 3 months were ${total:.2f}, "
-            response += f"with a monthly average of ${monthly_avg:.2f}. "
+            response = f"Your total expenses over the last {months:.0f} months were ${total:.2f}, "
+            response += f"with a monthly average of ${total / months:.2f}. "
             response += "Your top spending categories are: "
             for cat, amount in top_categories.items():
                 response += f"{cat} (${amount:.2f}), "
@@ -317,25 +409,12 @@ class FinanceChatbot:
         time_period = self._extract_time_period(message)
         
         # Filter income based on time period
-        if time_period:
-            if time_period == "this month":
-                current_month = datetime.now().month
-                current_year = datetime.now().year
-                filtered_income = self.income_data[
-                    (pd.to_datetime(self.income_data['date']).dt.month == current_month) &
-                    (pd.to_datetime(self.income_data['date']).dt.year == current_year)
-                ]
-            elif time_period == "last month":
-                last_month = (datetime.now().replace(day=1) - timedelta(days=1)).month
-                current_year = datetime.now().year
-                filtered_income = self.income_data[
-                    (pd.to_datetime(self.income_data['date']).dt.month == last_month) &
-                    (pd.to_datetime(self.income_data['date']).dt.year == current_year)
-                ]
-            else:  # Default to all data
-                filtered_income = self.income_data
-        else:
-            filtered_income = self.income_data
+        filtered_income = self.income_data
+        start, end = self._period_bounds(time_period)
+        if start is not None:
+            filtered_income = filtered_income[filtered_income['date'] >= start]
+        if end is not None:
+            filtered_income = filtered_income[filtered_income['date'] <= end]
         
         # Generate response
         total = filtered_income['amount'].sum()
@@ -344,7 +423,7 @@ class FinanceChatbot:
         if time_period:
             response = f"Your total income {time_period} was ${total:.2f}. "
         else:
-            response = f"Your total income over the last 3 months was ${total:.2f}. "
+            response = f"Your total income over the last {self._history_months():.0f} months was ${total:.2f}. "
         
         if not sources.empty:
             response += "Your income sources are: "
@@ -359,17 +438,16 @@ class FinanceChatbot:
         # Check for category in the message
         category = self._extract_category(message)
         
-        if category and category in self.budget_data:
-            budget_amount = self.budget_data[category]
-            
-            # Get actual spending for this category
-            actual_spending = self.expenses_data[self.expenses_data['category'] == category]['amount'].sum()
-            
-            # Calculate percentage of budget used
-            percentage_used = (actual_spending / budget_amount) * 100
+        # Month-to-date counters kept on every write, the same figures /api/budget reports
+        utilization = {row['category']: row for row in self.analyzer.budget_tracker().utilization()}
+        
+        if category and category in utilization:
+            budget_amount = utilization[category]['budgeted']
+            actual_spending = utilization[category]['actual']
+            percentage_used = utilization[category]['percentage']
             
-            response = f"Your budget for {category} is ${budget_amount:.2f}. "
-            response += f"You've spent ${actual_spending:.2f} ({percentage_used:.1f}% of your budget)."
+            response = f"Your monthly budget for {category} is ${budget_amount:.2f}. "
+            response += f"You've spent ${actual_spending:.2f} so far this month ({percentage_used:.1f}% of your budget)."
             
             if percentage_used > 100:
                 response += " You've exceeded your budget for this category."
@@ -382,20 +460,28 @@ class FinanceChatbot:
         
         else:
             # Return overall budget information
-            total_budget = sum(self.budget_data.values())
-            total_expenses = self.expenses_data['amount'].sum()
-            percentage_used = (total_expenses / total_budget) * 100
+            total_budget = sum(row['budgeted'] for row in utilization.values())
+            month_to_date = sum(row['actual'] for row in utilization.values())
+            percentage_used = month_to_date / total_budget * 100 if total_budget > 0 else 0.0
+            monthly_average = self.expense_ledger.total_between() / self._history_months()
             
             response = f"Your total monthly budget is ${total_budget:.2f}. "
-            response += f"You've spent ${total_expenses:.2f} over the last 3 months "
-            response += f"(average of ${total_expenses/3:.2f} per month, {percentage_used/3:.1f}% of your monthly budget).\n\n"
+            response += f"You've spent ${month_to_date:.2f} so far this month ({percentage_used:.1f}% of your monthly budget), "
+            response += f"and ${monthly_average:.2f} per month on average.\n\n"
             
             response += "Here's your budget breakdown:\n"
-            for category, amount in self.budget_data.items():
-                response += f"- {category}: ${amount:.2f}\n"
+            for category, row in utilization.items():
+                response += f"- {category}: ${row['budgeted']:.2f} (${row['actual']:.2f} spent)\n"
             
             return response
     
+    def _history_months(self) -> float:
+        """Length of the loaded history in months (at least 1)"""
+        dates = pd.concat([self.expenses_data['date'], self.income_data['date']])
+        if dates.empty:
+            return 1.0
+        return max(((dates.max() - dates.min()).days + 1) / AVG_DAYS_PER_MONTH, 1.0)
+    
     def _handle_savings_query(self, message: str) -> str:
         """Handle savings-related queries"""
         # Calculate total income and expenses
@@ -406,7 +492,7 @@ class FinanceChatbot:
         savings = total_income - total_expenses
         savings_rate = (savings / total_income) * 100
         
-        response = f"Over the last 3 months, you've saved ${savings:.2f}, "
+        response = f"Over the last {self._history_months():.0f} months, you've saved ${savings:.2f}, "
         response += f"which is {savings_rate:.1f}% of your income. "
         
         if savings_rate < 10:
@@ -462,86 +548,135 @@ class FinanceChatbot:
     
     def _handle_recommendation_query(self, message: str) -> str:
         """Handle recommendation-related queries"""
+        return "".join(self._recommendation_sections(message))
+    
+    def _recommendation_sections(self, message: str) -> Iterator[str]:
+        """Generate recommendation responses section by section"""
         # Check for specific recommendation types
         if re.search(r'(save|saving|savings)', message.lower()):
-            return self._get_savings_recommendations()
+            yield self._get_savings_recommendations()
         elif re.search(r'(budget|budgeting)', message.lower()):
-            return self._get_budget_recommendations()
+            yield from self._budget_recommendation_sections()
         elif re.search(r'(invest|investing|investment)', message.lower()):
-            return self._handle_investment_query(message)
+            yield self._handle_investment_query(message)
         elif re.search(r'(debt|loan|credit)', message.lower()):
-            return self._handle_debt_query(message)
+            yield self._handle_debt_query(message)
         else:
             # General financial recommendations
             response = "Here are some general financial recommendations based on your data:\n\n"
             
             # Analyze spending patterns
             total_expenses = self.expenses_data['amount'].sum()
-            monthly_expenses = total_expenses / 3  # Assuming 3 months of data
+            monthly_expenses = total_expenses / self._history_months()
             
             # Get income
             total_income = self.income_data['amount'].sum()
-            monthly_income = total_income / 3
+            monthly_income = total_income / self._history_months()
             
             # Calculate savings rate
             savings = total_income - total_expenses
             savings_rate = (savings / total_income) * 100
             
-            # Top spending categories
-            top_categories = self.expenses_data.groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
-            
             # Generate recommendations
             if savings_rate < 20:
                 response += "1. Increase your savings rate: You're currently saving about "
                 response += f"{savings_rate:.1f}% of your income. Aim for at least 20%.\n"
             else:
                 response += "1. Great job on your savings rate! Consider investing more for long-term growth.\n"
+            yield response
             
-            response += "2. Review your top spending categories:\n"
+            # Top spending categories
+            top_categories = self.expenses_data.groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
+            
+            response = "2. Review your top spending categories:\n"
             for cat, amount in top_categories.items():
                 percentage = (amount / total_expenses) * 100
                 response += f"   - {cat}: ${amount:.2f} ({percentage:.1f}% of total)\n"
+            yield response
             
-            response += "3. Follow the 50/30/20 rule: 50% for needs, 30% for wants, and 20% for savings/debt.\n"
+            response = "3. Follow the 50/30/20 rule: 50% for needs, 30% for wants, and 20% for savings/debt.\n"
             response += "4. Build an emergency fund of 3-6 months of expenses.\n"
             response += "5. Regularly review and adjust your budget based on your goals.\n"
-            
-            return response
+            yield response
     
     def _handle_forecast_query(self, message: str) -> str:
         """Handle forecast-related queries"""
-        # Simple linear projection based on current spending
-        expenses_by_month = self.expenses_data.groupby(pd.to_datetime(self.expenses_data['date']).dt.to_period('M'))['amount'].sum()
-        
-        if len(expenses_by_month) >= 2:
-            # Calculate average monthly change
-            monthly_changes = expenses_by_month.diff().dropna()
-            avg_monthly_change = monthly_changes.mean()
-            
-            # Project next month
-            last_month_expenses = expenses_by_month.iloc[-1]
-            next_month_projection = last_month_expenses + avg_monthly_change
+        return "".join(self._forecast_sections(message))
+    
+    def _forecast_sections(self, message: str) -> Iterator[str]:
+        """Generate the forecast response section by section"""
+        # Trend (and seasonality) fitted for every category at once, shared with the API's predictions
+        forecast = self.analyzer.forecast_expenses(horizon=2)
+        next_month = forecast.for_month(pd.Period(datetime.now(), freq='M') + 1)
+        next_month_projection = sum(next_month.values())
+        
+        if forecast.last_month_total is not None and forecast.method != 'mean':
+            # Compare against the last complete month
+            monthly_change = next_month_projection - forecast.last_month_total
             
             response = f"Based on your spending patterns, I project that next month's expenses will be around ${next_month_projection:.2f}. "
             
-            if avg_monthly_change > 0:
-                response += f"This is an increase of ${avg_monthly_change:.2f} from your current monthly spending. "
+            if monthly_change > 0:
+                response += f"This is an increase of ${monthly_change:.2f} from your current monthly spending. "
                 response += "You might want to look for ways to reduce expenses."
             else:
-                response += f"This is a decrease of ${-avg_monthly_change:.2f} from your current monthly spending. "
+                response += f"This is a decrease of ${-monthly_change:.2f} from your current monthly spending. "
                 response += "You're on the right track to reducing expenses!"
         else:
-            # Not enough data for projection
-            avg_monthly_expenses = self.expenses_data['amount'].sum() / 3  # Assuming 3 months
-            response = f"Based on your average monthly expenses of ${avg_monthly_expenses:.2f}, "
+            # Not enough data for a trend
+            response = f"Based on your average monthly expenses of ${next_month_projection:.2f}, "
             response += "I project similar spending next month if your habits remain consistent."
+        yield response
         
         # Add category-specific projections
-        response += "\n\nCategory projections for next month:\n"
-        for category in self.expenses_data['category'].unique():
-            cat_expenses = self.expenses_data[self.expenses_data['category'] == category]['amount'].sum() / 3
-            response += f"- {category}: ${cat_expenses:.2f}\n"
-        
+        response = "\n\nCategory projections for next month:\n"
+        for category, amount in next_month.items():
+            response += f"- {category}: ${amount:.2f}\n"
+        yield response
+    
+    def _handle_anomaly_query(self, message: str) -> str:
+        """Handle queries about unusual expenses"""
+        time_period = self._extract_time_period(message)
+        category = self._extract_category(message)
+        period_text = f" {time_period}" if time_period else ""
+        category_text = f" in {category}" if category else ""
+        start, end = self._period_bounds(time_period)
+        
+        def matches(flagged) -> bool:
+            if category and flagged.category != category:
+                return False
+            if start is None and end is None:
+                return True
+            date = pd.Timestamp(flagged.date) if flagged.date else None
+            return date is not None and (start is None or date >= start) and (end is None or date <= end)
+        
+        # Expenses flagged as they were added, the same list /api/analysis/anomalies serves
+        unusual = [flagged for flagged in self.analyzer.flagged_expenses() if matches(flagged)]
+        
+        if not unusual:
+            return f"I didn't find any unusual expenses{category_text}{period_text}. Your spending looks consistent with your usual patterns."
+        
+        response = f"I found {len(unusual)} unusual expense(s){category_text}{period_text}:\n"
+        for flagged in reversed(unusual[-5:]):
+            merchant_text = f" at {flagged.merchant}" if flagged.merchant else ""
+            response += f"- {flagged.date}: ${flagged.amount:.2f}{merchant_text} ({flagged.reasons[0]})\n"
+        response += "\nIf you don't recognize any of these, check them with your bank."
+        return response
+    
+    def _handle_recurring_query(self, message: str) -> str:
+        """Handle queries about subscriptions and recurring payments"""
+        # The same detection /api/analysis/recurring runs, over the user's current data
+        series = [item for item in self.analyzer.detect_recurring_payments() if item.active]
+        
+        if not series:
+            return "I didn't find any active subscriptions or recurring payments in your expenses."
+        
+        monthly_total = sum(item.monthly_cost for item in series)
+        response = f"You have {len(series)} recurring payment(s), costing about ${monthly_total:.2f} per month:\n"
+        for item in series:
+            response += (f"- {item.merchant}: ${item.average_amount:.2f} {item.period}, "
+                         f"next expected around {item.next_expected}\n")
+        response += "\nCancelling subscriptions you no longer use is one of the easiest ways to save."
         return response
     
     def _handle_general_query(self) -> str:
@@ -590,50 +725,47 @@ class FinanceChatbot:
         
         return None
     
+    def _period_bounds(self, time_period: Optional[str]) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """Convert a time period to inclusive (start, end) dates"""
+        if not time_period:
+            return None, None
+        
+        today = pd.Timestamp.now().normalize()
+        month_start = today.replace(day=1)
+        end_of_day = pd.Timedelta(days=1) - pd.Timedelta(1)
+        
+        if time_period == "this month":
+            return month_start, month_start + pd.offsets.MonthBegin(1) - pd.Timedelta(1)
+        elif time_period == "last month":
+            last_month_start = month_start - pd.offsets.MonthBegin(1)
+            return last_month_start, month_start - pd.Timedelta(1)
+        elif time_period == "this year":
+            return today.replace(month=1, day=1), today.replace(month=12, day=31) + end_of_day
+        elif time_period == "last year":
+            last_year = today.year - 1
+            return pd.Timestamp(last_year, 1, 1), pd.Timestamp(last_year, 12, 31) + end_of_day
+        elif time_period == "this week":
+            return today - pd.Timedelta(days=today.weekday()), None
+        elif time_period == "last week":
+            start_of_last_week = today - pd.Timedelta(days=today.weekday() + 7)
+            return start_of_last_week, start_of_last_week + pd.Timedelta(days=6) + end_of_day
+        
+        return None, None
+    
     def _filter_expenses(self, time_period: Optional[str], category: Optional[str]) -> pd.DataFrame:
         """Filter expenses based on time period and category"""
-        filtered_expenses = self.expenses_data.copy()
+        filtered_expenses = self.expenses_data
         
         # Filter by time period
-        if time_period:
-            if time_period == "this month":
-                current_month = datetime.now().month
-                current_year = datetime.now().year
-                filtered_expenses = filtered_expenses[
-                    (pd.to_datetime(filtered_expenses['date']).dt.month == current_month) &
-                    (pd.to_datetime(filtered_expenses['date']).dt.year == current_year)
-                ]
-            elif time_period == "last month":
-                last_month = (datetime.now().replace(day=1) - timedelta(days=1)).month
-                current_year = datetime.now().year
-                filtered_expenses = filtered_expenses[
-                    (pd.to_datetime(filtered_expenses['date']).dt.month == last_month) &
-                    (pd.to_datetime(filtered_expenses['date']).dt.year == current_year)
-                ]
-            elif time_period == "this year":
-                current_year = datetime.now().year
-                filtered_expenses = filtered_expenses[
-                    pd.to_datetime(filtered_expenses['date']).dt.year == current_year
-                ]
-            elif time_period == "last year":
-                last_year = datetime.now().year - 1
-                filtered_expenses = filtered_expenses[
-                    pd.to_datetime(filtered_expenses['date']).dt.year == last_year
-                ]
-            elif time_period == "this week":
-                today = datetime.now()
-                start_of_week = today - timedelta(days=today.weekday())
-                filtered_expenses = filtered_expenses[
-                    pd.to_datetime(filtered_expenses['date']) >= start_of_week
-                ]
-            elif time_period == "last week":
-                today = datetime.now()
-                start_of_last_week = today - timedelta(days=today.weekday() + 7)
-                end_of_last_week = start_of_last_week + timedelta(days=6)
-                filtered_expenses = filtered_expenses[
-                    (pd.to_datetime(filtered_expenses['date']) >= start_of_last_week) &
-                    (pd.to_datetime(filtered_expenses['date']) <= end_of_last_week)
-                ]
+        start, end = self._period_bounds(time_period)
+        if start is not None or end is not None:
+            dates = pd.to_datetime(filtered_expenses['date'])
+            mask = pd.Series(True, index=filtered_expenses.index)
+            if start is not None:
+                mask &= dates >= start
+            if end is not None:
+                mask &= dates <= end
+            filtered_expenses = filtered_expenses[mask]
         
         # Filter by category
         if category:
@@ -685,12 +817,17 @@ class FinanceChatbot:
     
     def _get_budget_recommendations(self) -> str:
         """Generate budget recommendations"""
+        return "".join(self._budget_recommendation_sections())
+    
+    def _budget_recommendation_sections(self) -> Iterator[str]:
+        """Generate budget recommendations section by section"""
         # Calculate current spending by category
         category_spending = self.expenses_data.groupby('category')['amount'].sum()
         
         # Calculate total income and expenses
         total_income = self.income_data['amount'].sum()
-        monthly_income = total_income / 3  # Assuming 3 months of data
+        months = self._history_months()
+        monthly_income = total_income / months
         
         # Apply 50/30/20 rule
         needs_budget = monthly_income * 0.5
@@ -702,8 +839,8 @@ class FinanceChatbot:
         wants_categories = ["Entertainment", "Shopping", "Personal Care", "Travel"]
         
         # Calculate current spending on needs and wants
-        needs_spending = sum(category_spending.get(cat, 0) for cat in needs_categories) / 3
-        wants_spending = sum(category_spending.get(cat, 0) for cat in wants_categories) / 3
+        needs_spending = sum(category_spending.get(cat, 0) for cat in needs_categories) / months
+        wants_spending = sum(category_spending.get(cat, 0) for cat in wants_categories) / months
         
         # Generate response
         response = "Here are budget recommendations based on the 50/30/20 rule:\n\n"
@@ -715,16 +852,18 @@ class FinanceChatbot:
             response += f"- You're overspending on needs by ${needs_spending - needs_budget:.2f} per month\n"
         else:
             response += f"- You're within budget for needs (${needs_budget - needs_spending:.2f} under budget)\n"
+        yield response
         
-        response += "\nWants (30% of income):\n"
+        response = "\nWants (30% of income):\n"
         response += f"- Recommended: ${wants_budget:.2f} per month\n"
         response += f"- Current spending: ${wants_spending:.2f} per month\n"
         if wants_spending > wants_budget:
             response += f"- You're overspending on wants by ${wants_spending - wants_budget:.2f} per month\n"
         else:
             response += f"- You're within budget for wants (${wants_budget - wants_spending:.2f} under budget)\n"
+        yield response
         
-        response += "\nSavings (20% of income):\n"
+        response = "\nSavings (20% of income):\n"
         response += f"- Recommended: ${savings_budget:.2f} per month\n"
         
         # Calculate actual savings
@@ -734,8 +873,7 @@ class FinanceChatbot:
             response += f"- You're under your savings target by ${savings_budget - actual_savings:.2f} per month\n"
         else:
             response += f"- You're exceeding your savings target by ${actual_savings - savings_budget:.2f} per month\n"
-        
-        return response
+        yield response
 
 # Example usage
 if __name__ == "__main__":
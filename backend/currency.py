@@ -0,0 +1,134 @@
+import os
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+from ledger import MIN_NS, dates_to_ns
+
+# Currency every rate is quoted against
+PIVOT_CURRENCY = "USD"
+
+# Approximate units per US dollar, used for every date when no rate file is configured
+DEFAULT_RATES = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 150.0, "CAD": 1.36,
+    "AUD": 1.52, "CHF": 0.88, "CNY": 7.2, "INR": 83.0, "MXN": 17.0
+}
+
+
+class FxRates:
+    """
+    Date-indexed exchange rates held as NumPy arrays.
+
+    Each currency has a sorted array of dates and the rate (units per US
+    dollar) in effect from each date. Converting a column is one
+    `searchsorted` per distinct currency, never a per-row lookup. Dates
+    before a currency's first rate use that first rate.
+    """
+
+    def __init__(self, rates: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """
+        Initialize from per-currency arrays.
+
+        Args:
+            rates: Sorted int64 nanosecond dates and units per US dollar, by currency code
+        """
+        self._rates = rates
+
+    @classmethod
+    def from_frame(cls, table: pd.DataFrame) -> "FxRates":
+        """
+        Build rates from a table.
+
+        Args:
+            table: DataFrame with 'date', 'currency' and 'rate' (units per US dollar) columns
+
+        Returns:
+            A new FxRates
+        """
+        table = table.assign(currency=table['currency'].str.upper(), date=dates_to_ns(table['date']))
+        table = table.dropna(subset=['rate']).sort_values(['currency', 'date'], kind='stable')
+        rates = {
+            currency: (group['date'].to_numpy(dtype=np.int64), group['rate'].to_numpy(dtype=np.float64))
+            for currency, group in table.groupby('currency', sort=False)
+        }
+        rates.setdefault(PIVOT_CURRENCY, (np.array([MIN_NS], dtype=np.int64), np.array([1.0])))
+        return cls(rates)
+
+    @classmethod
+    def default(cls) -> "FxRates":
+        """Rates from DEFAULT_RATES, constant over time"""
+        return cls({
+            currency: (np.array([MIN_NS], dtype=np.int64), np.array([rate]))
+            for currency, rate in DEFAULT_RATES.items()
+        })
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "FxRates":
+        """
+        Load rates from a CSV file, falling back to the default rates.
+
+        Args:
+            path: CSV with 'date', 'currency' and 'rate' columns (defaults to CHASER_FX_RATES_FILE)
+
+        Returns:
+            A new FxRates
+        """
+        path = path or os.environ.get("CHASER_FX_RATES_FILE")
+        if path:
+            try:
+                return cls.from_frame(pd.read_csv(path))
+            except Exception as e:
+                print(f"Error loading FX rates file: {e}")
+        return cls.default()
+
+    @property
+    def currencies(self) -> List[str]:
+        """Supported currency codes"""
+        return sorted(self._rates)
+
+    def supports(self, currency: Any) -> bool:
+        """Whether rates exist for a currency code"""
+        return isinstance(currency, str) and currency.upper() in self._rates
+
+    def _rates_at(self, currency: str, dates: np.ndarray) -> np.ndarray:
+        """Units per US dollar of one currency in effect at each date"""
+        rate_dates, rates = self._rates[currency]
+        positions = np.searchsorted(rate_dates, dates, side='right') - 1
+        return rates[np.maximum(positions, 0)]
+
+    def convert(self, amounts: np.ndarray, currencies: np.ndarray, dates: np.ndarray, base: str) -> np.ndarray:
+        """
+        Convert amounts in mixed currencies to one base currency.
+
+        Args:
+            amounts: Amounts in their own currencies
+            currencies: Currency code of each amount
+            dates: int64 nanosecond date of each amount (its rate date)
+            base: Currency to convert to
+
+        Returns:
+            Amounts in the base currency
+
+        Raises:
+            ValueError: If a currency has no rates
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        base = base.upper()
+        # Normalize case on the distinct codes only, then merge codes that differed by case
+        codes, uniques = pd.factorize(np.asarray(currencies, dtype=object))
+        merged, uniques = pd.factorize(pd.Series(uniques, dtype=object).str.upper())
+        codes = np.where(codes >= 0, merged[codes], -1)
+        unknown = [currency for currency in uniques if currency not in self._rates]
+        if unknown or base not in self._rates:
+            raise ValueError(f"No exchange rates for: {', '.join(unknown or [base])}")
+
+        # Units of each amount's currency per unit of base currency, one currency at a time
+        factors = np.ones(len(amounts))
+        base_rates = self._rates_at(base, dates)
+        for code, currency in enumerate(uniques):
+            if currency == base:
+                continue
+            rows = np.flatnonzero(codes == code)
+            factors[rows] = self._rates_at(currency, dates[rows]) / base_rates[rows]
+        return amounts / factors
@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Any
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Formats and the media type each one is served with
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Rows converted at a time; peak memory depends on this, not on history length
+CHUNK_ROWS = 10_000
+
+# Columns of the flat record layout shared by CSV and Parquet exports
+RECORD_COLUMNS = ["record_type", "date", "amount", "currency", "original_amount", "category", "merchant", "source", "description"]
+
+
+def _analysis(analyzer: Any, snapshot: Any) -> Dict[str, Any]:
+    """Summary analyses included with JSON and NDJSON exports, of the same snapshot as the rows"""
+    return analyzer.analysis_summary(snapshot)
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Slice a frame into row chunks without copying it"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _records(snapshot: Any, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Expense then income rows as chunks in the flat record layout"""
+    for record_type, df in (("expense", snapshot.expenses), ("income", snapshot.income)):
+        for chunk in _chunks(df, chunk_rows):
+            yield chunk.assign(record_type=record_type).reindex(columns=RECORD_COLUMNS)
+
+
+def _iter_json(analyzer: Any, snapshot: Any, chunk_rows: int) -> Iterator[bytes]:
+    """One JSON document with the same layout `export_data_to_json` always wrote"""
+    yield f'{{"user_id": {json.dumps(analyzer.user_id)}'.encode()
+    for key, df in (("expenses", snapshot.expenses), ("income", snapshot.income)):
+        yield f', "{key}": ['.encode()
+        for i, chunk in enumerate(_chunks(df, chunk_rows)):
+            # Records of a chunk, without the surrounding brackets
+            rows = chunk.to_json(orient='records', date_format='iso')[1:-1]
+            yield (("," if i else "") + rows).encode()
+        yield b']'
+    yield f', "analysis": {json.dumps(_analysis(analyzer, snapshot), default=str)}}}'.encode()
+
+
+def _iter_ndjson(analyzer: Any, snapshot: Any, chunk_rows: int) -> Iterator[bytes]:
+    """A metadata line, one line per expense and income row, then an analysis line"""
+    meta = {
+        "type": "meta",
+        "user_id": analyzer.user_id,
+        "version": snapshot.version,
+        "exported_at": datetime.now().isoformat()
+    }
+    yield (json.dumps(meta) + "\n").encode()
+    for record_type, df in (("expense", snapshot.expenses), ("income", snapshot.income)):
+        for chunk in _chunks(df, chunk_rows):
+            lines = chunk.assign(type=record_type).to_json(orient='records', lines=True, date_format='iso')
+            # Older pandas versions leave off the final newline
+            yield (lines if lines.endswith("\n") else lines + "\n").encode()
+    yield (json.dumps({"type": "analysis", **_analysis(analyzer, snapshot)}, default=str) + "\n").encode()
+
+
+def _iter_csv(snapshot: Any, chunk_rows: int) -> Iterator[bytes]:
+    """Expense and income rows in one table, told apart by `record_type`"""
+    yield (",".join(RECORD_COLUMNS) + "\n").encode()
+    for chunk in _records(snapshot, chunk_rows):
+        yield chunk.to_csv(index=False, header=False, date_format="%Y-%m-%d").encode()
+
+
+class _ChunkSink:
+    """Write-only file object that collects what is written until it is drained"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _iter_parquet(snapshot: Any, chunk_rows: int) -> Iterator[bytes]:
+    """Rows in the flat record layout, one Parquet row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("record_type", pa.string()),
+        ("date", pa.timestamp("ns")),
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        ("merchant", pa.string()),
+        ("source", pa.string()),
+        ("description", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    for chunk in _records(snapshot, chunk_rows):
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def check_format(fmt: str) -> None:
+    """
+    Check that an export format is supported and its optional dependency is installed.
+
+    Args:
+        fmt: Requested format
+
+    Raises:
+        ValueError: If the format can't be exported
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow")
+
+
+def iter_export(analyzer: Any, fmt: str = "ndjson", chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Export a user's data incrementally, one chunk of rows at a time.
+
+    All chunks come from a single snapshot, so the export is consistent even
+    if the user writes while it is running. The format is checked before
+    anything is produced.
+
+    Args:
+        analyzer: The user's FinanceAnalyzer
+        fmt: One of EXPORT_FORMATS
+        chunk_rows: Rows converted per chunk
+
+    Returns:
+        Iterator over consecutive pieces of the encoded export
+
+    Raises:
+        ValueError: If the format can't be exported
+    """
+    check_format(fmt)
+    snapshot = analyzer.snapshot()
+    if fmt == "json":
+        return _iter_json(analyzer, snapshot, chunk_rows)
+    if fmt == "ndjson":
+        return _iter_ndjson(analyzer, snapshot, chunk_rows)
+    if fmt == "csv":
+        return _iter_csv(snapshot, chunk_rows)
+    return _iter_parquet(snapshot, chunk_rows)
+
+
+def write_export(analyzer: Any, path: str, fmt: str = "ndjson", chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Export a user's data to a file, atomically.
+
+    Args:
+        analyzer: The user's FinanceAnalyzer
+        path: File to write
+        fmt: One of EXPORT_FORMATS
+        chunk_rows: Rows converted per chunk
+
+    Returns:
+        Number of bytes written
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    written = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for piece in iter_export(analyzer, fmt, chunk_rows):
+                f.write(piece)
+                written += len(piece)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
+
+
+def _export_user(user_id: str, output_dir: str, fmt: str, data_dir: Optional[str]) -> Optional[int]:
+    """Export one user's data (runs in a worker process); None if their data files are missing"""
+    from batch_jobs import load_user_analyzer
+
+    analyzer = load_user_analyzer(user_id, data_dir)
+    if analyzer is None:
+        return None
+    return write_export(analyzer, os.path.join(output_dir, f"{user_id}.{fmt}"), fmt)
+
+
+def export_users(user_ids: List[str], output_dir: str, fmt: str = "ndjson", data_dir: Optional[str] = None,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Export many users in parallel, one file per user.
+
+    Args:
+        user_ids: Users to export
+        output_dir: Directory to write `<user_id>.<fmt>` files to
+        fmt: One of EXPORT_FORMATS
+        data_dir: Directory with user CSV files (users without them are reported unavailable)
+        workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        Summary with exported, failed and unavailable users and bytes written
+    """
+    check_format(fmt)
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    exported, failed, unavailable, total_bytes = 0, [], [], 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = {
+            executor.submit(_export_user, user_id, output_dir, fmt, data_dir): user_id
+            for user_id in dict.fromkeys(user_ids)
+        }
+        for future in as_completed(futures):
+            try:
+                written = future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                logger.warning("Error exporting %s: %s", futures[future], e)
+                continue
+            if written is None:
+                unavailable.append(futures[future])
+            else:
+                total_bytes += written
+                exported += 1
+
+    return {
+        "exported": exported,
+        "failed": failed,
+        "unavailable": unavailable,
+        "bytes": total_bytes,
+        "seconds": time.perf_counter() - start
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export users' financial data")
+    parser.add_argument("users", nargs="*", default=["user1"])
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--output-dir", default="exports")
+    parser.add_argument("--data-dir", help="Directory with <user>_expenses.csv and <user>_income.csv")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to the CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    summary = export_users(args.users, args.output_dir, args.format, args.data_dir, args.workers)
+    logger.info("Exported %d users (%d failed, %d without data files), %d bytes in %.1fs",
+                summary['exported'], len(summary['failed']), len(summary['unavailable']), summary['bytes'],
+                summary['seconds'])
@@ -1,9 +1,53 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
-import json
+from dataclasses import dataclass
+import threading
+from ledger import ExpenseLedger, MIN_NS, MAX_NS, dates_to_ns, to_ns
+from forecasting import ExpenseForecast, forecast_expenses, AVG_DAYS_PER_MONTH
+from budgets import BudgetAlert, BudgetTracker
+from anomalies import AnomalyDetector, FlaggedExpense
+from recurring import RecurringSeries, detect_recurring
+from categorizer import CategoryIndex, Categorizer
+from search import SearchIndex, rank_page
+from sync import TRANSACTION_KINDS, SyncLog
+from currency import FxRates, PIVOT_CURRENCY
+from partitions import MonthPartitions, month_of_ns, month_start_ns
+
+NS_PER_DAY = 86_400_000_000_000
+
+EXPENSE_COLUMNS = ['date', 'amount', 'category', 'merchant', 'user_id', 'description', 'id', 'currency', 'original_amount']
+INCOME_COLUMNS = ['date', 'amount', 'source', 'description', 'user_id', 'id', 'currency', 'original_amount']
+
+@dataclass(frozen=True)
+class FinanceSnapshot:
+    """
+    Immutable version of a user's financial data.
+    
+    Readers pin a snapshot and use its frames directly; writers never modify
+    one in place but publish a new snapshot with the next version number.
+    Publishing is a single reference assignment, so readers never take a lock.
+    """
+    version: int
+    expenses: pd.DataFrame
+    income: pd.DataFrame
+    ledger: ExpenseLedger
+    partitions: MonthPartitions
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """
+    Every figure shown on the dashboard, built from a single pass over the data.
+    """
+    total_income: float
+    total_expenses: float
+    expenses_by_category: Dict[str, float]
+    expenses_over_time: pd.Series
+    income_vs_expenses: pd.DataFrame
+    top_merchants: List[Tuple[str, float]]
+    budget_recommendations: Dict[str, float]
+    recent_transactions: pd.DataFrame
 
 class FinanceAnalyzer:
     """
@@ -12,22 +56,180 @@ class FinanceAnalyzer:
     and generating insights about financial patterns.
     """
     
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, global_categories: Optional[CategoryIndex] = None,
+                 fx_rates: Optional[FxRates] = None, base_currency: str = PIVOT_CURRENCY):
         """
         Initialize the FinanceAnalyzer with a user ID.
         
         Args:
             user_id: The unique identifier for the user
+            global_categories: Merchant categories learned from all users, for auto-categorization
+            fx_rates: Exchange rates for transactions in other currencies (defaults to FxRates.default())
+            base_currency: Currency every analysis reports in
         """
         self.user_id = user_id
-        self.expenses = []
-        self.income = []
+        self.global_categories = global_categories
+        self.fx_rates = fx_rates or FxRates.default()
+        self.base_currency = base_currency.upper()
+        self._snapshot = None
+        self._write_lock = threading.Lock()  # Serializes writers only
+        self._forecast_cache = {}  # horizon -> ((version, month), forecast)
+        self._budget_tracker = None
+        self._budget_dirty = False
+        self._anomaly_detector = None
+        self._anomaly_dirty = False
+        self._category_index = None
+        self._search_index = None
+        self._sync = SyncLog()
         self.budget = {}
         self.categories = [
             "Housing", "Food", "Transportation", "Entertainment", 
             "Utilities", "Healthcare", "Shopping", "Education", 
             "Personal Care", "Travel", "Debt Payments", "Other"
         ]
+        
+        # Start from an empty version until data is loaded
+        self._publish(
+            pd.DataFrame(columns=EXPENSE_COLUMNS).astype({'id': np.int64}),
+            pd.DataFrame(columns=INCOME_COLUMNS).astype({'id': np.int64})
+        )
+    
+    def snapshot(self) -> FinanceSnapshot:
+        """
+        Get the current immutable version of the user's data.
+        
+        Returns:
+            FinanceSnapshot that stays consistent however many writes follow
+        """
+        return self._snapshot
+    
+    @property
+    def expenses(self) -> pd.DataFrame:
+        """Expenses of the current version (treat as read-only)"""
+        return self._snapshot.expenses
+    
+    @expenses.setter
+    def expenses(self, expenses: pd.DataFrame) -> None:
+        with self._write_lock:
+            expenses = self._to_base(expenses)
+            self._replace_expenses(expenses.assign(id=self._sync.assign('expense', len(expenses))))
+            self._category_index = None
+    
+    def _replace_expenses(self, expenses: pd.DataFrame) -> None:
+        """Publish a rewritten expenses frame, rebuilding what was derived from it. Callers must hold the write lock"""
+        # Dropped before publishing, so a reader of the new version never finds the old index
+        self._search_index = None
+        self._publish(expenses, self._snapshot.income)
+        self._budget_dirty = True
+        self._anomaly_dirty = True
+    
+    @property
+    def income(self) -> pd.DataFrame:
+        """Income of the current version (treat as read-only)"""
+        return self._snapshot.income
+    
+    @income.setter
+    def income(self, income: pd.DataFrame) -> None:
+        with self._write_lock:
+            income = self._to_base(income)
+            self._replace_income(income.assign(id=self._sync.assign('income', len(income))))
+    
+    def _replace_income(self, income: pd.DataFrame) -> None:
+        """Publish a rewritten income frame. Callers must hold the write lock"""
+        self._publish(self._snapshot.expenses, income, self._snapshot.ledger)
+        self._budget_dirty = True
+    
+    def _to_base(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert a frame's amounts to the base currency in one vectorized pass.
+        
+        'amount' becomes the base-currency amount every analysis reads, while
+        'original_amount' and 'currency' keep what was recorded. Conversion
+        happens once per write and is kept in the published version, so reads
+        never convert. Rows without a currency are in the base currency.
+        
+        Args:
+            frame: Expenses or income, optionally with 'currency' and 'original_amount' columns
+            
+        Returns:
+            The frame with base-currency amounts
+        """
+        if 'currency' in frame.columns:
+            currencies = frame['currency'].fillna(self.base_currency).astype(str).str.upper()
+        else:
+            currencies = pd.Series(self.base_currency, index=frame.index, dtype=object)
+        original = frame['original_amount'] if 'original_amount' in frame.columns else frame['amount']
+        
+        if (currencies == self.base_currency).all():
+            amounts = original
+        else:
+            amounts = self.fx_rates.convert(
+                original.to_numpy(dtype=np.float64), currencies.to_numpy(), dates_to_ns(frame['date']), self.base_currency
+            )
+        return frame.assign(currency=currencies, original_amount=original, amount=amounts)
+    
+    def _record_to_base(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a single transaction's amount to the base currency (see _to_base)"""
+        currency = (record.get('currency') or self.base_currency).upper()
+        original = record['amount']
+        amount = original
+        if currency != self.base_currency and not pd.isna(original):
+            amount = float(self.fx_rates.convert(
+                np.array([original]), np.array([currency], dtype=object),
+                np.array([to_ns(record['date'], MIN_NS)]), self.base_currency
+            )[0])
+        return dict(record, currency=currency, original_amount=original, amount=amount)
+    
+    def set_base_currency(self, currency: str) -> int:
+        """
+        Change the currency every analysis reports in, reconverting all amounts.
+        
+        Args:
+            currency: Currency code
+            
+        Returns:
+            Version number of the published snapshot
+            
+        Raises:
+            ValueError: If there are no exchange rates for the currency
+        """
+        if not self.fx_rates.supports(currency):
+            raise ValueError(f"No exchange rates for: {currency}")
+        with self._write_lock:
+            self.base_currency = currency.upper()
+            snapshot = self._snapshot
+            expenses, income = self._to_base(snapshot.expenses), self._to_base(snapshot.income)
+            # Every amount changed under the same ids, so clients resync both kinds in full
+            for kind in TRANSACTION_KINDS:
+                self._sync.rewrite(kind)
+            self._publish(expenses, income)
+            self._budget_dirty = True
+            self._anomaly_dirty = True
+            return self._snapshot.version
+    
+    def _publish(self, expenses: pd.DataFrame, income: pd.DataFrame, ledger: Optional[ExpenseLedger] = None,
+                 partitions: Optional[MonthPartitions] = None) -> None:
+        """
+        Publish a new version of the user's data. Callers must hold the write lock.
+        
+        Args:
+            expenses: Expenses of the new version
+            income: Income of the new version
+            ledger: Ledger matching `expenses` (rebuilt when not given)
+            partitions: Month partitions matching both frames (rebuilt when not given)
+        """
+        # Parse dates once per version so readers never have to
+        if not pd.api.types.is_datetime64_any_dtype(expenses['date']):
+            expenses = expenses.assign(date=pd.to_datetime(expenses['date']))
+        if not pd.api.types.is_datetime64_any_dtype(income['date']):
+            income = income.assign(date=pd.to_datetime(income['date']))
+        if ledger is None:
+            ledger = ExpenseLedger.from_frame(expenses)
+        if partitions is None:
+            partitions = MonthPartitions.from_frames(expenses, income)
+        
+        version = self._snapshot.version + 1 if self._snapshot else 0
+        self._snapshot = FinanceSnapshot(version, expenses, income, ledger, partitions)
     
     def load_data(self, expenses_file: Optional[str] = None, income_file: Optional[str] = None) -> None:
         """
@@ -39,7 +241,7 @@ class FinanceAnalyzer:
         """
         if expenses_file:
             try:
-                self.expenses = pd.read_csv(expenses_file)
+                self.expenses = self._fill_categories(pd.read_csv(expenses_file))
             except Exception as e:
                 print(f"Error loading expenses file: {e}")
                 self.expenses = self._generate_mock_expenses()
@@ -55,6 +257,33 @@ class FinanceAnalyzer:
         else:
             self.income = self._generate_mock_income()
     
+    def _fill_categories(self, expenses: pd.DataFrame) -> pd.DataFrame:
+        """
+        Categorize imported expenses that arrived without a category.
+        
+        Labeled rows of the same import teach the user's index first, so a
+        partly categorized bank export categorizes the rest consistently.
+        
+        Args:
+            expenses: Imported expenses ('category' may be missing or empty)
+            
+        Returns:
+            The expenses with every category filled in
+        """
+        if 'category' not in expenses.columns:
+            expenses = expenses.assign(category=np.nan)
+        missing = expenses['category'].isna().to_numpy()
+        if not missing.any():
+            return expenses
+        
+        categorizer = Categorizer(CategoryIndex.from_frame(expenses), self.global_categories)
+        rows = expenses[missing]
+        merchants = rows['merchant'] if 'merchant' in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+        descriptions = rows['description'] if 'description' in rows.columns else None
+        categories = expenses['category'].to_numpy(dtype=object, copy=True)
+        categories[missing] = categorizer.categorize_many(merchants, descriptions)
+        return expenses.assign(category=categories)
+    
     def _generate_mock_expenses(self) -> pd.DataFrame:
         """
         Generate mock expense data for testing and demonstration.
@@ -181,6 +410,208 @@ class FinanceAnalyzer:
         
         return income_df
     
+    def _expense_ledger(self) -> ExpenseLedger:
+        """
+        Get the prefix-sum ledger for the current expenses.
+        
+        Returns:
+            ExpenseLedger of the current version
+        """
+        return self._snapshot.ledger
+    
+    def add_expense(self, expense: Dict[str, Any], learn_category: bool = True) -> int:
+        """
+        Append a single expense, publishing a new version with extended indexes.
+        
+        Writers are serialized so each one builds on the latest version and no
+        write is lost; readers keep using whichever version they pinned.
+        
+        Args:
+            expense: Dictionary with 'date', 'amount', 'category', 'description', 'merchant' and
+                optionally 'currency' (defaults to the base currency); a missing category is
+                filled in from the merchant and description
+            learn_category: Teach the categorizer the expense's category (off when
+                the category came from the categorizer itself)
+            
+        Returns:
+            Version number of the published snapshot
+        """
+        expense = self._record_to_base(dict(expense, date=pd.to_datetime(expense['date'])))
+        if pd.isna(expense.get('category')):
+            expense['category'] = self.categorize_expense(expense.get('merchant'), expense.get('description'))
+        elif learn_category:
+            self.category_index().learn(expense.get('merchant'), expense['category'])
+        new_row = pd.DataFrame([expense])
+        
+        with self._write_lock:
+            snapshot = self._snapshot
+            new_row = new_row.assign(id=self._sync.next())
+            ledger = snapshot.ledger.append(
+                expense['date'], expense['amount'], expense['category'], expense.get('merchant'),
+                row=len(snapshot.expenses)
+            )
+            partitions = snapshot.partitions.add_expense(
+                expense['date'], expense['amount'], expense['category'], expense.get('merchant')
+            )
+            expenses = pd.concat([snapshot.expenses, new_row], ignore_index=True)
+            if self._search_index is not None:
+                self._search_index.add(len(snapshot.expenses), expense)
+            
+            # Started from the version before this write, so the expense is counted once
+            tracker = self._current_budget_tracker()
+            detector = self._current_anomaly_detector()
+            self._publish(expenses, snapshot.income, ledger, partitions)
+            
+            # Month-to-date counters only see expenses dated in the tracked month
+            if str(expense['date'].to_period('M')) == tracker.month and not pd.isna(expense['amount']):
+                tracker.record(expense['category'], float(expense['amount']))
+            
+            # Scored against the history before it, then added to that history
+            detector.observe(expense['date'], expense['amount'], expense['category'], expense.get('merchant'))
+            return self._snapshot.version
+    
+    def add_income(self, income: Dict[str, Any]) -> int:
+        """
+        Append a single income entry, publishing a new version.
+        
+        Args:
+            income: Dictionary with 'date', 'amount', 'source', 'description' and optionally 'currency'
+            
+        Returns:
+            Version number of the published snapshot
+        """
+        income = self._record_to_base(dict(income, date=pd.to_datetime(income['date'])))
+        new_row = pd.DataFrame([income])
+        
+        with self._write_lock:
+            snapshot = self._snapshot
+            new_row = new_row.assign(id=self._sync.next())
+            partitions = snapshot.partitions.add_income(income['date'], income['amount'])
+            income_df = pd.concat([snapshot.income, new_row], ignore_index=True)
+            self._publish(snapshot.expenses, income_df, snapshot.ledger, partitions)
+            return self._snapshot.version
+    
+    def delete_transaction(self, kind: str, transaction_id: int) -> Optional[int]:
+        """
+        Delete an expense or income entry, leaving a tombstone for syncing clients.
+        
+        Args:
+            kind: 'expense' or 'income'
+            transaction_id: Id of the transaction
+            
+        Returns:
+            Version number of the published snapshot, or None if there is no such transaction
+        """
+        return self.replace_transaction(kind, transaction_id, None)
+    
+    def replace_transaction(self, kind: str, transaction_id: int, record: Optional[Dict[str, Any]]) -> Optional[int]:
+        """
+        Replace an expense or income entry with an edited version.
+        
+        Transactions are never changed in place: the old id gets a tombstone
+        and the edited version is stored under a new id. The indexes are
+        rebuilt, as they are when the data is loaded.
+        
+        Args:
+            kind: 'expense' or 'income'
+            transaction_id: Id of the transaction
+            record: The edited transaction (None to delete it)
+            
+        Returns:
+            Version number of the published snapshot, or None if there is no such transaction
+        """
+        if record is not None:
+            record = self._record_to_base(dict(record, date=pd.to_datetime(record['date'])))
+            if kind == 'expense' and pd.isna(record.get('category')):
+                record['category'] = self.categorize_expense(record.get('merchant'), record.get('description'))
+        
+        with self._write_lock:
+            frame = self._snapshot.expenses if kind == 'expense' else self._snapshot.income
+            keep = frame['id'].to_numpy() != transaction_id
+            if keep.all():
+                return None
+            
+            frame = frame[keep]
+            self._sync.remove(kind, transaction_id)
+            if record is not None:
+                frame = pd.concat([frame, pd.DataFrame([dict(record, id=self._sync.next())])])
+            frame = frame.reset_index(drop=True)
+            
+            if kind == 'expense':
+                self._replace_expenses(frame)
+            else:
+                self._replace_income(frame)
+            return self._snapshot.version
+    
+    def changes_since(self, since: int = 0) -> Dict[str, Any]:
+        """
+        Get the transactions stored and removed after a sequence number.
+        
+        Ids only grow along each frame, so the new rows are found with a
+        binary search and the cost follows the number of changes, not the
+        size of the account.
+        
+        Args:
+            since: Last sequence number the client has seen (0 for everything)
+            
+        Returns:
+            Dictionary with the current 'seq', new 'expenses' and 'income' frames,
+            'tombstones', and 'full' kinds the client must replace rather than update
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            seq = self._sync.seq
+            tombstones = self._sync.tombstones_since(since)
+            full = [kind for kind in ('expense', 'income') if self._sync.needs_full(kind, since)]
+        
+        def rows_after(frame: pd.DataFrame, kind: str) -> pd.DataFrame:
+            if kind in full:
+                return frame
+            return frame.iloc[int(np.searchsorted(frame['id'].to_numpy(), since, side='right')):]
+        
+        return {
+            "seq": seq,
+            "expenses": rows_after(snapshot.expenses, 'expense'),
+            "income": rows_after(snapshot.income, 'income'),
+            "tombstones": [tombstone for tombstone in tombstones if tombstone.kind not in full],
+            "full": full
+        }
+    
+    def filter_expenses(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        category: Optional[str] = None) -> pd.DataFrame:
+        """
+        Get the expenses within a date range, located through the ledger.
+        
+        Only the matching rows are materialized, so the cost of a read
+        follows the size of the result, not of the history.
+        
+        Args:
+            start_date: Start date, inclusive (format: 'YYYY-MM-DD')
+            end_date: End date, inclusive (format: 'YYYY-MM-DD')
+            category: Only include expenses in this category
+            
+        Returns:
+            DataFrame of the matching expenses in frame order (treat as read-only)
+        """
+        snapshot = self._snapshot
+        rows = snapshot.ledger.rows_between(start_date or None, end_date or None, category or None)
+        return snapshot.expenses.iloc[np.sort(rows)]
+    
+    def total_between(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                      category: Optional[str] = None) -> float:
+        """
+        Get the total spent between two dates using the prefix-sum index.
+        
+        Args:
+            start_date: Start date, inclusive (format: 'YYYY-MM-DD')
+            end_date: End date, inclusive (format: 'YYYY-MM-DD')
+            category: Only count expenses in this category
+            
+        Returns:
+            Total amount spent in the range
+        """
+        return self._expense_ledger().total_between(start_date, end_date, category)
+    
     def analyze_expenses_by_category(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, float]:
         """
         Analyze expenses by category within a date range.
@@ -192,16 +623,8 @@ class FinanceAnalyzer:
         Returns:
             Dictionary mapping categories to total expenses
         """
-        df = self.expenses.copy()
-        
-        # Filter by date range if provided
-        if start_date:
-            df = df[df['date'] >= start_date]
-        if end_date:
-            df = df[df['date'] <= end_date]
-        
-        # Group by category and sum amounts
-        category_totals = df.groupby('category')['amount'].sum().to_dict()
+        # Two binary searches per category instead of masking the whole frame
+        category_totals = self._expense_ledger().category_totals_between(start_date or None, end_date or None)
         
         return category_totals
     
@@ -215,16 +638,10 @@ class FinanceAnalyzer:
         Returns:
             DataFrame with expenses aggregated by time period
         """
-        df = self.expenses.copy()
-        
-        # Convert date to datetime if it's not already
-        if not pd.api.types.is_datetime64_any_dtype(df['date']):
-            df['date'] = pd.to_datetime(df['date'])
-        
-        # Group by date with specified frequency and sum amounts
-        expenses_over_time = df.groupby(pd.Grouper(key='date', freq=frequency))['amount'].sum().reset_index()
+        # Assembled from the daily totals of the month partitions, without touching the rows
+        expenses_over_time = self.snapshot().partitions.resample(frequency)
         
-        return expenses_over_time
+        return expenses_over_time.rename_axis('date').rename('amount').reset_index()
     
     def analyze_income_vs_expenses(self, frequency: str = 'M') -> pd.DataFrame:
         """
@@ -236,46 +653,92 @@ class FinanceAnalyzer:
         Returns:
             DataFrame with income, expenses, and savings by time period
         """
-        # Prepare expenses
-        expenses_df = self.expenses.copy()
-        if not pd.api.types.is_datetime64_any_dtype(expenses_df['date']):
-            expenses_df['date'] = pd.to_datetime(expenses_df['date'])
-        
-        expenses_by_period = expenses_df.groupby(pd.Grouper(key='date', freq=frequency))['amount'].sum()
-        
-        # Prepare income
-        income_df = self.income.copy()
-        if not pd.api.types.is_datetime64_any_dtype(income_df['date']):
-            income_df['date'] = pd.to_datetime(income_df['date'])
+        partitions = self.snapshot().partitions
         
-        income_by_period = income_df.groupby(pd.Grouper(key='date', freq=frequency))['amount'].sum()
+        # Both series come from the month partitions' daily totals
+        expenses_by_period = partitions.resample(frequency)
+        income_by_period = partitions.resample(frequency, income=True)
         
         # Combine into a single DataFrame
         comparison = pd.DataFrame({
             'income': income_by_period,
             'expenses': expenses_by_period
-        }).fillna(0)
+        }).fillna(0).rename_axis('date')
         
         # Calculate savings
         comparison['savings'] = comparison['income'] - comparison['expenses']
         
         return comparison
     
-    def get_top_merchants(self, n: int = 5) -> pd.DataFrame:
+    def get_top_merchants(self, n: int = 5, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """
         Get the top merchants by total spending.
         
         Args:
             n: Number of top merchants to return
+            start_date: Only count expenses from this date (format: 'YYYY-MM-DD')
+            end_date: Only count expenses up to this date (format: 'YYYY-MM-DD')
             
         Returns:
             DataFrame with top merchants and their total amounts
         """
-        merchant_totals = self.expenses.groupby('merchant')['amount'].sum().reset_index()
-        top_merchants = merchant_totals.sort_values('amount', ascending=False).head(n)
+        # Partial selection over running merchant totals, no full sort
+        top = self._expense_ledger().top_merchants(n, start_date or None, end_date or None)
+        top_merchants = pd.DataFrame(top, columns=['merchant', 'amount'])
         
         return top_merchants
     
+    def detect_recurring_payments(self, as_of: Optional[str] = None) -> List[RecurringSeries]:
+        """
+        Find subscriptions and other charges that repeat on a regular schedule.
+        
+        Args:
+            as_of: Date that decides whether a series is still active (defaults to the latest expense)
+            
+        Returns:
+            List of RecurringSeries, highest monthly cost first
+        """
+        snapshot = self._snapshot
+        return detect_recurring(snapshot.ledger, snapshot.expenses['category'].to_numpy(), as_of)
+    
+    def forecast_expenses(self, horizon: int = 3) -> ExpenseForecast:
+        """
+        Forecast monthly expenses for every category.
+        
+        Fits trend (and seasonality, given two years of history) for all
+        categories at once; the result is cached per data version.
+        
+        Args:
+            horizon: Number of months to forecast, starting with the current month
+            
+        Returns:
+            ExpenseForecast with per-category values for each month
+        """
+        return self._forecast_from(self.snapshot(), horizon)
+    
+    def _forecast_from(self, snapshot: FinanceSnapshot, horizon: int) -> ExpenseForecast:
+        """
+        Forecast from a pinned snapshot, reusing the last forecast when possible.
+        
+        The last forecast of each horizon is kept, so callers asking for
+        different horizons don't evict each other's.
+        
+        Args:
+            snapshot: Version of the data to forecast from
+            horizon: Number of months to forecast
+            
+        Returns:
+            ExpenseForecast for the snapshot
+        """
+        key = (snapshot.version, pd.Period(datetime.now(), freq='M'))
+        cached = self._forecast_cache.get(horizon)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        forecast = forecast_expenses(snapshot.expenses, horizon=horizon)
+        self._forecast_cache[horizon] = (key, forecast)
+        return forecast
+    
     def predict_monthly_expenses(self) -> Dict[str, float]:
         """
         Predict expenses for the next month based on historical data.
@@ -283,18 +746,50 @@ class FinanceAnalyzer:
         Returns:
             Dictionary with predicted expenses by category
         """
-        # Get expenses from the last 3 months
-        three_months_ago = datetime.now() - timedelta(days=90)
-        recent_expenses = self.expenses[pd.to_datetime(self.expenses['date']) >= three_months_ago]
+        return self._predict_from(self.snapshot())
+    
+    def _predict_from(self, snapshot: FinanceSnapshot) -> Dict[str, float]:
+        """
+        Next month's forecast by category for a pinned snapshot.
         
-        # Group by category and calculate average monthly spending
-        monthly_avg = recent_expenses.groupby('category')['amount'].sum() / 3
+        Args:
+            snapshot: Version of the data to predict from
+            
+        Returns:
+            Dictionary with predicted expenses by category
+        """
+        forecast = self._forecast_from(snapshot, horizon=2)
+        next_month = pd.Period(datetime.now(), freq='M') + 1
         
-        # Create prediction dictionary
-        predictions = monthly_avg.to_dict()
+        # Only categories the user is still expected to spend on
+        predictions = {category: amount for category, amount in forecast.for_month(next_month).items() if amount > 0}
         
         return predictions
     
+    def history_months(self) -> float:
+        """
+        Length of the user's history in months.
+        
+        Returns:
+            Number of months (at least 1)
+        """
+        return self._history_months(self.snapshot())
+    
+    def _history_months(self, snapshot: FinanceSnapshot) -> float:
+        """
+        Length of the user's history in months, from the first to the last transaction.
+        
+        Args:
+            snapshot: The version to measure
+            
+        Returns:
+            Number of months (at least 1)
+        """
+        days = snapshot.partitions.history_days()
+        if days is None:
+            return 1.0
+        return max((days[1] - days[0] + 1) / AVG_DAYS_PER_MONTH, 1.0)
+    
     def generate_budget_recommendations(self) -> Dict[str, float]:
         """
         Generate budget recommendations based on income and historical spending.
@@ -302,12 +797,49 @@ class FinanceAnalyzer:
         Returns:
             Dictionary with recommended budget amounts by category
         """
+        return self._recommendations_from(self.snapshot())
+    
+    def _recommendations_from(self, snapshot: FinanceSnapshot) -> Dict[str, float]:
+        """Budget recommendations for a pinned snapshot (see generate_budget_recommendations)"""
         # Calculate average monthly income
-        monthly_income = self.income['amount'].sum() / 3  # Assuming 3 months of data
+        monthly_income = snapshot.income['amount'].sum() / self._history_months(snapshot)
         
         # Get average monthly expenses by category
-        monthly_expenses = self.predict_monthly_expenses()
+        monthly_expenses = self._predict_from(snapshot)
         
+        return self._recommend_budget(monthly_income, monthly_expenses)
+    
+    def analysis_summary(self, snapshot: Optional[FinanceSnapshot] = None) -> Dict[str, Any]:
+        """
+        Summarize one version of the data: spending by category, top merchants,
+        next month's prediction and budget recommendations.
+        
+        Args:
+            snapshot: Version to summarize (defaults to the current one)
+            
+        Returns:
+            Dictionary of the four analyses, all computed from the same version
+        """
+        snapshot = snapshot or self.snapshot()
+        top = snapshot.ledger.top_merchants(5, None, None)
+        return {
+            "expenses_by_category": snapshot.ledger.category_totals_between(None, None),
+            "top_merchants": pd.DataFrame(top, columns=['merchant', 'amount']).to_dict(orient='records'),
+            "predicted_expenses": self._predict_from(snapshot),
+            "budget_recommendations": self._recommendations_from(snapshot)
+        }
+    
+    def _recommend_budget(self, monthly_income: float, monthly_expenses: Dict[str, float]) -> Dict[str, float]:
+        """
+        Apply the 50/30/20 rule to average monthly income and expenses.
+        
+        Args:
+            monthly_income: Average monthly income
+            monthly_expenses: Average monthly expenses by category
+            
+        Returns:
+            Dictionary with recommended budget amounts by category
+        """
         # Apply 50/30/20 rule (50% needs, 30% wants, 20% savings)
         needs_categories = ["Housing", "Food", "Transportation", "Utilities", "Healthcare", "Debt Payments"]
         wants_categories = ["Entertainment", "Shopping", "Personal Care", "Travel"]
@@ -343,29 +875,300 @@ class FinanceAnalyzer:
         
         return budget_recommendations
     
+    def set_budget(self, budget: Dict[str, float]) -> None:
+        """
+        Set the user's monthly budget by category, replacing the recommended one.
+        
+        Args:
+            budget: Monthly budget amounts by category (empty to use recommendations)
+        """
+        with self._write_lock:
+            self.budget = dict(budget)
+            self._budget_dirty = True
+    
+    def _current_budget_tracker(self) -> BudgetTracker:
+        """
+        Get the tracker for the current month, starting a new one if needed.
+        Callers must hold the write lock.
+        
+        Limits are the user's budget if set, otherwise the recommendations,
+        fixed for the month. A new tracker starts from the month-to-date totals
+        of the current month's partition.
+        
+        Returns:
+            The current month's BudgetTracker
+        """
+        month = pd.Period(datetime.now(), freq='M')
+        tracker = self._budget_tracker
+        if tracker is not None and tracker.month == str(month) and not self._budget_dirty:
+            return tracker
+        
+        snapshot = self._snapshot
+        limits = self.budget or self.generate_budget_recommendations()
+        partition = snapshot.partitions.months.get(month_of_ns(month.start_time.value))
+        spent = partition.by_category if partition is not None else {}
+        
+        self._budget_tracker = BudgetTracker(str(month), limits, spent, previous=tracker)
+        self._budget_dirty = False
+        return self._budget_tracker
+    
+    def budget_tracker(self) -> BudgetTracker:
+        """
+        Get the current month's budget counters.
+        
+        Returns:
+            The current month's BudgetTracker
+        """
+        tracker = self._budget_tracker
+        if tracker is not None and tracker.month == str(pd.Period(datetime.now(), freq='M')) and not self._budget_dirty:
+            return tracker
+        with self._write_lock:
+            return self._current_budget_tracker()
+    
+    def budget_alerts(self, after_id: int = 0) -> List[BudgetAlert]:
+        """
+        Get budget alerts raised after a given alert.
+        
+        Args:
+            after_id: Id of the last alert the caller has seen (0 for all)
+            
+        Returns:
+            Newer alerts, oldest first
+        """
+        return self.budget_tracker().alerts_since(after_id)
+    
+    def _current_anomaly_detector(self) -> AnomalyDetector:
+        """
+        Get the anomaly detector, backfilling it from the current expenses if needed.
+        Callers must hold the write lock.
+        
+        Returns:
+            The user's AnomalyDetector
+        """
+        detector = self._anomaly_detector
+        if detector is None or self._anomaly_dirty:
+            self._anomaly_detector = AnomalyDetector.from_frame(self._snapshot.expenses, previous=detector)
+            self._anomaly_dirty = False
+        return self._anomaly_detector
+    
+    def anomaly_detector(self) -> AnomalyDetector:
+        """
+        Get the online expense statistics used to flag unusual expenses.
+        
+        Returns:
+            The user's AnomalyDetector
+        """
+        detector = self._anomaly_detector
+        if detector is not None and not self._anomaly_dirty:
+            return detector
+        with self._write_lock:
+            return self._current_anomaly_detector()
+    
+    def flagged_expenses(self, after_id: int = 0) -> List[FlaggedExpense]:
+        """
+        Get new expenses flagged as unusual after a given one.
+        
+        Args:
+            after_id: Id of the last flagged expense the caller has seen (0 for all)
+            
+        Returns:
+            Newer flagged expenses, oldest first
+        """
+        return self.anomaly_detector().flagged_since(after_id)
+    
+    def category_index(self) -> CategoryIndex:
+        """
+        Get the merchant categories learned from this user's expenses and corrections.
+        
+        Returns:
+            The user's CategoryIndex
+        """
+        index = self._category_index
+        if index is not None:
+            return index
+        with self._write_lock:
+            if self._category_index is None:
+                self._category_index = CategoryIndex.from_frame(self._snapshot.expenses)
+            return self._category_index
+    
+    def categorize_expense(self, merchant: Optional[str], description: Optional[str] = None) -> str:
+        """
+        Suggest a category from the user's own labels, then everyone's.
+        
+        Args:
+            merchant: Raw merchant string
+            description: Expense description
+            
+        Returns:
+            The category ("Other" when nothing matches)
+        """
+        return Categorizer(self.category_index(), self.global_categories).categorize(merchant, description)
+    
+    def correct_category(self, merchant: str, category: str, previous: Optional[str] = None) -> None:
+        """
+        Learn a user's correction so future expenses from the merchant get the new category.
+        
+        Args:
+            merchant: Raw merchant string
+            category: The correct category
+            previous: The category the merchant was given before, if known
+        """
+        if previous is None:
+            previous, _ = self.category_index().lookup(merchant)
+        self.category_index().learn(merchant, category, previous=previous)
+    
+    def search_index(self) -> SearchIndex:
+        """
+        Get the inverted index over expense descriptions and merchants, building it on first use.
+        
+        Returns:
+            The user's SearchIndex
+        """
+        index = self._search_index
+        if index is not None:
+            return index
+        with self._write_lock:
+            if self._search_index is None:
+                self._search_index = SearchIndex.from_frame(self._snapshot.expenses, self._snapshot.version)
+            return self._search_index
+    
+    def search_expenses(self, query: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        category: Optional[str] = None, page: int = 1, page_size: int = 20) -> Tuple[pd.DataFrame, int]:
+        """
+        Full-text search over expense descriptions and merchants.
+        
+        Every query word must match the start of a word in the expense. The
+        index narrows the candidates first, so filters and ranking only touch
+        matching rows.
+        
+        Args:
+            query: Search text
+            start_date: Only match expenses from this date (format: 'YYYY-MM-DD')
+            end_date: Only match expenses up to this date (format: 'YYYY-MM-DD')
+            category: Only match expenses in this category
+            page: Page number, starting at 1
+            page_size: Results per page
+            
+        Returns:
+            Tuple of (the page of expenses with a 'score' column, total number of matches)
+        """
+        # Row positions only hold for the index's own rewrite of the data: one built
+        # after a rewrite newer than the snapshot means the snapshot is stale
+        while True:
+            snapshot = self._snapshot
+            index = self.search_index()
+            if index.version <= snapshot.version:
+                break
+        expenses = snapshot.expenses
+        rows, scores = index.search(query, len(expenses))
+        
+        if len(rows) and (start_date or end_date):
+            dates = dates_to_ns(expenses['date'].iloc[rows])
+            keep = (dates >= to_ns(start_date or None, MIN_NS)) & (dates <= to_ns(end_date or None, MAX_NS))
+            rows, scores = rows[keep], scores[keep]
+        if len(rows) and category:
+            keep = expenses['category'].to_numpy()[rows] == category
+            rows, scores = rows[keep], scores[keep]
+        
+        page_rows = rank_page(rows, scores, page, page_size)
+        results = expenses.iloc[page_rows].assign(score=scores[np.searchsorted(rows, page_rows)])
+        return results, len(rows)
+    
+    def get_dashboard_snapshot(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                               top_n: int = 5, recent_n: int = 10) -> DashboardSnapshot:
+        """
+        Build every dashboard figure in one pass over the date-sorted expenses.
+        
+        Dates are parsed once (by the ledger) and the weekly and monthly group
+        keys are derived from the same integer array, instead of each analysis
+        copying the frame and re-parsing dates.
+        
+        Args:
+            start_date: Start of the category breakdown window (format: 'YYYY-MM-DD')
+            end_date: End of the category breakdown window (format: 'YYYY-MM-DD')
+            top_n: Number of top merchants to include
+            recent_n: Number of recent transactions to include
+            
+        Returns:
+            DashboardSnapshot with all dashboard figures
+        """
+        snapshot = self.snapshot()
+        ledger = snapshot.ledger
+        dates, amounts = ledger.overall.dates, ledger.overall.amounts
+        valid = dates != MIN_NS
+        if not valid.all():
+            dates, amounts = dates[valid], amounts[valid]
+        
+        # Shared group keys: days since epoch, Monday-based weeks and months
+        days = dates // NS_PER_DAY
+        weeks = (days + 3) // 7
+        months = dates.view('datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+        
+        # Weekly expenses, labelled by the Sunday ending each week
+        expenses_over_time = self._bucket_totals(weeks, amounts, lambda codes: pd.to_datetime(codes * 7 + 3, unit='D'))
+        
+        # Monthly income vs expenses, labelled by month end
+        month_end = lambda codes: pd.to_datetime((codes + 1).astype('datetime64[M]')) - pd.Timedelta(days=1)
+        income_dates = dates_to_ns(snapshot.income['date'])
+        income_amounts = np.nan_to_num(snapshot.income['amount'].to_numpy(dtype=np.float64))
+        income_valid = income_dates != MIN_NS
+        income_months = income_dates[income_valid].view('datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+        income_vs_expenses = pd.DataFrame({
+            'income': self._bucket_totals(income_months, income_amounts[income_valid], month_end),
+            'expenses': self._bucket_totals(months, amounts, month_end)
+        }).fillna(0)
+        income_vs_expenses['savings'] = income_vs_expenses['income'] - income_vs_expenses['expenses']
+        
+        # Budget recommendations from next month's forecast
+        total_income = float(income_amounts.sum())
+        budget_recommendations = self._recommend_budget(
+            total_income / self._history_months(snapshot), self._predict_from(snapshot)
+        )
+        
+        return DashboardSnapshot(
+            total_income=total_income,
+            total_expenses=ledger.overall.total,
+            expenses_by_category=ledger.category_totals_between(start_date or None, end_date or None),
+            expenses_over_time=expenses_over_time,
+            income_vs_expenses=income_vs_expenses,
+            top_merchants=ledger.top_merchants(top_n),
+            budget_recommendations=budget_recommendations,
+            recent_transactions=snapshot.expenses.iloc[ledger.latest_rows(recent_n)]
+        )
+    
+    def _bucket_totals(self, codes: np.ndarray, amounts: np.ndarray, label: Any) -> pd.Series:
+        """
+        Sum amounts into contiguous integer buckets, zero-filling empty ones.
+        
+        Args:
+            codes: Bucket code for each amount
+            amounts: The amounts to sum
+            label: Function mapping bucket codes to index labels
+            
+        Returns:
+            Series of totals indexed by bucket label
+        """
+        if not len(codes):
+            return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([], name='date'))
+        first = codes.min()
+        totals = np.bincount(codes - first, weights=amounts)
+        index = pd.DatetimeIndex(label(np.arange(first, first + len(totals))), name='date')
+        return pd.Series(totals, index=index)
+    
     def export_data_to_json(self, filename: str) -> None:
         """
         Export financial data to a JSON file.
         
+        The document is written in chunks of rows, so memory use doesn't grow
+        with the length of the history. See the export module for other formats.
+        
         Args:
             filename: Name of the output JSON file
         """
-        # Prepare data for export
-        export_data = {
-            "user_id": self.user_id,
-            "expenses": self.expenses.to_dict(orient='records'),
-            "income": self.income.to_dict(orient='records'),
-            "analysis": {
-                "expenses_by_category": self.analyze_expenses_by_category(),
-                "top_merchants": self.get_top_merchants().to_dict(orient='records'),
-                "predicted_expenses": self.predict_monthly_expenses(),
-                "budget_recommendations": self.generate_budget_recommendations()
-            }
-        }
+        # Imported here: the export module depends on this one
+        from export import write_export
         
-        # Write to file
-        with open(filename, 'w') as f:
-            json.dump(export_data, f, indent=2, default=str)
+        write_export(self, filename, "json")
     
     def generate_expense_report(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -378,34 +1181,55 @@ class FinanceAnalyzer:
         Returns:
             Dictionary containing the expense report data
         """
-        # Filter expenses by date range
-        df = self.expenses.copy()
-        if start_date:
-            df = df[pd.to_datetime(df['date']) >= pd.to_datetime(start_date)]
-        if end_date:
-            df = df[pd.to_datetime(df['date']) <= pd.to_datetime(end_date)]
+        snapshot = self.snapshot()
+        start_date, end_date = start_date or None, end_date or None
+        start_ns, end_ns = to_ns(start_date, MIN_NS), to_ns(end_date, MAX_NS)
         
-        # Calculate total expenses
-        total_expenses = df['amount'].sum()
+        # Whole months inside the range come from the month partitions; only the
+        # partial months at either end are summed from their rows
+        summary = {"total": 0.0, "count": 0, "by_category": {}, "by_merchant": {}, "daily": {}}
+        edges = [(start_ns, end_ns)]
+        months = snapshot.partitions.months
+        if months:
+            first_full = min(months) if start_ns == MIN_NS else month_of_ns(start_ns - 1) + 1
+            last_full = max(months) if end_ns == MAX_NS else month_of_ns(end_ns + 1) - 1
+            if first_full <= last_full:
+                summary = snapshot.partitions.summarize(first_full, last_full)
+                edges = [(start_ns, month_start_ns(first_full) - 1), (month_start_ns(last_full + 1), end_ns)]
         
-        # Expenses by category
-        expenses_by_category = df.groupby('category')['amount'].sum().to_dict()
+        for edge_start, edge_end in edges:
+            if edge_start > edge_end:
+                continue
+            rows = snapshot.ledger.rows_between(pd.Timestamp(edge_start), pd.Timestamp(edge_end))
+            if not len(rows):
+                continue
+            df = snapshot.expenses.iloc[rows]
+            summary["total"] += df['amount'].sum()
+            summary["count"] += len(df)
+            for key, column in (("by_category", 'category'), ("by_merchant", 'merchant')):
+                for name, amount in df.groupby(column)['amount'].sum().items():
+                    summary[key][name] = summary[key].get(name, 0.0) + amount
+            for day, amount in df.groupby(df['date'].dt.date)['amount'].sum().items():
+                summary["daily"][day] = summary["daily"].get(day, 0.0) + amount
         
-        # Expenses by merchant
-        expenses_by_merchant = df.groupby('merchant')['amount'].sum().sort_values(ascending=False).head(10).to_dict()
+        # First and last transaction dates when the range is open
+        lo, hi = snapshot.ledger.overall.locate(start_ns, end_ns)
+        dates = snapshot.ledger.overall.dates
+        first_date = pd.Timestamp(dates[lo]) if hi > lo else pd.NaT
+        last_date = pd.Timestamp(dates[hi - 1]) if hi > lo else pd.NaT
         
-        # Daily expenses
-        daily_expenses = df.groupby(pd.to_datetime(df['date']).dt.date)['amount'].sum().to_dict()
+        # Top 10 merchants, largest first
+        top_merchants = sorted(summary["by_merchant"].items(), key=lambda item: item[1], reverse=True)[:10]
         
         # Compile report
         report = {
-            "start_date": start_date or df['date'].min(),
-            "end_date": end_date or df['date'].max(),
-            "total_expenses": total_expenses,
-            "expenses_by_category": expenses_by_category,
-            "expenses_by_merchant": expenses_by_merchant,
-            "daily_expenses": daily_expenses,
-            "transaction_count": len(df)
+            "start_date": start_date or first_date,
+            "end_date": end_date or last_date,
+            "total_expenses": summary["total"],
+            "expenses_by_category": dict(sorted(summary["by_category"].items())),
+            "expenses_by_merchant": dict(top_merchants),
+            "daily_expenses": dict(sorted(summary["daily"].items())),
+            "transaction_count": summary["count"]
         }
         
         return report
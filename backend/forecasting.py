@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+# Minimum complete months of history for each model
+MIN_MONTHS_FOR_TREND = 3
+MIN_MONTHS_FOR_SEASONALITY = 24
+
+AVG_DAYS_PER_MONTH = 30.44
+
+@dataclass(frozen=True)
+class ExpenseForecast:
+    """
+    Monthly expense forecast for every category, fitted in one pass.
+    """
+    categories: List[str]
+    months: pd.PeriodIndex
+    values: np.ndarray  # categories x months
+    method: str
+    history_months: int
+    last_month_total: Optional[float]
+
+    @property
+    def totals(self) -> np.ndarray:
+        """Forecast total across categories for each month"""
+        return self.values.sum(axis=0)
+
+    def for_month(self, month: Any) -> Dict[str, float]:
+        """
+        Get the forecast for one month by category.
+
+        Args:
+            month: Any value convertible to a monthly period
+
+        Returns:
+            Dictionary mapping categories to forecast amounts (empty if out of range)
+        """
+        position = self.months.get_indexer([pd.Period(month, freq='M')])[0]
+        if position < 0:
+            return {}
+        return {category: float(value) for category, value in zip(self.categories, self.values[:, position])}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the forecast to a JSON-serializable dictionary.
+
+        Returns:
+            Dictionary with the forecast months, per-category values and totals
+        """
+        return {
+            "method": self.method,
+            "historyMonths": self.history_months,
+            "months": [str(month) for month in self.months],
+            "categories": [
+                {"category": category, "values": [float(value) for value in row]}
+                for category, row in zip(self.categories, self.values)
+            ],
+            "totals": [float(total) for total in self.totals]
+        }
+
+
+def category_month_matrix(expenses: pd.DataFrame) -> Tuple[np.ndarray, List[str], int]:
+    """
+    Sum expenses into a categories x months matrix with a single bincount.
+
+    Args:
+        expenses: DataFrame with datetime 'date', 'amount' and 'category' columns
+
+    Returns:
+        Tuple of (matrix, category names, month number of the first column)
+    """
+    dates = pd.to_datetime(expenses['date']).to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(dates)
+    codes, categories = pd.factorize(expenses['category'])
+    valid &= codes >= 0
+    if not valid.any():
+        return np.zeros((0, 0)), [], 0
+
+    months = dates[valid].astype('datetime64[M]').astype(np.int64)
+    codes = codes[valid]
+    amounts = np.nan_to_num(expenses['amount'].to_numpy(dtype=np.float64)[valid])
+
+    first = months.min()
+    width = int(months.max() - first + 1)
+    flat = np.bincount(codes * width + (months - first), weights=amounts, minlength=len(categories) * width)
+    return flat.reshape(len(categories), width), list(categories), int(first)
+
+
+def forecast_expenses(expenses: pd.DataFrame, horizon: int = 3, as_of: Optional[datetime] = None) -> ExpenseForecast:
+    """
+    Forecast monthly expenses for every category at once.
+
+    Only complete months are fitted: the month the history starts in is
+    dropped unless it starts on the 1st, and so is the current month. Each
+    category gets a least-squares linear trend, plus a month-of-year seasonal
+    profile once there are two years of history. With too little history the
+    forecast falls back to the mean of the complete months, or to the daily
+    run rate when there are none.
+
+    Args:
+        expenses: DataFrame with datetime 'date', 'amount' and 'category' columns
+        horizon: Number of months to forecast, starting with the current month
+        as_of: Date treated as "now" (defaults to the current time)
+
+    Returns:
+        ExpenseForecast covering `horizon` months
+    """
+    as_of = pd.Timestamp(as_of or datetime.now())
+    current_month = pd.Period(as_of, freq='M')
+    months = pd.period_range(current_month, periods=horizon, freq='M')
+
+    matrix, categories, first_month = category_month_matrix(expenses)
+    if not categories:
+        return ExpenseForecast([], months, np.zeros((0, horizon)), 'none', 0, None)
+
+    # Month numbers since the epoch for the fit window and the forecast
+    current = current_month.ordinal - pd.Period('1970-01', freq='M').ordinal
+    first_date = pd.to_datetime(expenses['date']).min()
+    start = first_month + (0 if first_date == first_date.normalize().replace(day=1) else 1)
+
+    # Complete months from `start` up to the current month; months without
+    # any expenses count as zero spending
+    n_months = max(current - start, 0)
+    history = np.zeros((len(categories), n_months))
+    if n_months:
+        available = matrix[:, start - first_month:start - first_month + n_months]
+        history[:, :available.shape[1]] = available
+    steps = np.arange(current, current + horizon) - start
+
+    if n_months >= MIN_MONTHS_FOR_TREND:
+        # Closed-form least squares for every category at once
+        t = np.arange(n_months, dtype=np.float64)
+        t_centered = t - t.mean()
+        means = history.mean(axis=1)
+        slopes = (history - means[:, None]) @ t_centered / (t_centered ** 2).sum()
+        intercepts = means - slopes * t.mean()
+        values = intercepts[:, None] + slopes[:, None] * steps[None, :]
+        method = 'trend'
+
+        if n_months >= MIN_MONTHS_FOR_SEASONALITY:
+            # Average detrended residual per calendar month, centred on zero
+            residuals = history - (intercepts[:, None] + slopes[:, None] * t[None, :])
+            month_of_year = np.eye(12)[(start + np.arange(n_months)) % 12]
+            seasonal = residuals @ month_of_year / np.maximum(month_of_year.sum(axis=0), 1)
+            seasonal -= seasonal.mean(axis=1, keepdims=True)
+            values = values + seasonal[:, (start + steps) % 12]
+            method = 'trend+seasonal'
+    elif n_months:
+        values = np.repeat(history.mean(axis=1)[:, None], horizon, axis=1)
+        method = 'mean'
+    else:
+        # No complete month yet: scale the spending so far to a month
+        days = max((as_of - first_date).days, 1)
+        values = np.repeat(matrix.sum(axis=1)[:, None] / days * AVG_DAYS_PER_MONTH, horizon, axis=1)
+        method = 'run-rate'
+
+    last_month_total = float(history[:, -1].sum()) if n_months else None
+    return ExpenseForecast(categories, months, np.clip(values, 0, None), method, n_months, last_month_total)
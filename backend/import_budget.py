@@ -0,0 +1,92 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Cumulative import time allowed for the API module, in milliseconds
+DEFAULT_BUDGET_MS = float(os.environ.get("CHASER_IMPORT_BUDGET_MS", "900"))
+
+# Modules that must never be imported at startup (charts imports matplotlib on first use)
+FORBIDDEN_MODULES = ["matplotlib", "scipy", "sklearn"]
+
+
+def measure_import(module: str = "api") -> Dict[str, Tuple[int, int]]:
+    """
+    Import a module in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module: Name of the module to import
+
+    Returns:
+        Dictionary mapping every imported module to its (self, cumulative) time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def check_import_budget(module: str = "api", budget_ms: float = DEFAULT_BUDGET_MS,
+                        runs: int = 3) -> Tuple[bool, List[str]]:
+    """
+    Check a module's import time and imported modules against the startup budget.
+
+    The best of several runs is used so a busy machine doesn't cause failures.
+
+    Args:
+        module: Name of the module to import
+        budget_ms: Allowed cumulative import time in milliseconds
+        runs: Number of fresh interpreters to measure
+
+    Returns:
+        Tuple of (whether the budget was met, report lines)
+    """
+    best: Optional[Dict[str, Tuple[int, int]]] = None
+    for _ in range(runs):
+        timings = measure_import(module)
+        if best is None or timings[module][1] < best[module][1]:
+            best = timings
+
+    total_ms = best[module][1] / 1000
+    ok = total_ms <= budget_ms
+    report = [f"import {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)"]
+
+    # Slowest top-level packages, to show where the time goes
+    packages: Dict[str, int] = {}
+    for name, (_, cumulative_us) in best.items():
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), cumulative_us)
+    for name, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:8]:
+        report.append(f"  {name}: {cumulative_us / 1000:.0f} ms")
+
+    for forbidden in FORBIDDEN_MODULES:
+        if forbidden in packages:
+            ok = False
+            report.append(f"  {forbidden} is imported at startup; import it where it is used")
+
+    return ok, report
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the API's import-time budget")
+    parser.add_argument("--module", default="api")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    ok, report = check_import_budget(args.module, args.budget_ms, args.runs)
+    print("\n".join(report))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,495 @@
+import numpy as np
+import pandas as pd
+import heapq
+from typing import Dict, List, Optional, Tuple, Any
+
+# Bounds used when a date range is open on one side
+MIN_NS = np.iinfo(np.int64).min
+MAX_NS = np.iinfo(np.int64).max
+
+
+def to_ns(value: Any, default: int) -> int:
+    """
+    Convert a date-like value to nanoseconds since the epoch.
+
+    Args:
+        value: Date string, datetime or Timestamp (None for an open bound)
+        default: Value to return when no date is given
+
+    Returns:
+        The date as an int64 nanosecond timestamp
+    """
+    if value is None:
+        return default
+    return int(pd.Timestamp(value).value)
+
+
+def dates_to_ns(dates: pd.Series) -> np.ndarray:
+    """
+    Convert a column of dates to an int64 nanosecond array.
+
+    Args:
+        dates: Series of date strings or datetimes
+
+    Returns:
+        Array of int64 nanosecond timestamps (NaT sorts first)
+    """
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+class PrefixSumSeries:
+    """
+    Date-sorted amounts stored alongside their cumulative sum.
+
+    The total between any two dates is two binary searches and a subtraction.
+    Optional named integer columns (e.g. merchant codes, row positions) are kept
+    aligned with the amounts for windowed group-bys and lookups.
+    Buffers are over-allocated and shared between successive versions, so an
+    in-order append is amortised O(1) and never disturbs a reader that still
+    holds an older, shorter version.
+    """
+
+    __slots__ = ("_dates", "_amounts", "_cumsum", "_columns", "_filled", "size")
+
+    def __init__(self, dates: np.ndarray, amounts: np.ndarray, cumsum: np.ndarray, size: int,
+                 columns: Optional[Dict[str, np.ndarray]] = None, filled: Optional[List[int]] = None):
+        """
+        Initialize the series from pre-allocated buffers.
+
+        Args:
+            dates: Sorted int64 date buffer (at least `size` long)
+            amounts: Amount buffer aligned with `dates`
+            cumsum: Cumulative-sum buffer with a leading zero (at least `size + 1` long)
+            size: Number of valid entries
+            columns: Named int64 buffers aligned with `dates`
+            filled: Shared marker of how far the buffers have been written
+        """
+        self._dates = dates
+        self._amounts = amounts
+        self._cumsum = cumsum
+        self._columns = columns or {}
+        self.size = size
+        self._filled = filled if filled is not None else [size]
+
+    @classmethod
+    def from_arrays(cls, dates: np.ndarray, amounts: np.ndarray, columns: Optional[Dict[str, np.ndarray]] = None,
+                    capacity: Optional[int] = None) -> "PrefixSumSeries":
+        """
+        Build a series from date-sorted arrays.
+
+        Args:
+            dates: Sorted int64 nanosecond timestamps
+            amounts: Amounts aligned with `dates`
+            columns: Named integer arrays aligned with `dates`
+            capacity: Buffer size to allocate (defaults to some headroom for appends)
+
+        Returns:
+            A new PrefixSumSeries
+        """
+        size = len(dates)
+        if capacity is None:
+            capacity = size + size // 4 + 16
+        date_buffer = np.empty(capacity, dtype=np.int64)
+        date_buffer[:size] = dates
+        amount_buffer = np.empty(capacity, dtype=np.float64)
+        amount_buffer[:size] = amounts
+        cumsum_buffer = np.empty(capacity + 1, dtype=np.float64)
+        cumsum_buffer[0] = 0.0
+        np.cumsum(amount_buffer[:size], out=cumsum_buffer[1:size + 1])
+        column_buffers = {}
+        for name, values in (columns or {}).items():
+            column_buffers[name] = np.empty(capacity, dtype=np.int64)
+            column_buffers[name][:size] = values
+        return cls(date_buffer, amount_buffer, cumsum_buffer, size, column_buffers)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Sorted date array of this version"""
+        return self._dates[:self.size]
+
+    @property
+    def amounts(self) -> np.ndarray:
+        """Amounts of this version in date order"""
+        return self._amounts[:self.size]
+
+    @property
+    def total(self) -> float:
+        """Sum of every amount in this version"""
+        return float(self._cumsum[self.size])
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a named column of this version in date order.
+
+        Args:
+            name: Name of the column
+
+        Returns:
+            The column's values aligned with `dates`
+        """
+        return self._columns[name][:self.size]
+
+    def append(self, date: int, amount: float, labels: Optional[Dict[str, int]] = None) -> "PrefixSumSeries":
+        """
+        Return a new version of the series with one more amount.
+
+        Args:
+            date: Date of the amount as int64 nanoseconds
+            amount: The amount to add
+            labels: Value for each named column of the series
+
+        Returns:
+            The new series; this one is left unchanged
+        """
+        size = self.size
+        labels = labels or {}
+        if size and date < self._dates[size - 1]:
+            # Out-of-order insert, shift everything after it
+            pos = int(np.searchsorted(self.dates, date, side='right'))
+            return PrefixSumSeries.from_arrays(
+                np.insert(self.dates, pos, date),
+                np.insert(self.amounts, pos, amount),
+                {name: np.insert(self.column(name), pos, labels.get(name, -1)) for name in self._columns}
+            )
+
+        if self._filled[0] != size or size == len(self._dates):
+            # Buffers were already extended by another version, or are full
+            columns = {name: self.column(name) for name in self._columns}
+            grown = PrefixSumSeries.from_arrays(self.dates, self.amounts, columns, capacity=max(16, size * 2))
+            return grown.append(date, amount, labels)
+
+        self._dates[size] = date
+        self._amounts[size] = amount
+        self._cumsum[size + 1] = self._cumsum[size] + amount
+        for name, buffer in self._columns.items():
+            buffer[size] = labels.get(name, -1)
+        self._filled[0] = size + 1
+        return PrefixSumSeries(self._dates, self._amounts, self._cumsum, size + 1, self._columns, self._filled)
+
+    def locate(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Find the positions bounding an inclusive date range.
+
+        Args:
+            start: Start of the range as int64 nanoseconds
+            end: End of the range as int64 nanoseconds
+
+        Returns:
+            Tuple of (first position, one past the last position)
+        """
+        dates = self.dates
+        lo = int(np.searchsorted(dates, start, side='left'))
+        hi = int(np.searchsorted(dates, end, side='right'))
+        return lo, max(lo, hi)
+
+    def total_between(self, start: int, end: int) -> Tuple[float, int]:
+        """
+        Sum the amounts within an inclusive date range.
+
+        Args:
+            start: Start of the range as int64 nanoseconds
+            end: End of the range as int64 nanoseconds
+
+        Returns:
+            Tuple of (total amount, number of entries)
+        """
+        lo, hi = self.locate(start, end)
+        return float(self._cumsum[hi] - self._cumsum[lo]), hi - lo
+
+
+class MerchantTotals:
+    """
+    Running spend per merchant with partial-sort top-k selection.
+
+    Merchant names are interned to integer codes. The name table only ever
+    grows, so versions share it; the totals array is copied on write, which
+    costs O(merchants) and leaves older versions untouched.
+    """
+
+    __slots__ = ("names", "codes", "totals")
+
+    def __init__(self, names: List[str], codes: Dict[str, int], totals: np.ndarray):
+        """
+        Initialize from an interned name table and totals.
+
+        Args:
+            names: Merchant name for each code
+            codes: Code for each merchant name
+            totals: Total spent per code
+        """
+        self.names = names
+        self.codes = codes
+        self.totals = totals
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, names: List[str], amounts: np.ndarray) -> "MerchantTotals":
+        """
+        Build the totals from factorized merchant codes.
+
+        Args:
+            codes: Merchant code per expense (-1 for a missing merchant)
+            names: Merchant name for each code
+            amounts: Amount per expense
+
+        Returns:
+            A new MerchantTotals
+        """
+        valid = codes >= 0
+        totals = np.bincount(codes[valid], weights=amounts[valid], minlength=len(names))
+        return cls(list(names), {name: code for code, name in enumerate(names)}, totals)
+
+    def code_for(self, merchant: Any) -> int:
+        """
+        Get the code for a merchant, interning it if it is new.
+
+        Args:
+            merchant: The merchant name
+
+        Returns:
+            The merchant's code (-1 for a missing merchant)
+        """
+        if pd.isna(merchant):
+            return -1
+        code = self.codes.get(merchant)
+        if code is None:
+            code = len(self.names)
+            self.names.append(merchant)
+            self.codes[merchant] = code
+        return code
+
+    def add(self, code: int, amount: float) -> "MerchantTotals":
+        """
+        Return a new version with `amount` added to one merchant.
+
+        Args:
+            code: Code returned by `code_for`
+            amount: The amount spent
+
+        Returns:
+            The new MerchantTotals; this one is left unchanged
+        """
+        if code < 0:
+            return self
+        totals = np.zeros(max(len(self.totals), code + 1))
+        totals[:len(self.totals)] = self.totals
+        totals[code] += amount
+        return MerchantTotals(self.names, self.codes, totals)
+
+    def top(self, n: int, totals: Optional[np.ndarray] = None, present: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Select the top merchants by total without sorting all of them.
+
+        Args:
+            n: Number of merchants to return
+            totals: Totals per code to rank (defaults to the running totals)
+            present: Mask of codes that have any expenses (defaults to all)
+
+        Returns:
+            List of (merchant, total) pairs, largest first
+        """
+        if totals is None:
+            totals = self.totals
+        candidates = np.arange(len(totals)) if present is None else np.flatnonzero(present)
+        if n <= 0 or not len(candidates):
+            return []
+
+        if n < 32:
+            # A heap is cheapest for the small k the dashboard asks for
+            best = heapq.nlargest(n, candidates.tolist(), key=totals.__getitem__)
+        else:
+            if n < len(candidates):
+                # Partial sort: only the k largest end up in front, unordered
+                candidates = candidates[np.argpartition(-totals[candidates], n - 1)[:n]]
+            best = candidates[np.argsort(-totals[candidates], kind='stable')].tolist()
+        return [(self.names[code], float(totals[code])) for code in best]
+
+
+class ExpenseLedger:
+    """
+    Immutable date-sorted index over a user's expenses.
+
+    Keeps prefix sums over all amounts and per category so that date-range
+    totals never scan the expense DataFrame, plus running merchant totals for
+    top-k queries. `append` returns a new ledger.
+    """
+
+    __slots__ = ("overall", "by_category", "merchants")
+
+    def __init__(self, overall: PrefixSumSeries, by_category: Dict[str, PrefixSumSeries],
+                 merchants: MerchantTotals):
+        """
+        Initialize the ledger from prebuilt series.
+
+        Args:
+            overall: Prefix sums over every expense, with 'merchant' code and frame 'row' columns
+            by_category: Prefix sums for each category, with a frame 'row' column
+            merchants: Running totals per merchant
+        """
+        self.overall = overall
+        self.by_category = by_category
+        self.merchants = merchants
+
+    @classmethod
+    def from_frame(cls, expenses: pd.DataFrame) -> "ExpenseLedger":
+        """
+        Build a ledger from an expenses DataFrame.
+
+        Args:
+            expenses: DataFrame with 'date', 'amount', 'category' and 'merchant' columns
+
+        Returns:
+            A new ExpenseLedger
+        """
+        dates = dates_to_ns(expenses['date'])
+        amounts = np.nan_to_num(expenses['amount'].to_numpy(dtype=np.float64))
+        categories = expenses['category'].to_numpy()
+        merchant_codes, merchant_names = pd.factorize(expenses['merchant'])
+        merchants = MerchantTotals.from_codes(merchant_codes, list(merchant_names), amounts)
+
+        order = np.argsort(dates, kind='stable')
+        dates, amounts, categories = dates[order], amounts[order], categories[order]
+        merchant_codes, rows = merchant_codes[order], order
+
+        by_category = {}
+        if len(categories):
+            codes, uniques = pd.factorize(categories)
+            for code, category in enumerate(uniques):
+                mask = codes == code
+                by_category[category] = PrefixSumSeries.from_arrays(dates[mask], amounts[mask], {'row': rows[mask]})
+
+        overall = PrefixSumSeries.from_arrays(dates, amounts, {'merchant': merchant_codes, 'row': rows})
+        return cls(overall, by_category, merchants)
+
+    def __len__(self) -> int:
+        return self.overall.size
+
+    def append(self, date: Any, amount: float, category: str, merchant: Optional[str] = None,
+               row: int = -1) -> "ExpenseLedger":
+        """
+        Return a new ledger that includes one more expense.
+
+        Args:
+            date: Date of the expense
+            amount: Amount of the expense
+            category: Category of the expense
+            merchant: Merchant of the expense
+            row: Position of the expense in the expenses DataFrame
+
+        Returns:
+            The new ledger; this one is left unchanged
+        """
+        date_ns = to_ns(date, MIN_NS)
+        amount = 0.0 if pd.isna(amount) else float(amount)
+
+        by_category = self.by_category
+        if not pd.isna(category):
+            by_category = dict(by_category)
+            series = by_category.get(category)
+            if series is None:
+                series = PrefixSumSeries.from_arrays(np.empty(0, dtype=np.int64), np.empty(0), {'row': np.empty(0)})
+            by_category[category] = series.append(date_ns, amount, {'row': row})
+
+        code = self.merchants.code_for(merchant)
+        return ExpenseLedger(
+            self.overall.append(date_ns, amount, {'merchant': code, 'row': row}),
+            by_category,
+            self.merchants.add(code, amount)
+        )
+
+    def total_between(self, start_date: Any = None, end_date: Any = None, category: Optional[str] = None) -> float:
+        """
+        Total spent between two dates, inclusive.
+
+        Args:
+            start_date: Start of the range (None for no lower bound)
+            end_date: End of the range (None for no upper bound)
+            category: Restrict the total to one category
+
+        Returns:
+            The total amount spent
+        """
+        series = self.overall if category is None else self.by_category.get(category)
+        if series is None:
+            return 0.0
+        total, _ = series.total_between(to_ns(start_date, MIN_NS), to_ns(end_date, MAX_NS))
+        return total
+
+    def category_totals_between(self, start_date: Any = None, end_date: Any = None) -> Dict[str, float]:
+        """
+        Totals per category between two dates, inclusive.
+
+        Args:
+            start_date: Start of the range (None for no lower bound)
+            end_date: End of the range (None for no upper bound)
+
+        Returns:
+            Dictionary mapping categories with expenses in the range to their totals
+        """
+        start, end = to_ns(start_date, MIN_NS), to_ns(end_date, MAX_NS)
+        totals = {}
+        for category in sorted(self.by_category):
+            total, count = self.by_category[category].total_between(start, end)
+            if count:
+                totals[category] = total
+        return totals
+
+    def top_merchants(self, n: int = 5, start_date: Any = None, end_date: Any = None) -> List[Tuple[str, float]]:
+        """
+        Top merchants by total spent, optionally within a date range.
+
+        Without a range this ranks the running totals; with one it sums only
+        the expenses inside the range, found by binary search.
+
+        Args:
+            n: Number of merchants to return
+            start_date: Start of the range (None for no lower bound)
+            end_date: End of the range (None for no upper bound)
+
+        Returns:
+            List of (merchant, total) pairs, largest first
+        """
+        if start_date is None and end_date is None:
+            return self.merchants.top(n)
+
+        lo, hi = self.overall.locate(to_ns(start_date, MIN_NS), to_ns(end_date, MAX_NS))
+        codes = self.overall.column('merchant')[lo:hi]
+        amounts = self.overall.amounts[lo:hi]
+        valid = codes >= 0
+        if not valid.all():
+            codes, amounts = codes[valid], amounts[valid]
+
+        size = len(self.merchants.totals)
+        totals = np.bincount(codes, weights=amounts, minlength=size)
+        present = np.bincount(codes, minlength=size) > 0
+        return self.merchants.top(n, totals, present)
+
+    def latest_rows(self, n: int) -> np.ndarray:
+        """
+        Frame positions of the most recent expenses.
+
+        Args:
+            n: Number of expenses to return
+
+        Returns:
+            Row positions in the expenses DataFrame, newest first
+        """
+        rows = self.overall.column('row')
+        return rows[max(0, len(rows) - n):][::-1]
+
+    def rows_between(self, start_date: Any = None, end_date: Any = None, category: Optional[str] = None) -> np.ndarray:
+        """
+        Frame positions of the expenses within a date range.
+
+        Args:
+            start_date: Start of the range (None for no lower bound)
+            end_date: End of the range (None for no upper bound)
+            category: Restrict the rows to one category
+
+        Returns:
+            Row positions in the expenses DataFrame, in date order
+        """
+        series = self.overall if category is None else self.by_category.get(category)
+        if series is None:
+            return np.empty(0, dtype=np.int64)
+        lo, hi = series.locate(to_ns(start_date, MIN_NS), to_ns(end_date, MAX_NS))
+        return series.column('row')[lo:hi]
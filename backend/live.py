@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Dict, Optional, Set, Tuple, Any
+
+
+class LiveUpdates:
+    """
+    Fans out per-user events to connected Server-Sent Events clients.
+
+    Each connection has a bounded queue. Writers publish a small delta per
+    write; a client too slow to keep up has its backlog replaced by a single
+    'resync' event telling it to refetch, so a stalled connection never
+    holds memory or slows the writer down.
+    """
+
+    def __init__(self, queue_size: int = 100, keepalive: float = 15.0):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            queue_size: Events buffered per connection before it is told to resync
+            keepalive: Seconds between keepalive comments on an idle connection
+        """
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = {}
+        self.published = 0
+        self.resyncs = 0
+
+    def has_subscribers(self, user_id: str) -> bool:
+        """Whether any client is listening to a user's events"""
+        return bool(self._subscribers.get(user_id))
+
+    def publish(self, user_id: str, event: str, data: Dict[str, Any]) -> int:
+        """
+        Send an event to every connection of a user. Safe to call from any thread.
+
+        Args:
+            user_id: The user the event belongs to
+            event: Event name
+            data: JSON-serializable payload (its 'version', if any, becomes the event id)
+
+        Returns:
+            Number of connections the event was sent to
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        if not subscribers:
+            return 0
+
+        message = self.format(event, data)
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, message)
+        self.published += 1
+        return len(subscribers)
+
+    def _deliver(self, queue: asyncio.Queue, message: str) -> None:
+        """Queue a message on the connection's loop, replacing a full backlog with a resync"""
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+            self.resyncs += 1
+            message = self.format("resync", {})
+        queue.put_nowait(message)
+
+    @staticmethod
+    def format(event: str, data: Dict[str, Any]) -> str:
+        """Format an event for the text/event-stream wire format"""
+        lines = [f"event: {event}", f"data: {json.dumps(data)}"]
+        if data.get("version") is not None:
+            lines.insert(0, f"id: {data['version']}")
+        return "\n".join(lines) + "\n\n"
+
+    async def stream(self, user_id: str, first: Optional[Tuple[str, Dict[str, Any]]] = None) -> AsyncIterator[str]:
+        """
+        Yield a user's events as they are published, until the client disconnects.
+
+        Args:
+            user_id: The user to listen to
+            first: Event sent as soon as the connection opens
+
+        Yields:
+            Server-Sent Events messages, with keepalive comments while idle
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (queue, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        try:
+            if first is not None:
+                yield self.format(*first)
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get connection and event counts.
+
+        Returns:
+            Dictionary with connected users and connections, events published and resyncs sent
+        """
+        with self._lock:
+            connections = sum(len(subscribers) for subscribers in self._subscribers.values())
+            users = len(self._subscribers)
+        return {"users": users, "connections": connections, "published": self.published, "resyncs": self.resyncs}
@@ -0,0 +1,384 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple, Any
+
+NS_PER_DAY = 86_400_000_000_000
+
+# Day number used for rows without a date
+MISSING_DAY = np.iinfo(np.int64).min
+
+
+def month_start_day(month: int) -> int:
+    """Days since the epoch of the first day of a month (months since 1970-01)"""
+    return int(np.datetime64(month, 'M').astype('datetime64[D]').astype(np.int64))
+
+
+def month_start_ns(month: int) -> int:
+    """Nanoseconds since the epoch at the start of a month"""
+    return month_start_day(month) * NS_PER_DAY
+
+
+def month_of_ns(ns: int) -> int:
+    """Month (months since 1970-01) containing a nanosecond timestamp"""
+    return int(np.datetime64(ns, 'ns').astype('datetime64[M]').astype(np.int64))
+
+
+def _frozen(values: np.ndarray) -> np.ndarray:
+    """Mark an array read-only so a published partition can't be changed in place"""
+    values.flags.writeable = False
+    return values
+
+
+def _add(totals: Dict[str, float], key: Any, amount: float) -> Dict[str, float]:
+    """Copy of `totals` with `amount` added to `key` (missing keys are skipped)"""
+    if pd.isna(key):
+        return totals
+    totals = dict(totals)
+    totals[key] = totals.get(key, 0.0) + amount
+    return totals
+
+
+@dataclass(frozen=True)
+class MonthPartition:
+    """
+    Pre-aggregated expenses and income of one calendar month.
+
+    Partitions are immutable: a write produces a new partition for its month
+    and every other month's partition is shared with the previous version.
+    Writes normally land in the open (current) month, so closed months are
+    built once and then reused as they are.
+    """
+    month: int  # months since 1970-01
+    count: int
+    total: float
+    by_category: Dict[str, float]
+    by_merchant: Dict[str, float]
+    daily_totals: np.ndarray  # expenses per day of the month
+    daily_counts: np.ndarray
+    income_total: float
+    income_daily: np.ndarray
+    income_counts: np.ndarray
+
+    @classmethod
+    def empty(cls, month: int) -> "MonthPartition":
+        """
+        Create a partition for a month without any transactions.
+
+        Args:
+            month: Months since 1970-01
+
+        Returns:
+            An empty MonthPartition
+        """
+        days = month_start_day(month + 1) - month_start_day(month)
+        zeros = _frozen(np.zeros(days))
+        no_counts = _frozen(np.zeros(days, dtype=np.int64))
+        return cls(month, 0, 0.0, {}, {}, zeros, no_counts, 0.0, zeros, no_counts)
+
+    @property
+    def period(self) -> pd.Period:
+        """The partition's month as a pandas Period"""
+        return pd.Period(np.datetime64(self.month, 'M'), freq='M')
+
+    @property
+    def first_day(self) -> int:
+        """Days since the epoch of the month's first day"""
+        return month_start_day(self.month)
+
+    def add_expense(self, day: int, amount: float, category: Any, merchant: Any) -> "MonthPartition":
+        """
+        Create the next version of this partition with one more expense.
+
+        Args:
+            day: Day of the month, starting at 0
+            amount: Expense amount
+            category: Expense category
+            merchant: Merchant name (may be missing)
+
+        Returns:
+            A new MonthPartition
+        """
+        daily_totals, daily_counts = self.daily_totals.copy(), self.daily_counts.copy()
+        daily_totals[day] += amount
+        daily_counts[day] += 1
+        return replace(
+            self,
+            count=self.count + 1,
+            total=self.total + amount,
+            by_category=_add(self.by_category, category, amount),
+            by_merchant=_add(self.by_merchant, merchant, amount),
+            daily_totals=_frozen(daily_totals),
+            daily_counts=_frozen(daily_counts)
+        )
+
+    def add_income(self, day: int, amount: float) -> "MonthPartition":
+        """
+        Create the next version of this partition with one more income entry.
+
+        Args:
+            day: Day of the month, starting at 0
+            amount: Income amount
+
+        Returns:
+            A new MonthPartition
+        """
+        income_daily, income_counts = self.income_daily.copy(), self.income_counts.copy()
+        income_daily[day] += amount
+        income_counts[day] += 1
+        return replace(
+            self,
+            income_total=self.income_total + amount,
+            income_daily=_frozen(income_daily),
+            income_counts=_frozen(income_counts)
+        )
+
+
+class MonthPartitions:
+    """
+    A user's transactions summarized per calendar month.
+
+    Monthly, weekly and daily series and whole-month report figures are
+    assembled from the partitions, so their cost grows with the number of
+    months rather than the number of transactions.
+    """
+
+    __slots__ = ("months",)
+
+    def __init__(self, months: Dict[int, MonthPartition]):
+        self.months = months
+
+    @classmethod
+    def from_frames(cls, expenses: pd.DataFrame, income: pd.DataFrame) -> "MonthPartitions":
+        """
+        Build every month's partition with one grouped pass over each frame.
+
+        Args:
+            expenses: DataFrame with datetime 'date', 'amount', 'category' and 'merchant' columns
+            income: DataFrame with datetime 'date' and 'amount' columns
+
+        Returns:
+            A MonthPartitions
+        """
+        expense_days = cls._day_numbers(expenses)
+        income_days = cls._day_numbers(income)
+        known_days = np.concatenate([expense_days[expense_days != MISSING_DAY], income_days[income_days != MISSING_DAY]])
+        if not len(known_days):
+            return cls({})
+
+        # Daily totals and counts over the whole history, sliced into months below
+        first_day, last_day = int(known_days.min()), int(known_days.max())
+        first_month = int(np.datetime64(first_day, 'D').astype('datetime64[M]').astype(np.int64))
+        last_month = int(np.datetime64(last_day, 'D').astype('datetime64[M]').astype(np.int64))
+        origin = month_start_day(first_month)
+        width = month_start_day(last_month + 1) - origin
+
+        def daily(df: pd.DataFrame, days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            valid = days != MISSING_DAY
+            offsets = days[valid] - origin
+            amounts = np.nan_to_num(df['amount'].to_numpy(dtype=np.float64)[valid])
+            return np.bincount(offsets, weights=amounts, minlength=width), np.bincount(offsets, minlength=width)
+
+        expense_totals, expense_counts = daily(expenses, expense_days)
+        income_totals, income_counts = daily(income, income_days)
+
+        # Category and merchant totals per month
+        valid = expense_days != MISSING_DAY
+        month_numbers = expenses['date'].to_numpy(dtype='datetime64[ns]')[valid].astype('datetime64[M]').astype(np.int64)
+        dated = expenses[valid]
+        by_category = dated.groupby([month_numbers, dated['category']])['amount'].sum()
+        by_merchant = pd.Series(dtype=np.float64)
+        if 'merchant' in dated.columns:
+            by_merchant = dated.groupby([month_numbers, dated['merchant']])['amount'].sum()
+        category_totals: Dict[int, Dict[str, float]] = {}
+        for (month, category), amount in by_category.items():
+            category_totals.setdefault(month, {})[category] = float(amount)
+        merchant_totals: Dict[int, Dict[str, float]] = {}
+        for (month, merchant), amount in by_merchant.items():
+            merchant_totals.setdefault(month, {})[merchant] = float(amount)
+
+        months = {}
+        for month in range(first_month, last_month + 1):
+            lo, hi = month_start_day(month) - origin, month_start_day(month + 1) - origin
+            if not expense_counts[lo:hi].any() and not income_counts[lo:hi].any():
+                continue
+            months[month] = MonthPartition(
+                month=month,
+                count=int(expense_counts[lo:hi].sum()),
+                total=float(expense_totals[lo:hi].sum()),
+                by_category=category_totals.get(month, {}),
+                by_merchant=merchant_totals.get(month, {}),
+                daily_totals=_frozen(expense_totals[lo:hi].copy()),
+                daily_counts=_frozen(expense_counts[lo:hi].copy()),
+                income_total=float(income_totals[lo:hi].sum()),
+                income_daily=_frozen(income_totals[lo:hi].copy()),
+                income_counts=_frozen(income_counts[lo:hi].copy())
+            )
+        return cls(months)
+
+    @staticmethod
+    def _day_numbers(df: pd.DataFrame) -> np.ndarray:
+        """Days since the epoch of each row's date (MISSING_DAY for missing dates)"""
+        if not len(df):
+            return np.empty(0, dtype=np.int64)
+        dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        days[np.isnat(dates)] = MISSING_DAY
+        return days
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def _locate(self, date: Any) -> Optional[Tuple[int, int]]:
+        """Month and day of the month of a date, or None if it is missing"""
+        date = pd.Timestamp(date)
+        if pd.isna(date):
+            return None
+        day = int(date.value // NS_PER_DAY)
+        month = month_of_ns(date.value)
+        return month, day - month_start_day(month)
+
+    def add_expense(self, date: Any, amount: float, category: Any, merchant: Any = None) -> "MonthPartitions":
+        """
+        Create the next version with one more expense; only its month is rebuilt.
+
+        Args:
+            date: Expense date
+            amount: Expense amount
+            category: Expense category
+            merchant: Merchant name (may be missing)
+
+        Returns:
+            A new MonthPartitions sharing every other month's partition
+        """
+        located = self._locate(date)
+        if located is None:
+            return self
+        month, day = located
+        amount = 0.0 if pd.isna(amount) else float(amount)
+        partition = self.months.get(month) or MonthPartition.empty(month)
+        return MonthPartitions({**self.months, month: partition.add_expense(day, amount, category, merchant)})
+
+    def add_income(self, date: Any, amount: float) -> "MonthPartitions":
+        """
+        Create the next version with one more income entry; only its month is rebuilt.
+
+        Args:
+            date: Income date
+            amount: Income amount
+
+        Returns:
+            A new MonthPartitions sharing every other month's partition
+        """
+        located = self._locate(date)
+        if located is None:
+            return self
+        month, day = located
+        amount = 0.0 if pd.isna(amount) else float(amount)
+        partition = self.months.get(month) or MonthPartition.empty(month)
+        return MonthPartitions({**self.months, month: partition.add_income(day, amount)})
+
+    def income_total(self) -> float:
+        """Total dated income over every month"""
+        return float(sum(partition.income_total for partition in self.months.values()))
+
+    def history_days(self) -> Optional[Tuple[int, int]]:
+        """
+        First and last day with any expense or income.
+
+        Returns:
+            Tuple of days since the epoch, or None without transactions
+        """
+        if not self.months:
+            return None
+        first, last = self.months[min(self.months)], self.months[max(self.months)]
+        first_days = np.flatnonzero(first.daily_counts + first.income_counts)
+        last_days = np.flatnonzero(last.daily_counts + last.income_counts)
+        if not len(first_days) or not len(last_days):
+            return None
+        return first.first_day + int(first_days[0]), last.first_day + int(last_days[-1])
+
+    def closed_months(self, as_of: Any = None) -> List[int]:
+        """
+        Months before the current one, which no longer receive regular writes.
+
+        Args:
+            as_of: Date treated as "now" (defaults to the current time)
+
+        Returns:
+            Sorted month numbers of the closed partitions
+        """
+        current = month_of_ns(pd.Timestamp(as_of or pd.Timestamp.now()).value)
+        return sorted(month for month in self.months if month < current)
+
+    def daily_series(self, income: bool = False) -> pd.Series:
+        """
+        Daily totals from the first to the last day with a transaction.
+
+        Args:
+            income: Build the income series instead of the expense series
+
+        Returns:
+            Series of totals indexed by day (days without transactions are 0)
+        """
+        if not self.months:
+            return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]))
+
+        first, last = min(self.months), max(self.months)
+        totals, counts = [], []
+        for month in range(first, last + 1):
+            partition = self.months.get(month) or MonthPartition.empty(month)
+            totals.append(partition.income_daily if income else partition.daily_totals)
+            counts.append(partition.income_counts if income else partition.daily_counts)
+        totals, counts = np.concatenate(totals), np.concatenate(counts)
+
+        present = np.flatnonzero(counts)
+        if not len(present):
+            return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]))
+        lo, hi = present[0], present[-1] + 1
+        days = np.arange(month_start_day(first) + lo, month_start_day(first) + hi).astype('datetime64[D]')
+        return pd.Series(totals[lo:hi], index=pd.DatetimeIndex(days.astype('datetime64[ns]')))
+
+    def resample(self, frequency: str, income: bool = False) -> pd.Series:
+        """
+        Totals per period, with the same bins and labels as grouping the rows by `pd.Grouper(freq=frequency)`.
+
+        Args:
+            frequency: Pandas frequency ('D', 'W', 'M', ...)
+            income: Resample income instead of expenses
+
+        Returns:
+            Series of totals indexed by period label
+        """
+        series = self.daily_series(income)
+        if frequency == 'D':
+            return series
+        return series.resample(frequency).sum()
+
+    def summarize(self, first_month: int, last_month: int) -> Dict[str, Any]:
+        """
+        Combine the summaries of a run of whole months.
+
+        Args:
+            first_month: First month to include
+            last_month: Last month to include
+
+        Returns:
+            Dictionary with total, count, by_category, by_merchant and daily totals
+            (days with at least one expense only)
+        """
+        summary = {"total": 0.0, "count": 0, "by_category": {}, "by_merchant": {}, "daily": {}}
+        for month in range(first_month, last_month + 1):
+            partition = self.months.get(month)
+            if partition is None:
+                continue
+            summary["total"] += partition.total
+            summary["count"] += partition.count
+            for category, amount in partition.by_category.items():
+                summary["by_category"][category] = summary["by_category"].get(category, 0.0) + amount
+            for merchant, amount in partition.by_merchant.items():
+                summary["by_merchant"][merchant] = summary["by_merchant"].get(merchant, 0.0) + amount
+            for offset in np.flatnonzero(partition.daily_counts):
+                day = (np.datetime64(partition.first_day + int(offset), 'D')).item()
+                summary["daily"][day] = float(partition.daily_totals[offset])
+        return summary
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+from ledger import ExpenseLedger, MIN_NS
+
+NS_PER_DAY = 86_400_000_000_000
+
+# Nominal length in days of each recurring period, and its calendar step
+PERIODS = {
+    "weekly": (7.0, pd.DateOffset(weeks=1)),
+    "biweekly": (14.0, pd.DateOffset(weeks=2)),
+    "monthly": (30.44, pd.DateOffset(months=1)),
+    "quarterly": (91.31, pd.DateOffset(months=3)),
+    "yearly": (365.25, pd.DateOffset(years=1)),
+}
+
+# Charges needed before a merchant can be recurring
+MIN_OCCURRENCES = 3
+
+# The mean interval must be within this fraction of a nominal period
+PERIOD_TOLERANCE = 0.15
+
+# Maximum coefficient of variation of the intervals and of the amounts
+MAX_INTERVAL_CV = 0.25
+MAX_AMOUNT_CV = 0.2
+
+# A series is still active if its last charge is within this many periods
+ACTIVE_PERIODS = 1.5
+
+
+@dataclass(frozen=True)
+class RecurringSeries:
+    """
+    Charges from one merchant that repeat on a regular schedule.
+    """
+    merchant: str
+    category: Optional[str]
+    period: str
+    interval_days: float
+    occurrences: int
+    average_amount: float
+    monthly_cost: float
+    last_date: str
+    next_expected: str
+    active: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the series to a JSON-serializable dictionary"""
+        return asdict(self)
+
+
+def detect_recurring(ledger: ExpenseLedger, categories: Optional[np.ndarray] = None,
+                     as_of: Any = None, min_occurrences: int = MIN_OCCURRENCES) -> List[RecurringSeries]:
+    """
+    Find recurring payments such as subscriptions and utility bills.
+
+    Works on the ledger's date-sorted arrays: a stable sort by merchant code
+    keeps each merchant's charges in date order, then the intervals between
+    consecutive charges and the amount statistics of every merchant come from
+    a handful of NumPy passes, without grouping in pandas.
+
+    Args:
+        ledger: The expense ledger to scan
+        categories: Category of each expense DataFrame row, to label each series
+        as_of: Date that decides whether a series is still active (defaults to the latest expense)
+        min_occurrences: Charges needed before a merchant can be recurring
+
+    Returns:
+        List of RecurringSeries, highest monthly cost first
+    """
+    names = ledger.merchants.names
+    codes = ledger.overall.column('merchant')
+    dates = ledger.overall.dates
+    keep = (codes >= 0) & (dates != MIN_NS)
+    if not keep.any():
+        return []
+
+    # Group by merchant, keeping each merchant's charges in date order
+    order = np.argsort(codes[keep], kind='stable')
+    codes = codes[keep][order]
+    dates = dates[keep][order]
+    amounts = ledger.overall.amounts[keep][order]
+    rows = ledger.overall.column('row')[keep][order]
+    size = len(names)
+
+    counts = np.bincount(codes, minlength=size)
+    present = counts > 0
+    last = np.cumsum(counts) - 1
+
+    # Intervals between consecutive charges of the same merchant
+    same = codes[1:] == codes[:-1]
+    interval_codes = codes[1:][same]
+    intervals = np.diff(dates)[same] / NS_PER_DAY
+    interval_counts = np.maximum(counts - 1, 1)
+    interval_mean = np.bincount(interval_codes, weights=intervals, minlength=size) / interval_counts
+    interval_std = np.sqrt(
+        np.bincount(interval_codes, weights=(intervals - interval_mean[interval_codes]) ** 2, minlength=size)
+        / interval_counts
+    )
+
+    # Amount stability
+    amount_mean = np.bincount(codes, weights=amounts, minlength=size) / np.maximum(counts, 1)
+    amount_std = np.sqrt(
+        np.bincount(codes, weights=(amounts - amount_mean[codes]) ** 2, minlength=size) / np.maximum(counts, 1)
+    )
+
+    # Nearest nominal period on a log scale
+    period_names = list(PERIODS)
+    nominal = np.array([PERIODS[name][0] for name in period_names])
+    with np.errstate(divide='ignore'):
+        distance = np.abs(np.log(interval_mean[:, None] / nominal[None, :]))
+    nearest = np.argmin(distance, axis=1)
+    matches_period = distance[np.arange(size), nearest] <= np.log1p(PERIOD_TOLERANCE)
+
+    recurring = (
+        present
+        & (counts >= min_occurrences)
+        & matches_period
+        & (interval_std <= MAX_INTERVAL_CV * interval_mean)
+        & (amount_std <= MAX_AMOUNT_CV * np.abs(amount_mean))
+    )
+
+    reference = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp(int(dates.max()))
+    result = []
+    for code in np.flatnonzero(recurring):
+        period = period_names[nearest[code]]
+        last_date = pd.Timestamp(int(dates[last[code]]))
+        interval = float(interval_mean[code])
+        result.append(RecurringSeries(
+            merchant=names[code],
+            category=categories[rows[last[code]]] if categories is not None else None,
+            period=period,
+            interval_days=interval,
+            occurrences=int(counts[code]),
+            average_amount=float(amount_mean[code]),
+            monthly_cost=float(amount_mean[code] * PERIODS["monthly"][0] / interval),
+            last_date=last_date.strftime('%Y-%m-%d'),
+            next_expected=(last_date + PERIODS[period][1]).strftime('%Y-%m-%d'),
+            active=(reference - last_date).days <= ACTIVE_PERIODS * interval
+        ))
+
+    result.sort(key=lambda series: series.monthly_cost, reverse=True)
+    return result
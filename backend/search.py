@@ -0,0 +1,223 @@
+import bisect
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+# Fields of an expense that are searched
+SEARCH_FIELDS = ('description', 'merchant')
+
+# Most vocabulary terms a prefix query expands to, most common first
+MAX_PREFIX_TERMS = 64
+
+# Score of a prefix match relative to an exact token match
+PREFIX_WEIGHT = 0.5
+
+# Scores are compared to this many parts in a million when ranking
+SCORE_SCALE = 1_000_000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Any) -> List[str]:
+    """
+    Split text into lowercase alphanumeric tokens.
+
+    Args:
+        text: Text to split (anything that isn't a string gives no tokens)
+
+    Returns:
+        List of tokens
+    """
+    return _TOKEN.findall(text.lower()) if isinstance(text, str) else []
+
+
+class _Postings:
+    """Ascending row positions of the expenses containing a token, in an over-allocated buffer"""
+
+    __slots__ = ("rows", "size")
+
+    def __init__(self, rows: np.ndarray):
+        self.size = len(rows)
+        self.rows = np.empty(self.size + self.size // 4 + 4, dtype=np.int64)
+        self.rows[:self.size] = rows
+
+    def append(self, row: int) -> None:
+        if self.size == len(self.rows):
+            grown = np.empty(self.size * 2, dtype=np.int64)
+            grown[:self.size] = self.rows[:self.size]
+            self.rows = grown
+        self.rows[self.size] = row
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.rows[:self.size]
+
+
+class SearchIndex:
+    """
+    Inverted index from description and merchant tokens to expense rows.
+
+    Rows are positions in the expenses DataFrame. Expenses are only ever
+    appended, so every posting list stays sorted and one index serves every
+    snapshot: a search ignores rows past the end of the snapshot it is given.
+    A sorted vocabulary answers prefix queries with two binary searches.
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version  # data version the index was built from
+        self._postings: Dict[str, _Postings] = {}
+        self._vocabulary: List[str] = []
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, expenses: pd.DataFrame, version: int = 0) -> "SearchIndex":
+        """
+        Build an index over existing expenses.
+
+        Args:
+            expenses: DataFrame with 'description' and 'merchant' columns
+            version: Data version the frame belongs to
+
+        Returns:
+            A new SearchIndex
+        """
+        index = cls(version)
+        index._rows = len(expenses)
+        columns = [expenses[field] for field in SEARCH_FIELDS if field in expenses.columns]
+        if not len(expenses) or not columns:
+            return index
+
+        # Tokenize each distinct text once, then explode to (row, token) pairs
+        tokens = []
+        for column in columns:
+            codes, uniques = pd.factorize(column)
+            unique_tokens = pd.Series([tokenize(text) for text in uniques], dtype=object)
+            rows = pd.Series(unique_tokens.to_numpy()[codes[codes >= 0]], index=np.flatnonzero(codes >= 0))
+            tokens.append(rows.explode().dropna())
+        pairs = pd.concat(tokens)
+        pairs = pairs.groupby(pairs.to_numpy(), sort=False).indices if len(pairs) else {}
+
+        positions = np.concatenate([token_rows.index.to_numpy() for token_rows in tokens]) if tokens else None
+        for token, offsets in pairs.items():
+            index._postings[token] = _Postings(np.unique(positions[offsets]))
+        index._vocabulary = sorted(index._postings)
+        return index
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def add(self, row: int, expense: Dict[str, Any]) -> None:
+        """
+        Index one appended expense.
+
+        Args:
+            row: Position of the expense in the expenses DataFrame
+            expense: The expense's fields
+        """
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            tokens.update(tokenize(expense.get(field)))
+        with self._lock:
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is None:
+                    self._postings[token] = _Postings(np.array([row], dtype=np.int64))
+                    bisect.insort(self._vocabulary, token)
+                else:
+                    postings.append(row)
+            self._rows = max(self._rows, row + 1)
+
+    def _term_matches(self, term: str) -> List[Tuple[np.ndarray, float]]:
+        """Posting lists matching a query term, with their match weight. Callers must hold the lock"""
+        lo = bisect.bisect_left(self._vocabulary, term)
+        hi = bisect.bisect_left(self._vocabulary, term + "\uffff")
+        tokens = self._vocabulary[lo:hi]
+        if len(tokens) > MAX_PREFIX_TERMS:
+            tokens = sorted(tokens, key=lambda token: self._postings[token].size, reverse=True)[:MAX_PREFIX_TERMS]
+        return [
+            (self._postings[token].view(), 1.0 if token == term else PREFIX_WEIGHT)
+            for token in tokens
+        ]
+
+    def search(self, query: str, n_rows: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows matching every term of a query, each term as a prefix.
+
+        Each row scores the sum over terms of the term's inverse document
+        frequency, halved for prefix-only matches.
+
+        Args:
+            query: Search text
+            n_rows: Number of rows in the snapshot being searched (defaults to all indexed rows)
+
+        Returns:
+            Tuple of (matching rows in ascending order, their scores)
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        empty = np.empty(0, dtype=np.int64), np.empty(0)
+        if not terms:
+            return empty
+
+        with self._lock:
+            n_rows = self._rows if n_rows is None else n_rows
+            matches = [self._term_matches(term) for term in terms]
+
+        rows, scores = None, None
+        for term_matches in matches:
+            if not term_matches:
+                return empty
+            term_rows = np.concatenate([postings for postings, _ in term_matches])
+            document_frequency = len(np.unique(term_rows)) if len(term_matches) > 1 else len(term_rows)
+            idf = math.log(1 + n_rows / max(1, document_frequency))
+            term_scores = np.concatenate([np.full(len(postings), weight * idf) for postings, weight in term_matches])
+
+            # Best match per row when several vocabulary terms share the prefix
+            order = np.argsort(term_rows, kind='stable')
+            term_rows, term_scores = term_rows[order], term_scores[order]
+            keep = term_rows < n_rows
+            term_rows, term_scores = term_rows[keep], term_scores[keep]
+            if not len(term_rows):
+                return empty
+            starts = np.flatnonzero(np.r_[True, term_rows[1:] != term_rows[:-1]])
+            term_rows, term_scores = term_rows[starts], np.maximum.reduceat(term_scores, starts)
+
+            if rows is None:
+                rows, scores = term_rows, term_scores
+            else:
+                rows, left, right = np.intersect1d(rows, term_rows, assume_unique=True, return_indices=True)
+                scores = scores[left] + term_scores[right]
+            if not len(rows):
+                return empty
+        return rows, scores
+
+
+def rank_page(rows: np.ndarray, scores: np.ndarray, page: int, page_size: int) -> np.ndarray:
+    """
+    Select one page of results, best score first and newest row first on ties.
+
+    Scores and rows are combined into one unique integer key, so pages never
+    overlap and only the rows up to the end of the page are fully sorted.
+
+    Args:
+        rows: Matching rows
+        scores: Their scores
+        page: Page number, starting at 1
+        page_size: Results per page
+
+    Returns:
+        Rows of the requested page, in rank order
+    """
+    end = page * page_size
+    if not len(rows) or end - page_size >= len(rows):
+        return np.empty(0, dtype=np.int64)
+    keys = np.round(scores * SCORE_SCALE).astype(np.int64) * (int(rows.max()) + 1) + rows
+    if end < len(keys):
+        # Partial selection of the top `end` before sorting them
+        keys = keys[np.argpartition(-keys, end - 1)[:end]]
+    keys = -np.sort(-keys)
+    return (keys % (int(rows.max()) + 1))[end - page_size:end]
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations into one.
+
+    The first caller for a key starts the computation in a worker thread;
+    callers arriving with the same key while it runs await the same result
+    instead of starting their own. The computation runs as its own task, so a
+    caller that disconnects doesn't cancel it for the others. Nothing is kept
+    once it finishes: results are shared, not cached.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `fn(*args)` in a thread, or join the run already in flight for `key`.
+
+        Args:
+            key: Identifies identical computations (include the data version)
+            fn: Function computing the result
+            *args: Arguments for `fn`
+
+        Returns:
+            The result of the shared computation (its exception is raised to every caller)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.get_running_loop().create_task(asyncio.to_thread(fn, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """Forget a finished computation, marking its exception as retrieved"""
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counts.
+
+        Returns:
+            Dictionary with computations in flight, started and shared
+        """
+        return {"inFlight": len(self._inflight), "started": self.started, "shared": self.shared}
@@ -0,0 +1,122 @@
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any
+
+import numpy as np
+
+# Kinds of stored transactions
+TRANSACTION_KINDS = ("expense", "income")
+
+# Tombstones kept per user; clients further behind get a full resync
+MAX_TOMBSTONES = 10000
+
+
+@dataclass(frozen=True)
+class Tombstone:
+    """
+    Marks a transaction that was deleted, or replaced by an edit.
+    """
+    seq: int
+    kind: str
+    id: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the tombstone to a JSON-serializable dictionary"""
+        return asdict(self)
+
+
+class SyncLog:
+    """
+    Per-user sequence numbers for incremental client sync.
+
+    Every stored transaction gets the next sequence number as its id, and a
+    transaction is never changed in place: an edit removes the old id and
+    stores the new version under a new one. So the rows a client hasn't seen
+    are exactly those with ids above its last sequence number, plus the
+    tombstones recorded since. Replacing a kind of data wholesale (loading a
+    file) can't be described as changes, so clients behind it resync that kind
+    in full. Callers serialize writes (the analyzer's write lock).
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self._reset_seq = {kind: 0 for kind in TRANSACTION_KINDS}
+        self._tombstones: deque = deque(maxlen=MAX_TOMBSTONES)
+        self._floor = 0
+
+    def next(self) -> int:
+        """Allocate the next sequence number"""
+        self.seq += 1
+        return self.seq
+
+    def assign(self, kind: str, count: int) -> np.ndarray:
+        """
+        Allocate ids for a wholesale replacement of one kind of transaction.
+
+        Args:
+            kind: 'expense' or 'income'
+            count: Number of transactions stored
+
+        Returns:
+            Increasing ids, one per transaction
+        """
+        ids = np.arange(self.seq + 1, self.seq + count + 1, dtype=np.int64)
+        self.seq += count
+        self._reset_seq[kind] = self.seq
+        return ids
+
+    def rewrite(self, kind: str) -> int:
+        """
+        Record that every transaction of a kind changed while keeping its id.
+
+        Args:
+            kind: 'expense' or 'income'
+
+        Returns:
+            Sequence number of the rewrite
+        """
+        self._reset_seq[kind] = self.next()
+        return self._reset_seq[kind]
+
+    def remove(self, kind: str, transaction_id: int) -> Tombstone:
+        """
+        Record that a transaction was deleted or replaced.
+
+        Args:
+            kind: 'expense' or 'income'
+            transaction_id: Id of the removed transaction
+
+        Returns:
+            The tombstone
+        """
+        if len(self._tombstones) == self._tombstones.maxlen:
+            # The oldest tombstone is about to be dropped
+            self._floor = self._tombstones[0].seq
+        tombstone = Tombstone(self.next(), kind, int(transaction_id))
+        self._tombstones.append(tombstone)
+        return tombstone
+
+    def needs_full(self, kind: str, since: int) -> bool:
+        """
+        Whether a client at `since` must replace its copy of a kind instead of applying changes.
+
+        Args:
+            kind: 'expense' or 'income'
+            since: Last sequence number the client has seen
+
+        Returns:
+            True if the data was replaced, or tombstones were dropped, after `since`
+        """
+        return since < self._reset_seq[kind] or since < self._floor
+
+    def tombstones_since(self, since: int) -> List[Tombstone]:
+        """
+        Get the tombstones recorded after a sequence number.
+
+        Args:
+            since: Last sequence number the client has seen
+
+        Returns:
+            Tombstones in sequence order
+        """
+        return [tombstone for tombstone in list(self._tombstones) if tombstone.seq > since]
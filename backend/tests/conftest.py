@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The backend modules import each other by bare name, as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["Housing", "Food", "Transportation", "Entertainment", "Utilities", "Shopping"]
+
+
+@pytest.fixture
+def make_expenses():
+    """Factory for a synthetic expenses frame with `n` rows over two years"""
+    def make(n: int, seed: int = 0) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        categories = rng.choice(CATEGORIES, n)
+        merchants = np.char.add(categories.astype(str), rng.integers(0, 20, n).astype(str))
+        return pd.DataFrame({
+            'date': pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit='D'),
+            'amount': rng.uniform(5, 200, n).round(2),
+            'category': categories,
+            'merchant': merchants,
+            'user_id': "test",
+            'description': np.char.add("Payment to ", merchants)
+        })
+    return make
+
+
+@pytest.fixture
+def make_income():
+    """Factory for a synthetic income frame with `n` rows over two years"""
+    def make(n: int, seed: int = 0) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            'date': pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit='D'),
+            'amount': rng.uniform(100, 3000, n).round(2),
+            'source': rng.choice(["Salary", "Freelance", "Interest"], n),
+            'description': "Income",
+            'user_id': "test"
+        })
+    return make
+
+
+@pytest.fixture
+def api_client():
+    """TestClient for the API that authenticates each request as the user named in its X-Test-User header"""
+    import api
+    from fastapi import Request
+    from fastapi.testclient import TestClient
+
+    def current_user(request: Request) -> str:
+        return request.headers["X-Test-User"]
+
+    api.app.dependency_overrides[api.get_current_user] = current_user
+    try:
+        yield TestClient(api.app)
+    finally:
+        api.app.dependency_overrides.pop(api.get_current_user, None)
@@ -0,0 +1,27 @@
+import pytest
+
+from admission import AdmissionController
+
+
+def test_endpoint_cost_above_burst_is_rejected():
+    with pytest.raises(ValueError, match="export"):
+        AdmissionController(burst=8, endpoint_costs={"export": 10, "dashboard": 5})
+
+
+def test_burst_below_the_default_cost_is_rejected():
+    with pytest.raises(ValueError):
+        AdmissionController(burst=0.5, endpoint_costs={})
+
+
+def test_from_env_validates_cost_overrides(monkeypatch):
+    monkeypatch.setenv("CHASER_RATE_BURST", "40")
+    monkeypatch.setenv("CHASER_ENDPOINT_COSTS", '{"chat": 50}')
+    with pytest.raises(ValueError, match="chat"):
+        AdmissionController.from_env()
+
+
+def test_cost_equal_to_burst_is_admitted_once_per_refill():
+    admission = AdmissionController(rate=0.001, burst=10, endpoint_costs={"export": 10})
+
+    assert admission.check_rate("user", "export") == 0
+    assert admission.check_rate("user", "export") > 0
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalies import AmountProfile, AnomalyDetector
+from chatbot import FinanceChatbot
+from finance_analyzer import FinanceAnalyzer
+
+
+def test_backfilled_detector_flags_a_ten_times_outlier(make_expenses):
+    expenses = make_expenses(5_000)
+    detector = AnomalyDetector.from_frame(expenses)
+    typical = expenses.loc[expenses['category'] == "Food", 'amount'].mean()
+
+    assert detector.observe("2025-01-10", typical, "Food", "Food3") is None
+    flagged = detector.observe("2025-01-11", 10 * typical, "Food", "Food3")
+
+    assert flagged is not None
+    assert flagged.category == "Food"
+    assert flagged.date == "2025-01-11"
+    assert flagged.reasons
+    assert detector.flagged_since() == [flagged]
+
+
+def test_backfill_matches_observing_each_expense(make_expenses):
+    expenses = make_expenses(2_000)
+    backfilled = AnomalyDetector.from_frame(expenses)
+
+    expected = AmountProfile()
+    for amount in expenses.loc[expenses['category'] == "Housing", 'amount']:
+        expected.update(amount)
+    profile = backfilled.by_category["Housing"]
+
+    assert profile.count == expected.count
+    assert profile.mean == pytest.approx(expected.mean)
+    assert profile.std == pytest.approx(expected.std)
+    assert not backfilled.flagged_since()
+
+
+def test_too_little_history_is_not_scored():
+    history = pd.DataFrame({'amount': np.full(5, 20.0), 'category': "Food", 'merchant': "Cafe"})
+    detector = AnomalyDetector.from_frame(history)
+    assert detector.observe("2025-01-01", 10_000.0, "Food", "Cafe") is None
+
+
+def test_chat_reports_expenses_flagged_when_posted(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(2_000)
+    analyzer.add_expense({
+        'date': "2025-01-11", 'amount': 5_000.0, 'category': "Food", 'merchant': "Food3", 'description': "Banquet"
+    })
+    chatbot = FinanceChatbot("test", analyzer)
+
+    response = chatbot.process_message("Any unusual food expenses?")
+
+    assert len(analyzer.flagged_expenses()) == 1
+    assert "I found 1 unusual expense(s) in Food" in response
+    assert "2025-01-11: $5000.00 at Food3" in response
+    assert "didn't find" in chatbot.process_message("Anything unusual in travel?")
+
+
+def test_flagged_expenses_survive_a_rewrite(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(2_000)
+    for day in (11, 12, 13):
+        analyzer.add_expense({
+            'date': f"2025-01-{day}", 'amount': 5_000.0, 'category': "Food", 'merchant': "Food3", 'description': "Banquet"
+        })
+    assert [flagged.id for flagged in analyzer.flagged_expenses()] == [1, 2, 3]
+
+    analyzer.delete_transaction('expense', analyzer.expenses['id'].iat[0])
+    analyzer.add_expense({
+        'date': "2025-01-14", 'amount': 6_000.0, 'category': "Food", 'merchant': "Food3", 'description': "Gala"
+    })
+
+    assert [flagged.id for flagged in analyzer.flagged_expenses()] == [1, 2, 3, 4]
+    assert [flagged.id for flagged in analyzer.flagged_expenses(3)] == [4]
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+import api
+from admission import AdmissionController
+
+
+def test_cold_load_behind_a_warm_up_does_not_block_the_event_loop():
+    user_id = "test-cold-user"
+    api.finance_analyzers.pop(user_id, None)
+    lock = api.user_load_locks.setdefault(user_id, threading.Lock())
+
+    async def scenario():
+        # A warm-up thread is loading the user and holds their load lock
+        lock.acquire()
+        try:
+            load = asyncio.create_task(api.ensure_finance_analyzer(user_id))
+            ticks = 0
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            assert not load.done()
+        finally:
+            lock.release()
+        return ticks, await asyncio.wait_for(load, timeout=30)
+
+    try:
+        ticks, analyzer = asyncio.run(scenario())
+        assert ticks == 5
+        assert api.finance_analyzers[user_id] is analyzer
+    finally:
+        api.finance_analyzers.pop(user_id, None)
+
+
+def test_failed_warm_up_still_marks_the_instance_ready(monkeypatch):
+    class BrokenAnalyzer:
+        def __init__(self, user_id):
+            raise RuntimeError("no data")
+
+    monkeypatch.setattr(api, "FinanceAnalyzer", BrokenAnalyzer)
+    monkeypatch.setitem(api.startup_info, "warmupError", None)
+    api.app_ready.clear()
+    try:
+        api.warm_up_fast_path()
+        response = TestClient(api.app).get("/api/ready")
+    finally:
+        api.app_ready.clear()
+
+    assert response.status_code == 200
+    assert response.json()["warmupError"] == "no data"
+
+
+def as_user(user_id: str) -> dict:
+    return {"X-Test-User": user_id}
+
+
+def test_rejected_requests_never_load_a_cold_user(api_client, monkeypatch):
+    monkeypatch.setattr(api, "admission", AdmissionController(rate=0.001, burst=1, max_heavy=0, endpoint_costs={}))
+    limited, shed, admitted = "test-limited-user", "test-shed-user", "test-admitted-user"
+    try:
+        api.admission.check_rate(limited, "income")
+        assert api_client.get("/api/income", headers=as_user(limited)).status_code == 429
+        assert limited not in api.finance_analyzers
+
+        assert api_client.get("/api/dashboard", headers=as_user(shed)).status_code == 503
+        assert shed not in api.finance_analyzers
+
+        assert api_client.get("/api/income", headers=as_user(admitted)).status_code == 200
+        assert admitted in api.finance_analyzers
+    finally:
+        for user_id in (limited, shed, admitted):
+            api.finance_analyzers.pop(user_id, None)
+
+
+def test_unchanged_conditional_gets_are_free_and_writes_change_the_etag(api_client, monkeypatch, make_expenses):
+    from finance_analyzer import FinanceAnalyzer
+
+    monkeypatch.setattr(api, "admission", AdmissionController(rate=0.001, burst=3, max_heavy=8, endpoint_costs={}))
+    user_id = "test-etag-user"
+    analyzer = FinanceAnalyzer(user_id)
+    analyzer.expenses = make_expenses(200)
+    api.finance_analyzers[user_id] = analyzer
+    headers = as_user(user_id)
+    try:
+        first = api_client.get("/api/expenses", headers=headers)
+        tag = first.headers["ETag"]
+        assert first.status_code == 200 and tag.startswith('W/"')
+
+        for if_none_match in (tag, tag[2:], f'"other", {tag}', "*"):
+            response = api_client.get("/api/expenses", headers={**headers, "If-None-Match": if_none_match})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["ETag"] == tag
+        assert api_client.get("/api/expenses", headers={**headers, "If-None-Match": '"other"'}).status_code == 200
+        assert api.admission.stats()["admitted"] == {"expenses": 2}
+
+        api_client.post("/api/expenses", headers=headers, json={
+            'amount': 12.5, 'category': "Food", 'description': "Lunch", 'date': "2024-12-30", 'merchant': "Cafe"
+        })
+        api.admission = AdmissionController(rate=0.001, burst=3, max_heavy=8, endpoint_costs={})
+        changed = api_client.get("/api/expenses", headers={**headers, "If-None-Match": tag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != tag
+
+        currencies = api_client.get("/api/currencies", headers=headers)
+        assert "ETag" in currencies.headers
+        assert api_client.get(
+            "/api/currencies", headers={**headers, "If-None-Match": currencies.headers["ETag"]}
+        ).status_code == 304
+    finally:
+        api.finance_analyzers.pop(user_id, None)
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+from background import RecomputeScheduler
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_rebuilds_are_tracked_until_they_finish():
+    rebuilt = []
+
+    async def scenario():
+        scheduler = RecomputeScheduler(rebuilt.append, quiet_period=0, poll_interval=0.01)
+        scheduler.start()
+        scheduler.mark_dirty("alice")
+        scheduler.mark_dirty("bob")
+        await wait_for(lambda: scheduler.completed == 2)
+        await wait_for(lambda: not scheduler._rebuilds)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sorted(rebuilt) == ["alice", "bob"]
+
+
+def test_stop_cancels_rebuilds_in_flight():
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = RecomputeScheduler(lambda user_id: release.wait(5), quiet_period=0, poll_interval=0.01)
+        scheduler.start()
+        scheduler.mark_dirty("alice")
+        await wait_for(lambda: scheduler.stats()["running"] == 1)
+        rebuilds = list(scheduler._rebuilds)
+        assert len(rebuilds) == 1
+
+        await scheduler.stop()
+        assert rebuilds[0].cancelled()
+        assert not scheduler._rebuilds
+        assert scheduler.stats()["running"] == 0
+        assert scheduler.completed == 0
+        # The thread itself runs to completion
+        release.set()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
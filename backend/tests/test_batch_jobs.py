@@ -0,0 +1,23 @@
+from batch_jobs import load_precomputed, run_nightly_job
+
+
+def test_users_without_data_files_are_reported_not_mocked(tmp_path, make_expenses, make_income):
+    data_dir, output_dir = tmp_path / "data", tmp_path / "out"
+    data_dir.mkdir()
+    make_expenses(500).to_csv(data_dir / "alice_expenses.csv", index=False)
+    make_income(20).to_csv(data_dir / "alice_income.csv", index=False)
+    make_expenses(50).to_csv(data_dir / "bob_expenses.csv", index=False)
+
+    summary = run_nightly_job(["alice", "bob", "carol"], str(output_dir), str(data_dir), workers=1, run_id="test")
+
+    assert summary["processed"] == 1
+    assert sorted(summary["unavailable"]) == ["bob", "carol"]
+    results = load_precomputed("alice", str(output_dir))
+    assert results["run_id"] == "test"
+    assert results["monthly_reports"]
+    assert load_precomputed("bob", str(output_dir)) is None
+    assert load_precomputed("carol", str(output_dir)) is None
+
+    # A resumed run has nothing left to do
+    resumed = run_nightly_job(["alice", "bob", "carol"], str(output_dir), str(data_dir), workers=1, run_id="test")
+    assert (resumed["processed"], resumed["skipped"]) == (0, 3)
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from budgets import BudgetTracker
+from chatbot import FinanceChatbot
+from finance_analyzer import FinanceAnalyzer
+
+
+def test_each_threshold_alerts_once_per_month():
+    tracker = BudgetTracker("2024-05", {"Food": 100.0})
+
+    assert tracker.record("Food", 50.0) == []
+    assert [alert.threshold for alert in tracker.record("Food", 35.0)] == [80]
+    assert tracker.record("Food", 10.0) == []
+    assert [alert.threshold for alert in tracker.record("Food", 10.0)] == [100]
+    assert tracker.record("Food", 500.0) == []
+    assert [(alert.category, alert.threshold) for alert in tracker.alerts_since()] == [("Food", 80), ("Food", 100)]
+
+    # A new month starts its counters over and alerts again, with ids continuing
+    next_month = BudgetTracker("2024-06", {"Food": 100.0}, previous=tracker)
+    alerts = next_month.record("Food", 120.0)
+    assert [alert.threshold for alert in alerts] == [80, 100]
+    assert [alert.id for alert in alerts] == [3, 4]
+    assert next_month.record("Food", 1.0) == []
+
+
+def test_thresholds_crossed_before_tracking_do_not_alert_again():
+    tracker = BudgetTracker("2024-05", {"Food": 100.0}, spent={"Food": 90.0})
+
+    assert tracker.record("Food", 5.0) == []
+    assert [alert.threshold for alert in tracker.record("Food", 5.0)] == [100]
+
+
+def test_analyzer_writes_raise_alerts_once(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(100)
+    analyzer.set_budget({"Travel": 100.0})
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    for amount in (40.0, 45.0, 5.0, 20.0, 30.0):
+        analyzer.add_expense({
+            'date': today, 'amount': amount, 'category': "Travel", 'merchant': "Airline", 'description': "Flight"
+        })
+
+    assert [alert.threshold for alert in analyzer.budget_alerts()] == [80, 100]
+
+
+def test_chat_answers_from_the_same_counters_as_the_api(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(100)
+    analyzer.set_budget({"Travel": 200.0, "Food": 400.0})
+    analyzer.add_expense({
+        'date': datetime.now().strftime("%Y-%m-%d"), 'amount': 150.0, 'category': "Travel",
+        'merchant': "Airline", 'description': "Flight"
+    })
+    chatbot = FinanceChatbot("test", analyzer)
+
+    travel = {row['category']: row for row in analyzer.budget_tracker().utilization()}["Travel"]
+    response = chatbot.process_message("How is my travel budget?")
+
+    assert f"${travel['actual']:.2f} so far this month ({travel['percentage']:.1f}% of your budget)" in response
+    assert travel['actual'] == pytest.approx(
+        analyzer.total_between(pd.Timestamp.now().replace(day=1).strftime("%Y-%m-%d"), None, "Travel")
+    )
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from categorizer import MIN_CONFIDENCE, Categorizer, CategoryIndex, merchant_tokens, normalize_merchant
+from finance_analyzer import FinanceAnalyzer
+
+
+def labeled(*pairs) -> pd.DataFrame:
+    return pd.DataFrame(list(pairs), columns=['merchant', 'category'])
+
+
+@pytest.fixture
+def index():
+    return CategoryIndex.from_frame(labeled(
+        ("Blue Bottle Coffee", "Food"),
+        ("Blue Bottle Coffee", "Food"),
+        ("Walmart Supercenter", "Shopping"),
+        ("Netflix", "Entertainment"),
+        ("Shell Oil", "Transportation"),
+    ))
+
+
+def test_bank_noise_is_stripped_from_merchant_names():
+    assert normalize_merchant("SQ *BLUE BOTTLE #1234") == "blue bottle"
+    assert normalize_merchant("POS DEBIT NETFLIX.COM") == "netflix"
+    assert merchant_tokens("WWW.AMAZON.COM PMT 8X7Y") == ["amazon", "pmt"]
+    assert normalize_merchant("#0042") == ""
+    assert normalize_merchant(None) == ""
+
+
+def test_variants_of_a_known_merchant_match_exactly(index):
+    assert index.lookup("SQ *BLUE BOTTLE COFFEE #77") == ("Food", 1.0)
+    assert index.lookup("NETFLIX.COM") == ("Entertainment", 1.0)
+
+
+def test_unseen_names_match_by_token_prefix(index):
+    category, confidence = index.lookup("WALMART SUPERCTR")
+    assert category == "Shopping"
+    assert MIN_CONFIDENCE <= confidence <= 1.0
+
+    # Shorter than the minimum prefix or unrelated tokens give no match
+    assert index.lookup("WA") == (None, 0.0)
+    assert index.lookup("Zephyr Records")[0] is None
+
+
+def test_description_is_used_when_the_merchant_gives_no_match(index):
+    assert index.lookup("ACH 99812", "Netflix monthly plan") == ("Entertainment", 1.0)
+    assert index.lookup("ACH 99812", "Transfer") == (None, 0.0)
+
+
+def test_user_labels_win_then_global_then_default(index):
+    user = CategoryIndex.from_frame(labeled(("Netflix", "Work")))
+    categorizer = Categorizer(user, index)
+
+    assert categorizer.categorize("NETFLIX.COM") == "Work"
+    assert categorizer.categorize("Shell Oil 5521") == "Transportation"
+    assert categorizer.categorize("Zephyr Records") == "Other"
+    assert Categorizer(CategoryIndex(), None, default="Misc").categorize("Shell Oil") == "Misc"
+
+
+def test_a_correction_replaces_the_learned_category(index):
+    index.learn("Blue Bottle Coffee", "Entertainment", previous="Food")
+
+    assert index.lookup("Blue Bottle Coffee") == ("Entertainment", 1.0)
+    # The fuzzy counts were unlearned too
+    assert index.lookup("Blue Bottles")[0] == "Entertainment"
+
+
+def test_categorize_many_matches_categorizing_each_row(index):
+    categorizer = Categorizer(CategoryIndex(), index)
+    merchants = pd.Series(["Netflix", None, "Shell Oil 1", "Netflix", "Unknown", "Walmart"])
+    descriptions = pd.Series(["", "Blue Bottle latte", None, "", "Shell gas", None])
+
+    expected = [categorizer.categorize(m, d) for m, d in zip(merchants, descriptions)]
+    assert list(categorizer.categorize_many(merchants, descriptions)) == expected
+    assert list(categorizer.categorize_many(merchants)) == [
+        categorizer.categorize(m) for m in merchants
+    ]
+
+
+def test_import_fills_missing_categories_from_labeled_rows(tmp_path):
+    path = tmp_path / "expenses.csv"
+    pd.DataFrame({
+        'date': ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        'amount': [4.5, 60.0, 5.25, 12.0],
+        'category': ["Food", "Transportation", np.nan, np.nan],
+        'merchant': ["Blue Bottle", "Shell Oil", "SQ *BLUE BOTTLE #9", "Zephyr Records"],
+        'description': ["Coffee", "Gas", "Coffee", "Vinyl"],
+    }).to_csv(path, index=False)
+
+    analyzer = FinanceAnalyzer("test")
+    analyzer.load_data(expenses_file=str(path))
+
+    assert list(analyzer.expenses['category']) == ["Food", "Transportation", "Food", "Other"]
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from charts import ChartService
+from finance_analyzer import FinanceAnalyzer
+
+pytest.importorskip("matplotlib")
+
+
+def test_render_recovers_from_a_dead_worker(make_expenses, make_income):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(500)
+    analyzer.income = make_income(20)
+    service = ChartService(max_workers=1)
+
+    async def scenario():
+        first = await service.render(analyzer, "category-pie")
+
+        # Kill the worker as the OS would on out-of-memory
+        for process in list(service._executor._processes.values()):
+            process.kill()
+            process.join()
+
+        # A cache miss needs the pool again
+        second = await service.render(analyzer, "spending-over-time")
+        third = await service.render(analyzer, "income-vs-expenses")
+        return first, second, third
+
+    try:
+        images = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+
+    assert all(image.startswith(b"\x89PNG") for image in images)
+    assert service.stats()["restarts"] == 1
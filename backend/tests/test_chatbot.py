@@ -0,0 +1,64 @@
+import re
+
+import pandas as pd
+import pytest
+
+import api
+from chatbot import FinanceChatbot
+from finance_analyzer import FinanceAnalyzer
+
+
+def dollars(text: str) -> list:
+    return [float(amount) for amount in re.findall(r"\$(-?\d+(?:\.\d+)?)", text)]
+
+
+@pytest.fixture
+def user(make_expenses, make_income):
+    user_id = "test-chat-user"
+    analyzer = FinanceAnalyzer(user_id)
+    analyzer.expenses = make_expenses(3_000)
+    analyzer.income = make_income(60)
+    api.finance_analyzers[user_id] = analyzer
+    yield user_id
+    api.finance_analyzers.pop(user_id, None)
+    api.chatbots.pop(user_id, None)
+
+
+def ask(api_client, user_id: str, message: str) -> str:
+    response = api_client.post("/api/chat", json={"message": message}, headers={"X-Test-User": user_id})
+    assert response.status_code == 200
+    return response.json()["response"]
+
+
+def test_chat_totals_match_the_expenses_endpoint(api_client, user):
+    headers = {"X-Test-User": user}
+    api_client.post("/api/expenses", headers=headers, json={
+        'amount': 123.45, 'category': "Food", 'description': "Dinner", 'date': "2024-12-30", 'merchant': "Bistro"
+    })
+
+    food = api_client.get("/api/expenses", params={"category": "Food"}, headers=headers).json()["total"]
+    everything = api_client.get("/api/expenses", headers=headers).json()["total"]
+
+    assert dollars(ask(api_client, user, "How much have I spent on food?"))[0] == pytest.approx(food, abs=0.005)
+    assert dollars(ask(api_client, user, "What are my expenses?"))[0] == pytest.approx(everything, abs=0.005)
+
+
+def test_every_answer_reads_the_analyzer(user):
+    analyzer = api.finance_analyzers[user]
+    chatbot = FinanceChatbot(user, analyzer)
+    expenses, income = analyzer.expenses, analyzer.income
+
+    savings = income['amount'].sum() - expenses['amount'].sum()
+    assert dollars(chatbot.process_message("How much have I saved?"))[0] == pytest.approx(savings, abs=0.005)
+    assert dollars(chatbot.process_message("What is my income?"))[0] == pytest.approx(income['amount'].sum(), abs=0.005)
+
+    forecast = analyzer.forecast_expenses(horizon=2)
+    next_month = sum(forecast.for_month(pd.Period.now('M') + 1).values())
+    assert dollars(chatbot.process_message("What do you predict?"))[0] == pytest.approx(next_month, abs=0.005)
+
+
+def test_standalone_chatbot_answers_from_its_own_analyzer():
+    chatbot = FinanceChatbot("standalone")
+
+    total = chatbot.analyzer.total_between(category="Food")
+    assert f"Your total food expenses are ${total:.2f}." == chatbot.process_message("How much have I spent on food?")
@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+import pytest
+
+from finance_analyzer import FinanceAnalyzer
+
+WRITERS = 6
+READERS = 3
+APPENDS_PER_WRITER = 50
+
+
+def test_parallel_writes_and_lock_free_reads(make_expenses, make_income):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(2_000)
+    analyzer.income = make_income(50)
+    base_expenses, base_income = len(analyzer.expenses), len(analyzer.income)
+
+    done = threading.Event()
+    errors = []
+
+    def write(writer: int) -> None:
+        try:
+            for i in range(APPENDS_PER_WRITER):
+                analyzer.add_expense({
+                    'date': f"2024-{i % 12 + 1:02d}-15", 'amount': float(writer + i + 1), 'category': "Food",
+                    'merchant': f"Writer {writer}", 'description': "Concurrent write"
+                })
+                analyzer.add_income({
+                    'date': f"2024-{i % 12 + 1:02d}-01", 'amount': 100.0, 'source': "Salary",
+                    'description': "Concurrent write"
+                })
+        except Exception as e:
+            errors.append(e)
+
+    def read() -> None:
+        try:
+            while not done.is_set():
+                # Every pinned snapshot is internally consistent
+                snapshot = analyzer.snapshot()
+                assert len(snapshot.ledger) == len(snapshot.expenses)
+                assert snapshot.ledger.overall.total == pytest.approx(snapshot.expenses['amount'].sum())
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(READERS)]
+    writers = [threading.Thread(target=write, args=(writer,)) for writer in range(WRITERS)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    snapshot = analyzer.snapshot()
+    assert len(snapshot.expenses) == base_expenses + WRITERS * APPENDS_PER_WRITER
+    assert len(snapshot.income) == base_income + WRITERS * APPENDS_PER_WRITER
+
+    # Ids are unique across both kinds and increase along each frame
+    expense_ids = snapshot.expenses['id'].to_numpy()
+    income_ids = snapshot.income['id'].to_numpy()
+    assert len(np.unique(np.concatenate([expense_ids, income_ids]))) == len(expense_ids) + len(income_ids)
+    assert (np.diff(expense_ids) > 0).all()
+    assert (np.diff(income_ids) > 0).all()
+
+    assert snapshot.ledger.overall.total == pytest.approx(snapshot.expenses['amount'].sum())
+    assert snapshot.version == 2 + 2 * WRITERS * APPENDS_PER_WRITER
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from currency import FxRates
+from finance_analyzer import FinanceAnalyzer
+from ledger import dates_to_ns
+
+
+@pytest.fixture
+def rates():
+    # EUR per US dollar changes on March 1st, GBP is only known from February
+    return FxRates.from_frame(pd.DataFrame({
+        'date': ["2024-01-01", "2024-03-01", "2024-02-01"],
+        'currency': ["eur", "EUR", "gbp"],
+        'rate': [0.8, 0.9, 0.75],
+    }))
+
+
+def ns(*dates: str) -> np.ndarray:
+    return dates_to_ns(pd.Series(pd.to_datetime(list(dates))))
+
+
+def test_codes_are_case_folded(rates):
+    assert rates.currencies == ["EUR", "GBP", "USD"]
+    assert rates.supports("eur") and rates.supports("Gbp")
+    assert not rates.supports("JPY") and not rates.supports(None)
+
+    converted = rates.convert(
+        np.array([80.0, 80.0, 8.0]), np.array(["EUR", "eur", "Eur"], dtype=object),
+        ns("2024-01-15", "2024-01-15", "2024-01-15"), "usd"
+    )
+    assert converted == pytest.approx([100.0, 100.0, 10.0])
+
+
+def test_the_rate_in_effect_on_each_date_is_used(rates):
+    converted = rates.convert(
+        np.array([90.0, 90.0, 90.0]), np.array(["EUR"] * 3, dtype=object),
+        ns("2024-02-29", "2024-03-01", "2025-01-01"), "USD"
+    )
+    assert converted == pytest.approx([112.5, 100.0, 100.0])
+
+
+def test_dates_before_the_first_rate_use_the_first_rate(rates):
+    converted = rates.convert(
+        np.array([75.0, 80.0]), np.array(["GBP", "EUR"], dtype=object), ns("2023-06-01", "2020-01-01"), "USD"
+    )
+    assert converted == pytest.approx([100.0, 100.0])
+
+
+def test_cross_rates_go_through_the_dollar(rates):
+    converted = rates.convert(np.array([75.0, 10.0]), np.array(["GBP", "USD"], dtype=object),
+                              ns("2024-03-15", "2024-03-15"), "eur")
+    assert converted == pytest.approx([90.0, 9.0])
+
+
+def test_unknown_currencies_raise(rates):
+    with pytest.raises(ValueError, match="JPY"):
+        rates.convert(np.array([1.0]), np.array(["jpy"], dtype=object), ns("2024-01-01"), "USD")
+    with pytest.raises(ValueError, match="CHF"):
+        rates.convert(np.array([1.0]), np.array(["EUR"], dtype=object), ns("2024-01-01"), "CHF")
+
+
+def test_load_falls_back_to_the_default_rates(tmp_path):
+    assert FxRates.load(str(tmp_path / "missing.csv")).currencies == FxRates.default().currencies
+
+
+def test_analyzer_converts_to_its_base_currency(rates):
+    analyzer = FinanceAnalyzer("test", fx_rates=rates)
+    analyzer.expenses = pd.DataFrame({
+        'date': pd.to_datetime(["2024-01-10", "2024-03-10", "2024-03-11"]),
+        'amount': [80.0, 90.0, 25.0],
+        'currency': ["eur", "EUR", None],
+        'category': "Food", 'merchant': "Cafe", 'user_id': "test", 'description': "Coffee",
+    })
+    analyzer.add_expense({
+        'date': "2024-03-12", 'amount': 7.5, 'currency': "gbp", 'category': "Food",
+        'merchant': "Cafe", 'description': "Coffee"
+    })
+    expenses = analyzer.expenses
+
+    assert list(expenses['currency']) == ["EUR", "EUR", "USD", "GBP"]
+    assert list(expenses['original_amount']) == [80.0, 90.0, 25.0, 7.5]
+    assert list(expenses['amount']) == pytest.approx([100.0, 100.0, 25.0, 10.0])
+    assert analyzer.total_between() == pytest.approx(235.0)
+
+    analyzer.set_base_currency("eur")
+    assert list(analyzer.expenses['amount']) == pytest.approx([80.0, 90.0, 22.5, 9.0])
+    assert analyzer.total_between() == pytest.approx(201.5)
+    assert list(analyzer.expenses['original_amount']) == [80.0, 90.0, 25.0, 7.5]
+
+    with pytest.raises(ValueError):
+        analyzer.set_base_currency("JPY")
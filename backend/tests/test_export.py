@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from export import export_users, iter_export
+from finance_analyzer import FinanceAnalyzer
+
+
+def test_analysis_matches_the_exported_rows_despite_a_write(make_expenses, make_income):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(1_000)
+    analyzer.income = make_income(30)
+    chunks = iter_export(analyzer, "ndjson", chunk_rows=100)
+
+    pieces = [next(chunks)]
+    analyzer.add_expense({
+        'date': "2024-12-30", 'amount': 9_999.0, 'category': "Travel", 'merchant': "Airline", 'description': "Flight"
+    })
+    pieces.extend(chunks)
+
+    lines = [json.loads(line) for line in b"".join(pieces).decode().splitlines()]
+    expenses = [line for line in lines if line["type"] == "expense"]
+    analysis = lines[-1]
+
+    assert len(expenses) == 1_000
+    assert "Travel" not in analysis["expenses_by_category"]
+    assert sum(analysis["expenses_by_category"].values()) == pytest.approx(sum(row["amount"] for row in expenses))
+    assert analysis["top_merchants"][0]["merchant"] != "Airline"
+
+
+def test_users_without_data_files_are_not_exported(tmp_path, make_expenses, make_income):
+    data_dir, output_dir = tmp_path / "data", tmp_path / "out"
+    data_dir.mkdir()
+    make_expenses(200).to_csv(data_dir / "alice_expenses.csv", index=False)
+    make_income(10).to_csv(data_dir / "alice_income.csv", index=False)
+
+    summary = export_users(["alice", "bob"], str(output_dir), "csv", str(data_dir), workers=1)
+
+    assert (summary["exported"], summary["failed"], summary["unavailable"]) == (1, [], ["bob"])
+    assert (output_dir / "alice.csv").exists()
+    assert not (output_dir / "bob.csv").exists()
@@ -0,0 +1,24 @@
+import finance_analyzer
+from finance_analyzer import FinanceAnalyzer
+
+
+def test_each_horizon_keeps_its_cached_forecast(make_expenses, monkeypatch):
+    fits = []
+    fit = finance_analyzer.forecast_expenses
+    monkeypatch.setattr(
+        finance_analyzer, "forecast_expenses", lambda expenses, horizon: fits.append(horizon) or fit(expenses, horizon)
+    )
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(2_000)
+
+    # The dashboard's prediction and the forecast endpoint alternate
+    for _ in range(3):
+        analyzer.predict_monthly_expenses()
+        analyzer.forecast_expenses(horizon=3)
+    assert fits == [2, 3]
+
+    analyzer.add_expense({
+        'date': "2024-12-30", 'amount': 20.0, 'category': "Food", 'merchant': "Cafe", 'description': "Lunch"
+    })
+    analyzer.forecast_expenses(horizon=3)
+    assert fits == [2, 3, 3]
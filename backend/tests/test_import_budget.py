@@ -0,0 +1,16 @@
+import pytest
+
+from import_budget import DEFAULT_BUDGET_MS, check_import_budget
+
+
+def test_api_import_stays_within_budget():
+    # 900 ms unless CHASER_IMPORT_BUDGET_MS overrides it for a slow runner
+    ok, report = check_import_budget("api", DEFAULT_BUDGET_MS)
+    assert ok, "\n".join(report)
+
+
+def test_forbidden_module_at_startup_fails_the_check():
+    pytest.importorskip("matplotlib")
+    ok, report = check_import_budget("matplotlib.figure", budget_ms=60_000, runs=1)
+    assert not ok
+    assert any("matplotlib is imported at startup" in line for line in report)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+import api
+from finance_analyzer import FinanceAnalyzer
+from live import LiveUpdates
+
+
+def parse(message: str) -> tuple:
+    fields = dict(line.split(": ", 1) for line in message.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_a_write_sends_the_changed_dashboard_figures(monkeypatch, make_expenses, make_income):
+    monkeypatch.setattr(api, "live_updates", LiveUpdates())
+    user_id = "test-live-user"
+    analyzer = FinanceAnalyzer(user_id)
+    analyzer.expenses = make_expenses(2_000)
+    analyzer.income = make_income(40)
+    expense = {
+        'date': pd.Timestamp.now().strftime("%Y-%m-%d"), 'amount': 42.0, 'category': "Food", 'merchant': "Cafe", 'description': "Lunch"
+    }
+
+    async def scenario():
+        stream = api.live_updates.stream(user_id, ("ready", {"version": analyzer.snapshot().version}))
+        try:
+            assert parse(await stream.__anext__())[0] == "ready"
+            version = analyzer.add_expense(expense)
+            api.publish_write(user_id, analyzer, version, "expense", expense)
+            return version, parse(await asyncio.wait_for(stream.__anext__(), timeout=5))
+        finally:
+            await stream.aclose()
+
+    version, (event, delta) = asyncio.run(scenario())
+    expenses, income = analyzer.expenses, analyzer.income
+    assert event == "expense"
+    assert delta["version"] == version
+    assert delta["income"] == pytest.approx(income['amount'].sum())
+    assert delta["expenses"] == pytest.approx(expenses['amount'].sum())
+    assert delta["totalBalance"] == pytest.approx(income['amount'].sum() - expenses['amount'].sum())
+    assert delta["category"]["name"] == "Food"
+    assert delta["category"]["value"] == pytest.approx(
+        analyzer.total_between((pd.Timestamp.now() - pd.Timedelta(days=90)).strftime("%Y-%m-%d"),
+                               pd.Timestamp.now().strftime("%Y-%m-%d"), "Food")
+    )
+    assert delta["transaction"]["id"] == str(expenses['id'].iat[-1])
+    assert delta["transaction"]["amount"] == 42.0
+    assert delta["recent"] is True
+
+
+def test_a_full_queue_is_replaced_by_one_resync():
+    live = LiveUpdates(queue_size=3, keepalive=60)
+
+    async def scenario():
+        stream = live.stream("alice", ("ready", {}))
+        try:
+            await stream.__anext__()
+            # A stalled client: nothing is read while the writes land
+            for version in range(1, 11):
+                live.publish("alice", "expense", {"version": version})
+            await asyncio.sleep(0.01)
+            received = []
+            while True:
+                try:
+                    received.append(await asyncio.wait_for(stream.__anext__(), timeout=0.05))
+                except asyncio.TimeoutError:
+                    return received
+        finally:
+            await stream.aclose()
+
+    received = [parse(message) for message in asyncio.run(scenario())]
+    assert received == [("resync", {})]
+    assert live.stats()["resyncs"] == 3
+
+
+def test_a_disconnected_client_is_unsubscribed():
+    live = LiveUpdates()
+
+    async def scenario():
+        first, second = live.stream("alice", ("ready", {})), live.stream("alice", ("ready", {}))
+        await first.__anext__()
+        await second.__anext__()
+        assert live.stats()["connections"] == 2
+
+        await first.aclose()
+        assert live.has_subscribers("alice")
+        assert live.publish("alice", "income", {"version": 2}) == 1
+
+        await second.aclose()
+        assert not live.has_subscribers("alice")
+        assert live.publish("alice", "income", {"version": 3}) == 0
+
+    asyncio.run(scenario())
+    assert live.stats()["users"] == 0 and live.stats()["connections"] == 0
+
+
+def test_the_delta_transaction_is_in_the_base_currency(monkeypatch, make_expenses):
+    monkeypatch.setattr(api, "live_updates", LiveUpdates())
+    analyzer = FinanceAnalyzer("test-live-fx-user")
+    analyzer.expenses = make_expenses(200)
+    expense = {
+        'date': "2024-12-30", 'amount': 15_000.0, 'currency': "JPY", 'category': "Travel",
+        'merchant': "Hotel", 'description': "Tokyo"
+    }
+    version = analyzer.add_expense(expense)
+
+    transaction = api.dashboard_delta(analyzer, version, expense)["transaction"]
+    stored = analyzer.expenses.iloc[-1]
+    assert transaction["amount"] == pytest.approx(stored['amount'])
+    assert transaction["amount"] < 1_000
+    assert transaction["date"] == "2024-12-30"
+    assert transaction["id"] == str(stored['id'])
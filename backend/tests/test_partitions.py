@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from finance_analyzer import FinanceAnalyzer
+from partitions import MonthPartitions
+
+
+def month_number(period: pd.Period) -> int:
+    return (period.year - 1970) * 12 + period.month - 1
+
+
+def assert_matches_frames(partitions: MonthPartitions, expenses: pd.DataFrame, income: pd.DataFrame) -> None:
+    expense_months = expenses['date'].dt.to_period('M')
+    income_months = income['date'].dt.to_period('M')
+    assert set(partitions.months) == {month_number(p) for p in set(expense_months) | set(income_months)}
+
+    for period, rows in expenses.groupby(expense_months):
+        partition = partitions.months[month_number(period)]
+        assert partition.count == len(rows)
+        assert partition.total == pytest.approx(rows['amount'].sum())
+        assert partition.by_category == pytest.approx(rows.groupby('category')['amount'].sum().to_dict())
+        assert partition.by_merchant == pytest.approx(rows.groupby('merchant')['amount'].sum().to_dict())
+        daily = rows.groupby(rows['date'].dt.day)['amount'].sum()
+        assert partition.daily_totals[daily.index - 1] == pytest.approx(daily.to_numpy())
+    for period, rows in income.groupby(income_months):
+        assert partitions.months[month_number(period)].income_total == pytest.approx(rows['amount'].sum())
+
+
+def test_from_frames_matches_a_raw_recompute(make_expenses, make_income):
+    expenses, income = make_expenses(20_000), make_income(300)
+    assert_matches_frames(MonthPartitions.from_frames(expenses, income), expenses, income)
+
+
+def test_incremental_writes_match_a_rebuild(make_expenses, make_income):
+    expenses, income = make_expenses(2_000), make_income(50)
+    extra_expenses, extra_income = make_expenses(200, seed=1), make_income(20, seed=1)
+
+    partitions = MonthPartitions.from_frames(expenses, income)
+    for row in extra_expenses.itertuples():
+        partitions = partitions.add_expense(row.date, row.amount, row.category, row.merchant)
+    for row in extra_income.itertuples():
+        partitions = partitions.add_income(row.date, row.amount)
+
+    assert_matches_frames(
+        partitions, pd.concat([expenses, extra_expenses]), pd.concat([income, extra_income])
+    )
+
+
+def test_resample_matches_grouping_the_rows(make_expenses, make_income):
+    expenses, income = make_expenses(5_000), make_income(100)
+    partitions = MonthPartitions.from_frames(expenses, income)
+
+    for frequency in ('D', 'W'):
+        expected = expenses.groupby(pd.Grouper(key='date', freq=frequency))['amount'].sum()
+        assert partitions.resample(frequency).to_numpy() == pytest.approx(expected.to_numpy())
+        assert (partitions.resample(frequency).index == expected.index).all()
+
+
+def test_expense_report_over_partial_months_matches_a_mask(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(10_000)
+    expenses = analyzer.expenses
+
+    report = analyzer.generate_expense_report("2023-03-17", "2024-02-09")
+
+    rows = expenses[(expenses['date'] >= "2023-03-17") & (expenses['date'] <= "2024-02-09")]
+    assert report["transaction_count"] == len(rows)
+    assert report["total_expenses"] == pytest.approx(rows['amount'].sum())
+    assert report["expenses_by_category"] == pytest.approx(rows.groupby('category')['amount'].sum().to_dict())
+    daily = rows.groupby(rows['date'].dt.date)['amount'].sum()
+    assert list(report["daily_expenses"]) == list(daily.index)
+    assert np.allclose(list(report["daily_expenses"].values()), daily.to_numpy())
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from chatbot import FinanceChatbot
+from finance_analyzer import FinanceAnalyzer
+from ledger import ExpenseLedger
+from recurring import detect_recurring
+
+
+def charges(merchant: str, dates: pd.DatetimeIndex, amount: float, category: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'date': dates, 'amount': amount, 'category': category, 'merchant': merchant,
+        'user_id': "test", 'description': f"{merchant} charge"
+    })
+
+
+@pytest.fixture
+def analyzer(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = pd.concat([
+        make_expenses(3_000),
+        charges("StreamFlix", pd.date_range("2024-01-05", periods=12, freq=pd.DateOffset(months=1)), 15.99, "Entertainment"),
+        charges("Gym Club", pd.date_range("2024-09-02", periods=16, freq="7D"), 12.0, "Personal Care"),
+        charges("Corner Bakery", pd.DatetimeIndex(["2024-02-01", "2024-02-03", "2024-05-20", "2024-06-01"]), 8.0, "Food"),
+    ], ignore_index=True).sort_values('date', kind='stable')
+    return analyzer
+
+
+def test_monthly_fixed_amount_series_is_detected(analyzer):
+    series = {item.merchant: item for item in analyzer.detect_recurring_payments()}
+
+    streaming = series["StreamFlix"]
+    assert streaming.period == "monthly"
+    assert streaming.interval_days == pytest.approx(30, abs=1.5)
+    assert streaming.occurrences == 12
+    assert streaming.average_amount == pytest.approx(15.99)
+    assert streaming.category == "Entertainment"
+    assert streaming.last_date == "2024-12-05"
+    assert streaming.next_expected == "2025-01-05"
+    assert streaming.active
+
+
+def test_weekly_series_and_irregular_merchants(analyzer):
+    series = {item.merchant: item for item in analyzer.detect_recurring_payments()}
+
+    assert series["Gym Club"].period == "weekly"
+    assert series["Gym Club"].next_expected == "2024-12-23"
+    assert "Corner Bakery" not in series
+    # Merchants of the random history have irregular intervals and amounts
+    assert set(series) == {"StreamFlix", "Gym Club"}
+
+
+def test_series_that_stopped_is_inactive(analyzer):
+    streaming = next(
+        item for item in analyzer.detect_recurring_payments(as_of="2025-06-01") if item.merchant == "StreamFlix"
+    )
+    assert not streaming.active
+
+
+def test_too_few_charges_are_not_recurring():
+    expenses = charges("StreamFlix", pd.date_range("2024-01-05", periods=2, freq=pd.DateOffset(months=1)), 15.99, "Entertainment")
+    assert detect_recurring(ExpenseLedger.from_frame(expenses)) == []
+
+
+def test_chat_lists_the_same_series_as_the_api(analyzer):
+    response = FinanceChatbot("test", analyzer).process_message("What subscriptions do I have?")
+    active = [item.merchant for item in analyzer.detect_recurring_payments() if item.active]
+
+    assert active == ["StreamFlix"]
+    assert "You have 1 recurring payment(s)" in response
+    assert "- StreamFlix: $15.99 monthly, next expected around 2025-01-05" in response
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from finance_analyzer import FinanceAnalyzer
+from search import SearchIndex, rank_page, tokenize
+
+
+def expenses_frame(*rows) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=['merchant', 'description'])
+
+
+@pytest.fixture
+def index():
+    return SearchIndex.from_frame(expenses_frame(
+        ("Blue Bottle", "Coffee beans"),
+        ("Whole Foods", "Groceries and coffee"),
+        ("Shell", "Gas"),
+        ("Blue Apron", "Meal kit"),
+        (None, np.nan),
+    ))
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("SQ *Blue-Bottle #12, Oakland") == ["sq", "blue", "bottle", "12", "oakland"]
+    assert tokenize("   ") == []
+    assert tokenize(None) == []
+    assert tokenize(3.5) == []
+
+
+def test_every_term_must_match_a_token_prefix(index):
+    rows, _ = index.search("blue")
+    assert list(rows) == [0, 3]
+    rows, _ = index.search("Blu COFF")
+    assert list(rows) == [0]
+    rows, _ = index.search("coffee tea")
+    assert len(rows) == 0
+    rows, _ = index.search("  ")
+    assert len(rows) == 0
+
+
+def test_exact_and_rarer_terms_score_higher(index):
+    rows, scores = index.search("coffee")
+    assert list(rows) == [0, 1]
+    assert scores[0] == pytest.approx(scores[1])
+
+    rows, scores = index.search("groc")
+    exact_rows, exact_scores = index.search("groceries")
+    assert list(rows) == list(exact_rows) == [1]
+    assert scores[0] == pytest.approx(exact_scores[0] / 2)
+
+    # 'gas' appears in one row, 'blue' in two
+    assert index.search("gas")[1][0] > index.search("blue")[1][0]
+
+
+def test_rows_past_the_snapshot_are_ignored(index):
+    index.add(5, {'merchant': "Blue Bottle", 'description': "Espresso"})
+
+    assert list(index.search("blue")[0]) == [0, 3, 5]
+    assert list(index.search("blue", n_rows=5)[0]) == [0, 3]
+    assert len(index.search("espresso", n_rows=5)[0]) == 0
+
+
+def test_pages_cover_every_match_once_in_rank_order():
+    rng = np.random.default_rng(0)
+    rows = np.arange(0, 200, 2)
+    scores = rng.choice([1.0, 2.0, 3.0], len(rows))
+
+    pages = [rank_page(rows, scores, page, 7) for page in range(1, 16)]
+    ranked = np.concatenate(pages)
+    expected = sorted(zip(-scores, -rows))
+
+    assert list(ranked) == [-row for _, row in expected]
+    assert len(rank_page(rows, scores, 16, 7)) == 0
+    assert len(rank_page(rows[:0], scores[:0], 1, 7)) == 0
+
+
+def test_deleted_and_edited_expenses_leave_the_results(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(500)
+    analyzer.add_expense({
+        'date': "2025-01-02", 'amount': 30.0, 'category': "Food", 'merchant': "Zephyr Diner", 'description': "Lunch"
+    })
+    analyzer.add_expense({
+        'date': "2025-01-03", 'amount': 45.0, 'category': "Food", 'merchant': "Zephyr Diner", 'description': "Dinner"
+    })
+    assert analyzer.search_expenses("zephyr")[1] == 2
+
+    lunch = analyzer.expenses.loc[analyzer.expenses['description'] == "Lunch", 'id'].item()
+    analyzer.delete_transaction('expense', lunch)
+    results, total = analyzer.search_expenses("zephyr")
+    assert total == 1
+    assert list(results['description']) == ["Dinner"]
+
+    edited = results.iloc[0].drop(['id', 'score']).to_dict()
+    analyzer.replace_transaction('expense', int(results.iloc[0]['id']), dict(edited, merchant="Aurora Bistro"))
+    assert analyzer.search_expenses("zephyr")[1] == 0
+    assert list(analyzer.search_expenses("aurora")[0]['description']) == ["Dinner"]
+
+
+def test_a_rewrite_between_snapshot_and_index_is_not_mixed(make_expenses, monkeypatch):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(500)
+    for day in (2, 3, 4):
+        analyzer.add_expense({
+            'date': f"2025-01-0{day}", 'amount': 30.0, 'category': "Food", 'merchant': "Zephyr Diner", 'description': "Lunch"
+        })
+    search_index = analyzer.search_index
+    first = analyzer.expenses['id'].iat[0]
+
+    def rewritten_first():
+        # A delete lands after the search pinned its snapshot, shifting every row
+        monkeypatch.setattr(analyzer, "search_index", search_index)
+        analyzer.delete_transaction('expense', first)
+        return search_index()
+
+    monkeypatch.setattr(analyzer, "search_index", rewritten_first)
+    results, total = analyzer.search_expenses("zephyr")
+
+    assert total == 3
+    assert list(results['merchant']) == ["Zephyr Diner"] * 3
+    assert first not in set(analyzer.expenses['id'])
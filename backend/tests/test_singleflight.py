@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+
+import api
+from finance_analyzer import FinanceAnalyzer
+from singleflight import SingleFlight
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+class Gate:
+    """A computation that blocks until released, counting its runs"""
+
+    def __init__(self, error: Exception = None):
+        self.release = threading.Event()
+        self.calls = 0
+        self.error = error
+
+    def __call__(self, value):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [value, self.calls]
+
+
+def test_concurrent_identical_calls_run_once():
+    flight, gate = SingleFlight(), Gate()
+
+    async def scenario():
+        callers = [asyncio.create_task(flight.do(("user", "route", 1), gate, "result")) for _ in range(20)]
+        await wait_for(lambda: flight.stats()["shared"] == 19)
+        gate.release.set()
+        return await asyncio.gather(*callers)
+
+    results = asyncio.run(scenario())
+    assert gate.calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"inFlight": 0, "started": 1, "shared": 19}
+
+
+def test_an_exception_reaches_every_caller():
+    flight, gate = SingleFlight(), Gate(ValueError("bad data"))
+
+    async def scenario():
+        callers = [asyncio.create_task(flight.do("key", gate, None)) for _ in range(5)]
+        await wait_for(lambda: flight.stats()["shared"] == 4)
+        gate.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert gate.calls == 1
+    assert all(isinstance(error, ValueError) and str(error) == "bad data" for error in errors)
+
+
+def test_a_new_data_version_gets_its_own_computation(make_expenses):
+    user_id = "test-singleflight-user"
+    analyzer = FinanceAnalyzer(user_id)
+    analyzer.expenses = make_expenses(100)
+    api.finance_analyzers[user_id] = analyzer
+    gate = Gate()
+
+    async def scenario():
+        before = asyncio.create_task(api.coalesced(user_id, "route", (), gate, "before"))
+        await wait_for(lambda: gate.calls == 1)
+        analyzer.add_expense({
+            'date': "2024-12-30", 'amount': 20.0, 'category': "Food", 'merchant': "Cafe", 'description': "Lunch"
+        })
+        after = asyncio.create_task(api.coalesced(user_id, "route", (), gate, "after"))
+        await wait_for(lambda: gate.calls == 2)
+        gate.release.set()
+        return await before, await after
+
+    try:
+        before, after = asyncio.run(scenario())
+    finally:
+        api.finance_analyzers.pop(user_id, None)
+    assert (before[0], after[0]) == ("before", "after")
+
+    # Results are shared while in flight, not cached afterwards
+    flight, gate = SingleFlight(), Gate()
+    gate.release.set()
+
+    async def twice():
+        return await flight.do("key", gate, 1), await flight.do("key", gate, 1)
+
+    assert asyncio.run(twice()) == ([1, 1], [1, 2])
+
+
+def test_a_caller_that_goes_away_does_not_cancel_the_others():
+    flight, gate = SingleFlight(), Gate()
+
+    async def scenario():
+        leaving = asyncio.create_task(flight.do("key", gate, "value"))
+        staying = asyncio.create_task(flight.do("key", gate, "value"))
+        await wait_for(lambda: flight.stats()["shared"] == 1)
+        leaving.cancel()
+        gate.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(scenario()) == ["value", 1]
@@ -0,0 +1,57 @@
+import tracemalloc
+
+import pandas as pd
+
+from finance_analyzer import FinanceAnalyzer
+
+
+def test_filtered_read_allocates_about_the_result(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(300_000)
+
+    with pd.option_context('mode.copy_on_write', True):
+        # Warm up lazily built pandas internals before measuring
+        analyzer.filter_expenses("2024-03-01", "2024-03-07", "Food")
+
+        tracemalloc.start()
+        try:
+            result = analyzer.filter_expenses("2024-03-01", "2024-03-07", "Food")
+            total = float(result['amount'].sum())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    history_bytes = analyzer.expenses.memory_usage(deep=True).sum()
+    result_bytes = result.memory_usage(deep=True).sum()
+    assert 0 < len(result) < 1000
+    assert total > 0
+    assert peak <= 2 * result_bytes + 256 * 1024
+    assert peak < history_bytes / 100
+
+
+def test_filtered_read_matches_a_mask_over_the_frame(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(5_000)
+    expenses = analyzer.expenses
+
+    result = analyzer.filter_expenses("2023-06-01", "2023-08-31", "Shopping")
+
+    mask = (
+        (expenses['date'] >= "2023-06-01") & (expenses['date'] <= "2023-08-31")
+        & (expenses['category'] == "Shopping")
+    )
+    assert result['id'].tolist() == expenses.loc[mask, 'id'].tolist()
+
+
+def test_pinned_snapshot_is_unchanged_by_writes(make_expenses):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(100)
+    pinned = analyzer.snapshot()
+
+    analyzer.add_expense({
+        'date': "2024-01-01", 'amount': 10.0, 'category': "Food", 'merchant': "Cafe", 'description': "Coffee"
+    })
+
+    assert len(pinned.expenses) == 100
+    assert len(analyzer.snapshot().expenses) == 101
+    assert analyzer.snapshot().version == pinned.version + 1
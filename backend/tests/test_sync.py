@@ -0,0 +1,117 @@
+import sync
+from finance_analyzer import FinanceAnalyzer
+from sync import SyncLog
+
+
+def test_ids_are_shared_and_increasing_across_kinds():
+    log = SyncLog()
+
+    assert list(log.assign('expense', 3)) == [1, 2, 3]
+    assert log.next() == 4
+    assert list(log.assign('income', 2)) == [5, 6]
+    assert list(log.assign('expense', 0)) == []
+    assert log.seq == 6
+
+
+def test_clients_behind_a_wholesale_replacement_resync_that_kind():
+    log = SyncLog()
+    log.assign('expense', 3)
+    log.assign('income', 2)
+    log.next()
+
+    assert log.needs_full('expense', 0)
+    assert not log.needs_full('expense', 3)
+    assert log.needs_full('income', 4)
+    assert not log.needs_full('income', 5)
+
+
+def test_tombstones_since_a_sequence_number():
+    log = SyncLog()
+    log.assign('expense', 3)
+    first = log.remove('expense', 2)
+    second = log.remove('income', 9)
+
+    assert (first.seq, first.kind, first.id) == (4, 'expense', 2)
+    assert log.tombstones_since(3) == [first, second]
+    assert log.tombstones_since(4) == [second]
+    assert log.tombstones_since(5) == []
+    assert second.to_dict() == {'seq': 5, 'kind': 'income', 'id': 9}
+
+
+def test_dropping_old_tombstones_forces_a_full_resync(monkeypatch):
+    monkeypatch.setattr(sync, "MAX_TOMBSTONES", 3)
+    log = SyncLog()
+    log.assign('expense', 10)
+    for transaction_id in range(1, 4):
+        log.remove('expense', transaction_id)
+
+    # Tombstones 11 to 13 are all kept
+    assert not log.needs_full('expense', 10)
+    assert len(log.tombstones_since(10)) == 3
+
+    log.remove('expense', 4)
+    log.remove('expense', 5)
+
+    assert [tombstone.seq for tombstone in log.tombstones_since(0)] == [13, 14, 15]
+    # A client that saw tombstone 12 can still catch up, one that didn't can't
+    assert not log.needs_full('expense', 12)
+    assert log.needs_full('expense', 11)
+    assert log.needs_full('income', 11)
+
+
+def test_changes_since_returns_only_what_the_client_missed(make_expenses, make_income):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(100)
+    analyzer.income = make_income(10)
+    since = analyzer.changes_since()["seq"]
+
+    analyzer.add_expense({
+        'date': "2025-01-02", 'amount': 30.0, 'category': "Food", 'merchant': "Diner", 'description': "Lunch"
+    })
+    analyzer.add_income({'date': "2025-01-03", 'amount': 900.0, 'source': "Freelance", 'description': "Invoice"})
+    removed = int(analyzer.expenses['id'].iloc[0])
+    analyzer.delete_transaction('expense', removed)
+
+    changes = analyzer.changes_since(since)
+    assert changes["seq"] == since + 3
+    assert changes["full"] == []
+    assert list(changes["expenses"]['description']) == ["Lunch"]
+    assert list(changes["income"]['description']) == ["Invoice"]
+    assert [(tombstone.kind, tombstone.id) for tombstone in changes["tombstones"]] == [('expense', removed)]
+
+    caught_up = analyzer.changes_since(changes["seq"])
+    assert caught_up["expenses"].empty and caught_up["income"].empty and not caught_up["tombstones"]
+
+
+def test_changes_since_before_a_reload_sends_that_kind_in_full(make_expenses, make_income):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(100)
+    analyzer.income = make_income(10)
+    since = analyzer.changes_since()["seq"]
+    analyzer.delete_transaction('expense', int(analyzer.expenses['id'].iloc[0]))
+
+    analyzer.expenses = make_expenses(50, seed=1)
+
+    changes = analyzer.changes_since(since)
+    assert changes["full"] == ['expense']
+    assert len(changes["expenses"]) == 50
+    assert changes["income"].empty
+    # The replaced kind's tombstones are covered by the full copy
+    assert changes["tombstones"] == []
+
+
+def test_changing_the_base_currency_resyncs_both_kinds(make_expenses, make_income):
+    analyzer = FinanceAnalyzer("test")
+    analyzer.expenses = make_expenses(100)
+    analyzer.income = make_income(10)
+    since = analyzer.changes_since()["seq"]
+    version = analyzer.snapshot().version
+    ids = list(analyzer.expenses['id'])
+
+    assert analyzer.set_base_currency("EUR") == version + 1
+
+    changes = analyzer.changes_since(since)
+    assert changes["full"] == ['expense', 'income']
+    assert (len(changes["expenses"]), len(changes["income"])) == (100, 10)
+    assert list(changes["expenses"]['id']) == ids
+    assert analyzer.changes_since(changes["seq"])["full"] == []